@@ -0,0 +1,152 @@
+'''
+Mede quanto tempo demora para inserir seasons de partidas falsas em um banco novo, criado em
+uma pasta temporária: com o manipulation.insert_games (uma transação por dia) e do jeito antigo
+do web scraping (uma transação por participação e partida).
+
+Para rodar, da raiz do repositório: python benchmarks/ingest_benchmark.py [-s SEASONS] [-o SEASONS]
+'''
+import argparse
+import io
+import random
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from os.path import join
+from pathlib import Path
+
+# O código do programa importa a partir do src (ex.: from data.utils import ...)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from data.utils import data_provider, connection_provider, manipulation  # noqa: E402
+from data.utils.definition import create_database, fill_teams  # noqa: E402
+
+
+def generate_synthetic_games(season_amount=20, seed=0):
+    """Gera partidas falsas, dia por dia, para as primeiras seasons da tabela seasons do
+    data_provider: 1230 partidas por season (a temporada regular com 30 times), espalhadas
+    entre o começo e o fim dela.
+
+    Args:
+        season_amount (int, optional): Quantidade de seasons. Defaults to 20.
+        seed (int, optional): Semente do random. Defaults to 0.
+
+    Yields:
+        list: As partidas de um dia, no formato do manipulation.insert_games
+    """
+
+    synthetic_random = random.Random(seed)
+
+    def generate_participation(team_id, team_is_home, points, won):
+        field_goals_attempts = synthetic_random.randint(15, 30)
+        field_goals = synthetic_random.randint(5, field_goals_attempts)
+        three_point_attempts = synthetic_random.randint(3, 12)
+        three_point_field_goals = synthetic_random.randint(0, three_point_attempts)
+        free_throws_attempts = synthetic_random.randint(1, 10)
+        free_throws = synthetic_random.randint(0, free_throws_attempts)
+        offensive_rebounds = synthetic_random.randint(0, 6)
+        defensive_rebounds = synthetic_random.randint(4, 14)
+
+        return [0, team_id, f"Team {team_id}", team_is_home, "60:00", field_goals, field_goals_attempts,
+                round(field_goals / field_goals_attempts, 3), three_point_field_goals, three_point_attempts,
+                round(three_point_field_goals / three_point_attempts, 3), free_throws, free_throws_attempts,
+                round(free_throws / free_throws_attempts, 3), offensive_rebounds, defensive_rebounds,
+                offensive_rebounds + defensive_rebounds, synthetic_random.randint(2, 10),
+                synthetic_random.randint(0, 5), synthetic_random.randint(0, 4), synthetic_random.randint(0, 6),
+                synthetic_random.randint(0, 8), points, 42, won]
+
+    for season in sorted(data_provider.seasons, key=int)[:season_amount]:
+        season_start = datetime.strptime(data_provider.seasons[season]["start"], "%Y-%m-%d")
+        season_days = (datetime.strptime(data_provider.seasons[season]["end"], "%Y-%m-%d") - season_start).days + 1
+
+        for day in range(season_days):
+            date = (season_start + timedelta(days=day)).strftime("%Y-%m-%d")
+            teams = synthetic_random.sample(range(1, 31), 30)
+            game_amount = min(15, round(1230 * (day + 1) / season_days) - round(1230 * day / season_days))
+
+            day_games = []
+            for game in range(game_amount):
+                home_points, away_points = synthetic_random.randint(15, 40), synthetic_random.randint(15, 40)
+                day_games.append((
+                    generate_participation(teams[2 * game], 1, home_points, int(home_points > away_points)),
+                    generate_participation(teams[2 * game + 1], 0, away_points, int(away_points > home_points)),
+                    date))
+
+            yield day_games
+
+
+def insert_games_one_by_one(day_games):
+    """Insere as partidas do jeito antigo do web scraping: um id, uma transação e um commit
+    para cada participação, partida e atualização da team_rolling_stats"""
+
+    for home_participation, away_participation, date in day_games:
+        home_participation = [manipulation.create_id_participation(), *home_participation[1:]]
+        manipulation.insert_participation_data([home_participation])
+        away_participation = [manipulation.create_id_participation(), *away_participation[1:]]
+        manipulation.insert_participation_data([away_participation])
+
+        manipulation.insert_match_data([[home_participation[0], away_participation[0], date]])
+
+        manipulation.update_team_rolling_stats(home_participation[1], 1, date)
+        manipulation.update_team_rolling_stats(away_participation[1], 0, date)
+
+
+def time_ingest(insert_day, season_amount):
+    """Mede quanto tempo demora para inserir season_amount seasons de partidas falsas em um
+    banco novo, criado em uma pasta temporária
+
+    Args:
+        insert_day (function): Recebe as partidas de um dia e insere no banco
+        season_amount (int): Quantidade de seasons
+
+    Returns:
+        tuple: (quantidade de partidas, segundos)
+    """
+
+    database_path = connection_provider.DATABASE_PATH
+
+    with tempfile.TemporaryDirectory() as database_directory:
+        connection_provider.close_connection()
+        connection_provider.DATABASE_PATH = join(database_directory, "database.sqlite3")
+
+        try:
+            # As mensagens de cada inserção deixariam o terminal ilegível
+            with redirect_stdout(io.StringIO()):
+                create_database()
+                fill_teams()
+
+                match_amount = 0
+                start_time = time.time()
+                for day_games in generate_synthetic_games(season_amount):
+                    insert_day(day_games)
+                    match_amount += len(day_games)
+                elapsed_time = time.time() - start_time
+        finally:
+            connection_provider.close_connection()
+            connection_provider.DATABASE_PATH = database_path
+
+    return match_amount, elapsed_time
+
+
+def run_ingest_benchmark(season_amount=20, one_by_one_season_amount=1):
+    for description, insert_day, amount in (("One transaction per day", manipulation.insert_games, season_amount),
+                                            ("One by one", insert_games_one_by_one, one_by_one_season_amount)):
+        if(amount <= 0):
+            continue
+
+        match_amount, elapsed_time = time_ingest(insert_day, amount)
+        print(f"{description}: {match_amount} matches ({amount} seasons) in {elapsed_time:.2f}s | "
+              f"{match_amount / elapsed_time:.0f} matches/s")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(
+        description="Times the insertion of synthetic seasons into a temporary database.")
+    arg_parser.add_argument("-s", "--seasons", type=int, default=20,
+                            help="Number of seasons inserted with one transaction per day.")
+    arg_parser.add_argument("-o", "--one-by-one-seasons", type=int, default=1,
+                            help="Number of seasons inserted one match at a time, like the old scraper. 0 skips it.")
+    args = arg_parser.parse_args()
+
+    run_ingest_benchmark(season_amount=args.seasons, one_by_one_season_amount=args.one_by_one_seasons)
@@ -0,0 +1,88 @@
+'''
+Mede quanto tempo demora para montar as médias de uma season antes e depois das migrações,
+tanto com o get_match_feature_matrix_by_season quanto partida por partida com o get_averages
+(que é o que o predict usa). As migrações rodam em uma cópia do banco, criada em uma pasta
+temporária, então o data/database.sqlite3 não muda.
+
+Para rodar, da raiz do repositório: python benchmarks/migration_benchmark.py [-d YYYY-MM-DD]
+'''
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from os.path import join
+from pathlib import Path
+
+# O código do programa importa a partir do src (ex.: from data.utils import ...)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from data.utils import data_provider, connection_provider  # noqa: E402
+from data.utils.definition import migrate_database, get_schema_version  # noqa: E402
+
+
+def time_season_build(date, match_by_match=True):
+    """Mede quanto tempo demora para montar as médias de uma season
+
+    Args:
+        date (list): Data limite da season no formato [ano, mês, dia]
+        match_by_match (bool, optional): Se também mede o get_averages partida por partida. Defaults to True.
+
+    Returns:
+        tuple: (segundos da season inteira, segundos partida por partida ou None)
+    """
+
+    start_time = time.time()
+    matches = data_provider.get_match_feature_matrix_by_season(date)
+    season_time = time.time() - start_time
+
+    match_by_match_time = None
+    if(match_by_match):
+        start_time = time.time()
+        for match in data_provider.get_matches_by_season(date):
+            data_provider.get_averages(match["team_home_id"], 1, match["match_data"])
+            data_provider.get_averages(match["team_away_id"], 0, match["match_data"])
+        match_by_match_time = time.time() - start_time
+
+    print(f"{len(matches)} matches | Season build: {season_time:.3f}s" +
+          (f" | Match by match: {match_by_match_time:.3f}s" if match_by_match else ""))
+
+    return season_time, match_by_match_time
+
+
+def run_migration_benchmark(date=[2018, 6, 20]):
+    database_path = connection_provider.DATABASE_PATH
+
+    with tempfile.TemporaryDirectory() as database_directory:
+        connection_provider.close_connection()
+        connection_provider.DATABASE_PATH = join(database_directory, "database.sqlite3")
+
+        # O backup do sqlite3 também copia o que ainda estiver no -wal do banco original
+        source_connection = sqlite3.connect(database_path)
+        copy_connection = sqlite3.connect(connection_provider.DATABASE_PATH)
+        source_connection.backup(copy_connection)
+        source_connection.close()
+        copy_connection.close()
+
+        try:
+            print("Before migration:")
+            # O get_averages lê da team_rolling_stats, que só existe a partir da versão 2
+            time_season_build(date, match_by_match=get_schema_version() >= 2)
+
+            print(f"Database schema is at version {migrate_database()}")
+
+            print("After migration:")
+            time_season_build(date)
+        finally:
+            connection_provider.close_connection()
+            connection_provider.DATABASE_PATH = database_path
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(
+        description="Times the season build before and after the migrations, on a copy of the database.")
+    arg_parser.add_argument("-d", "--date", type=str, default="2018-06-20",
+                            help="Last day of the season, as YYYY-MM-DD.")
+    args = arg_parser.parse_args()
+
+    run_migration_benchmark([int(value) for value in args.date.split("-")])
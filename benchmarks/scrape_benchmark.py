@@ -0,0 +1,134 @@
+'''
+Compara o web scraping abrindo uma conexão nova para cada página (pipeline.fetch_page) e
+reaproveitando as conexões do pool do HttpFetcher. As páginas das partidas do banco entre as
+duas datas são servidas por um FixtureServer que imita a latência do site de verdade, e coletadas
+de volta com o ScrapingPipeline para um banco novo, criado em uma pasta temporária.
+
+Para rodar, da raiz do repositório: python benchmarks/scrape_benchmark.py [-s INÍCIO] [-e FIM]
+'''
+import argparse
+import io
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from os.path import join
+from pathlib import Path
+
+# O código do programa importa a partir do src (ex.: from data.utils import ...)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from data.utils import connection_provider, manipulation  # noqa: E402
+from data.utils.definition import create_database, fill_teams  # noqa: E402
+from core.web import fixture_server  # noqa: E402
+from core.web.pipeline import ScrapingPipeline, fetch_page  # noqa: E402
+from core.web.http_fetcher import HttpFetcher  # noqa: E402
+
+
+def get_match_participations(date_start, date_end):
+    """As duas participações de cada partida entre date_start e date_end, sem os ids, para
+    comparar bancos diferentes
+
+    Returns:
+        list: Uma tupla por partida: (data, colunas da participação da casa, colunas da de fora)
+    """
+
+    participation_columns = ("fk_team_id", "team_name", "team_is_home", "minutes_played") + \
+        manipulation.MATCH_STATS_COLUMNS
+
+    cursor = connection_provider.get_read_connection().cursor()
+    cursor.execute(f"""
+        SELECT md.date, {", ".join(f"{participation}.{column}" for participation in ("pt_home", "pt_away")
+                                   for column in participation_columns)}
+        FROM match_data as md
+            INNER JOIN participation as pt_home On md.fk_participation_home = pt_home.participation_id
+            INNER JOIN participation as pt_away On md.fk_participation_away = pt_away.participation_id
+        WHERE md.date >= ? AND md.date <= ?
+        ORDER BY md.date ASC, md.match_id ASC""", (date_start, date_end))
+
+    return cursor.fetchall()
+
+
+def time_scraping(date_start, date_end, fetch, fetch_workers=4, parse_workers=2, request_latency=0,
+                  connection_latency=0):
+    """Coleta as partidas do banco entre date_start e date_end de um FixtureServer para um
+    banco novo e confere se ficaram iguais às do banco original
+
+    Args:
+        fetch (function): O fetch do ScrapingPipeline
+        request_latency (float, optional): Atraso do FixtureServer em cada requisição. Defaults to 0.
+        connection_latency (float, optional): Atraso do FixtureServer em cada conexão nova. Defaults to 0.
+
+    Returns:
+        tuple: (partidas coletadas, partidas diferentes do banco, segundos do pipeline)
+    """
+
+    expected_matches = get_match_participations(date_start, date_end)
+    database_path = connection_provider.DATABASE_PATH
+
+    with tempfile.TemporaryDirectory() as fixture_directory:
+        date_list = fixture_server.save_fixture_pages(fixture_directory, date_start, date_end)
+
+        connection_provider.close_connection()
+        connection_provider.DATABASE_PATH = join(fixture_directory, "database.sqlite3")
+
+        try:
+            # As mensagens de cada partida deixariam o terminal ilegível
+            with redirect_stdout(io.StringIO()):
+                create_database()
+                fill_teams()
+
+                with fixture_server.FixtureServer(fixture_directory, request_latency=request_latency,
+                                                  connection_latency=connection_latency) as base_url:
+                    scraping_pipeline = ScrapingPipeline(base_url=base_url, fetch_workers=fetch_workers,
+                                                         parse_workers=parse_workers, fetch=fetch)
+                    start_time = time.time()
+                    scraping_pipeline.run(date_list)
+                    elapsed_time = time.time() - start_time
+
+            scraped_matches = get_match_participations(date_start, date_end)
+        finally:
+            connection_provider.close_connection()
+            connection_provider.DATABASE_PATH = database_path
+
+    different_matches = sum(scraped_match != expected_match
+                            for scraped_match, expected_match in zip(scraped_matches, expected_matches))
+    different_matches += abs(len(scraped_matches) - len(expected_matches))
+
+    return len(scraped_matches), different_matches, elapsed_time
+
+
+def run_scrape_benchmark(date_start="2021-03-01", date_end="2021-03-31", fetch_workers=4, parse_workers=2,
+                         request_latency=0.02, connection_latency=0.05):
+    print(f"Server latency: {request_latency * 1000:.0f}ms per request, "
+          f"{connection_latency * 1000:.0f}ms per new connection")
+
+    for description, fetch in (("New connection per page", fetch_page),
+                               ("Pooled keep-alive connections", HttpFetcher(requests_per_minute=None,
+                                                                             pool_size=2 * fetch_workers))):
+        match_amount, different_matches, elapsed_time = time_scraping(
+            date_start, date_end, fetch, fetch_workers=fetch_workers, parse_workers=parse_workers,
+            request_latency=request_latency, connection_latency=connection_latency)
+        print(f"{description}: {match_amount} matches in {elapsed_time:.2f}s | "
+              f"{match_amount / elapsed_time:.0f} matches/s | {different_matches} different from the database")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(
+        description="Times the scraper with a new connection per page and with pooled keep-alive connections, "
+                    "against a local server that simulates the site latency.")
+    arg_parser.add_argument("-s", "--start", type=str, default="2021-03-01",
+                            help="First day, as YYYY-MM-DD.")
+    arg_parser.add_argument("-e", "--end", type=str, default="2021-03-31",
+                            help="Last day, as YYYY-MM-DD.")
+    arg_parser.add_argument("-fw", "--fetch-workers", type=int, default=4,
+                            help="Number of threads downloading pages.")
+    arg_parser.add_argument("-rl", "--request-latency", type=float, default=20,
+                            help="Milliseconds the local server waits before each response.")
+    arg_parser.add_argument("-cl", "--connection-latency", type=float, default=50,
+                            help="Milliseconds the local server waits on each new connection.")
+    args = arg_parser.parse_args()
+
+    run_scrape_benchmark(date_start=args.start, date_end=args.end, fetch_workers=args.fetch_workers,
+                         request_latency=args.request_latency / 1000,
+                         connection_latency=args.connection_latency / 1000)
@@ -1,17 +1,25 @@
 import json
+import glob
+import os
 import matplotlib.pyplot as plt
 import numpy as np
-
-
-def plot_gen_alg():
-    with open("src/data/json/gen/2021-03-25--23-33-10.json", "r") as json_file:
-        data = json.load(json_file)
-        means = []
-        gens = []
-        for i in data:
-            print(i)
-            means.append(i["best_fitness"])
-            gens.append(i["current_generation"])
+from src.core.utils.generation_metrics_manager import read_generation_metrics
+
+
+def plot_gen_alg(file_path=None):
+    # Sem arquivo especificado, usa a execução mais recente
+    if(file_path is None):
+        file_path = max(glob.glob("src/data/json/gen/*.jsonl"),
+                        key=os.path.getmtime, default=None)
+        if(file_path is None):
+            print("No generation metrics found in src/data/json/gen, run the genetic algorithm first.")
+            return
+
+    means = []
+    gens = []
+    for i in read_generation_metrics(file_path):
+        means.append(i["best_fitness"])
+        gens.append(i["current_generation"])
 
     plt.plot(gens, means)
     plt.title("Evolução do Melhor Fitness por Geração")
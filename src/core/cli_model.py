@@ -1,16 +1,29 @@
 
 from datetime import datetime
 import time
+import random
 import json
 from os.path import join
 from pathlib import Path
 from core.gen.classes.genetic_algorithm import GeneticAlgorithm
-from data.utils import data_provider
+from core.gen.classes.island_model import IslandModel
+from core.utils.checkpoint_manager import Checkpoint
+from data.utils import data_provider, dataset_cache, match_snapshot
+from data.utils.definition import migrate_database
+from data.utils.manipulation import backfill_team_rolling_stats
+from data.utils.match_feature_matrix import MatchFeatureMatrix
 from core.web.control import activate_web_scraping
+from core.web.pipeline import DEFAULT_BASE_URL
+from core.web.http_fetcher import DEFAULT_REQUESTS_PER_MINUTE
 from core.validation.validation import Validation
 
 
-def predict_score(team_home_name, team_away_name, date, view=None, manual_chromosome=None):
+def predict_score(team_home_name, team_away_name, date, view=None, manual_chromosome=None, predicted_match=None,
+                  use_stats_index=False):
+    # Com o índice, o nome e as médias dos times saem da memória ao invés do SQLite
+    if(use_stats_index):
+        data_provider.use_stats_index()
+
     gen_alg = GeneticAlgorithm([])
     if(manual_chromosome is not None):
         weight_list = manual_chromosome
@@ -19,8 +32,9 @@ def predict_score(team_home_name, team_away_name, date, view=None, manual_chromo
     else:
         weight_list = gen_alg.get_first_generation()[0]
 
-    predicted_match = data_provider.get_specific_match_averages(
-        team_home_name, team_away_name, date)
+    if(predicted_match is None):
+        predicted_match = MatchFeatureMatrix.from_match(data_provider.get_specific_match_averages(
+            team_home_name, team_away_name, date))
 
     try:
         print(
@@ -51,21 +65,69 @@ def run_gen_alg(date=[2018, 6, 20],
                 persistent_individuals=5,
                 random_individuals=5,
                 timestamp=-1,
-                generate_new_population=False):
-
-    input_matches = data_provider.get_matches_averages_by_season(date)
+                generate_new_population=False,
+                input_matches=None,
+                workers=1,
+                seed=None,
+                incremental_fitness=False,
+                islands=1,
+                migration_interval=10,
+                migrants=2,
+                checkpoint_interval=0,
+                resume=None,
+                fitness_sample_fraction=1,
+                revalidated_individuals=None,
+                seasons=None):
+
+    if(seed is not None):
+        random.seed(seed)
+
+    if(input_matches is None):
+        # Se alguma season tiver que ser montada, as somas acumuladas saem das colunas do
+        # snapshot, se ele estiver atualizado
+        match_snapshot.use_match_snapshot()
+
+    if(input_matches is None and seasons is not None):
+        input_matches = dataset_cache.get_match_feature_matrix_by_seasons(
+            seasons, workers=workers)
+    elif(input_matches is None):
+        input_matches = dataset_cache.get_match_feature_matrix_by_season(date)
+
+    if(islands > 1):
+        if(resume is not None or checkpoint_interval > 0):
+            raise ValueError("Checkpoints are not supported with islands.")
+
+        # Os workers só montaram as seasons acima; cada ilha calcula o fitness no seu processo
+        island_model = IslandModel(
+            input_matches, islands=islands, migration_interval=migration_interval, migrants=migrants, seed=seed,
+            timestamp=timestamp, good_generations=good_generations, weight_range=weight_range,
+            mutation_chance=mutation_chance, mutation_magnitude=mutation_magnitude, chromosome_size=chromosome_size,
+            population_size=population_size, max_generations=max_generations,
+            persistent_individuals=persistent_individuals, random_individuals=random_individuals,
+            generate_new_population=generate_new_population, incremental_fitness=incremental_fitness,
+            fitness_sample_fraction=fitness_sample_fraction, revalidated_individuals=revalidated_individuals)
+
+        return island_model.run()
 
     gen_alg = GeneticAlgorithm(
         input_matches, good_generations=good_generations, weight_range=weight_range, mutation_chance=mutation_chance,
         mutation_magnitude=mutation_magnitude, chromosome_size=chromosome_size, population_size=population_size,
         max_generations=max_generations, persistent_individuals=persistent_individuals, timestamp=timestamp,
-        generate_new_population=generate_new_population)
+        generate_new_population=generate_new_population, workers=workers,
+        incremental_fitness=incremental_fitness, fitness_sample_fraction=fitness_sample_fraction,
+        revalidated_individuals=revalidated_individuals)
 
     start_time = time.time()
 
-    gen_alg.population = gen_alg.get_first_generation()
+    start_generation = 0
+    if(resume is not None):
+        checkpoint = Checkpoint(resume)
+        start_generation = checkpoint.load(gen_alg)
+    else:
+        checkpoint = Checkpoint.from_timestamp(gen_alg.timestamp)
+        gen_alg.population = gen_alg.get_first_generation()
 
-    for generation in range(gen_alg.max_generations):
+    for generation in range(start_generation, gen_alg.max_generations):
         try:
             gen_alg.current_generation = generation
 
@@ -88,22 +150,46 @@ def run_gen_alg(date=[2018, 6, 20],
 
             if(gen_alg.current_generation % 5 == 0):
                 gen_alg.add_gen_info_to_json()
+
+            if(checkpoint_interval > 0 and (generation + 1) % checkpoint_interval == 0):
+                checkpoint.dump(gen_alg, next_generation=generation + 1)
         except KeyboardInterrupt:
             break
 
     end_time = time.time()
 
+    gen_alg.close_fitness_pool()
+
     gen_alg.log_and_dump_data(timestamp=datetime.now(),
                               elapsed_time=end_time - start_time)
 
     return gen_alg
 
 
-def run_web_scraping():
-    activate_web_scraping()
+def run_web_scraping(base_url=DEFAULT_BASE_URL, fetch_workers=4, parse_workers=2,
+                     requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE):
+    activate_web_scraping(base_url=base_url, fetch_workers=fetch_workers,
+                          parse_workers=parse_workers, requests_per_minute=requests_per_minute)
+
+
+def run_migration():
+    print(f"Database schema is at version {migrate_database()}")
+
+
+def run_backfill():
+    backfill_team_rolling_stats()
+
+
+def run_snapshot():
+    match_snapshot.export_match_snapshot()
+
+
+def run_validation(test_cycles=5, use_stats_index=False):
+    if(use_stats_index):
+        data_provider.use_stats_index()
 
+    match_snapshot.use_match_snapshot()
 
-def run_validation(test_cycles=5):
     with open(join(Path(__file__).resolve().parent, 'validation', 'config.json'), "r") as config_file:
         generator_data = json.load(config_file)
 
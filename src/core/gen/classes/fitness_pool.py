@@ -0,0 +1,102 @@
+from multiprocessing import Pool
+from multiprocessing import shared_memory
+import numpy as np
+
+# Arrays dos processos filhos, preenchidos por attach_shared_matrices
+worker_stat_differences = None
+worker_home_won = None
+worker_shared_memory = None
+
+
+def count_wrong_predictions(genes, stat_differences, home_won):
+    """Conta quantas partidas cada cromossomo errou. Um cromossomo prevê vitória
+    do time de casa quando (genes @ diferença das estatísticas) > 0, e empate conta
+    como vitória do time de fora, igual ao GeneticAlgorithm.predict_match.
+
+    Args:
+        genes (np.ndarray): Uma linha por cromossomo
+        stat_differences (np.ndarray): Diferença casa - fora das estatísticas, uma linha por partida
+        home_won (np.ndarray): True nas partidas em que o time de casa ganhou
+
+    Returns:
+        np.ndarray: Quantidade de previsões erradas de cada cromossomo
+    """
+
+    genes = genes[:, :stat_differences.shape[1]]
+    predicted_home_won = (genes @ stat_differences.T) > 0
+
+    return np.count_nonzero(predicted_home_won != home_won, axis=1)
+
+
+def attach_shared_matrices(shared_memory_name, match_amount, stat_amount):
+    """Inicializador dos processos do pool: cria arrays que apontam direto para a
+    memória compartilhada, sem copiar os dados das partidas para cada processo.
+    """
+    global worker_stat_differences, worker_home_won, worker_shared_memory
+
+    worker_shared_memory = shared_memory.SharedMemory(name=shared_memory_name)
+
+    worker_stat_differences = np.ndarray(
+        (match_amount, stat_amount), dtype=float, buffer=worker_shared_memory.buf)
+    worker_home_won = np.ndarray((match_amount,), dtype=bool, buffer=worker_shared_memory.buf,
+                                 offset=worker_stat_differences.nbytes)
+
+
+def evaluate_shard(genes):
+    return count_wrong_predictions(genes, worker_stat_differences, worker_home_won)
+
+
+class FitnessPool:
+    """Pool de processos que divide a população entre vários núcleos na hora de
+    calcular o fitness. As matrizes das partidas são colocadas uma vez só em memória
+    compartilhada; a cada geração só os genes de cada pedaço da população são enviados.
+
+    Como o cálculo do fitness não usa números aleatórios e os pedaços são juntados
+    na mesma ordem em que foram divididos, o resultado é idêntico ao serial.
+
+        Args:
+            fitness_input (MatchFeatureMatrix): As partidas usadas para avaliar os cromossomos
+            workers (int): Quantidade de processos
+    """
+
+    def __init__(self, fitness_input, workers):
+        stat_differences = fitness_input.get_stat_differences()
+        home_won = fitness_input.get_home_won_mask()
+
+        self.workers = workers
+        self.shared_memory = shared_memory.SharedMemory(
+            create=True, size=max(1, stat_differences.nbytes + home_won.nbytes))
+
+        try:
+            np.ndarray(stat_differences.shape, dtype=float,
+                       buffer=self.shared_memory.buf)[:] = stat_differences
+            np.ndarray(home_won.shape, dtype=bool, buffer=self.shared_memory.buf,
+                       offset=stat_differences.nbytes)[:] = home_won
+
+            self.pool = Pool(workers, initializer=attach_shared_matrices,
+                             initargs=(self.shared_memory.name, *stat_differences.shape))
+        except Exception:
+            self.shared_memory.close()
+            self.shared_memory.unlink()
+            raise
+
+    def count_wrong_predictions(self, genes):
+        """Divide os cromossomos em um pedaço por processo e junta os resultados em ordem
+
+        Args:
+            genes (np.ndarray): Uma linha por cromossomo
+
+        Returns:
+            np.ndarray: Quantidade de previsões erradas de cada cromossomo
+        """
+
+        shards = [shard for shard in np.array_split(
+            genes, self.workers) if len(shard)]
+
+        return np.concatenate(self.pool.map(evaluate_shard, shards))
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        self.shared_memory.close()
+        self.shared_memory.unlink()
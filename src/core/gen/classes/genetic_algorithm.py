@@ -1,7 +1,11 @@
 from json.decoder import JSONDecodeError
+from collections import OrderedDict
 from core.utils.last_generation_manager import Last_Generation
+from core.utils.generation_metrics_manager import Generation_Metrics
+from core.gen.classes.fitness_pool import FitnessPool, count_wrong_predictions
+from data.utils.match_feature_matrix import MatchFeatureMatrix
+import numpy as np
 import random
-import json
 from pathlib import Path
 from os.path import join
 
@@ -10,7 +14,7 @@ class GeneticAlgorithm:
     """Classe Base para a execução do algoritmo genetico
 
         Args:
-            fitness_input_gatherer (function): Uma função que retorna o conjunto de dados usados para avaliar o fitness
+            fitness_input (MatchFeatureMatrix): O conjunto de dados usado para avaliar o fitness. Listas de dicionários são convertidas
             good_generations (int, optional): Quantidade necessária de gerações boas para o algoritmo parar por conta própria. Defaults to 3.
             weight_range (tuple, optional): Valores mínimos e máximos que um gene poderá ter quando for gerado aleatoriamente. Defaults to (-10, 10).
             mutation_chance (int, optional): Chance, em porcentagem, de uma mutação acontecer em um gene na hora da reprodução. Defaults to 1.
@@ -19,6 +23,14 @@ class GeneticAlgorithm:
             population_size (int, optional): Quantidade de indivíduos por geração. Defaults to 50.
             max_generations (int, optional): Quantidade de gerações pela qual o algoritmo vai passar antes de ser interrompido. Defaults to 100.
             fitness_input_size (int, optional): Quantidade de valores que serão usados para avaliar cada cromossomo cada vez. Defaults to 100.
+            batched_fitness (bool, optional): Avalia a população inteira de uma vez com NumPy ao invés de chamar predict_match partida por partida. Defaults to True.
+            workers (int, optional): Quantidade de processos usados para calcular o fitness no modo batched_fitness. Defaults to 1.
+            fitness_cache_size (int, optional): Quantidade máxima de fitness guardados para não avaliar de novo cromossomos repetidos. 0 desativa o cache. Defaults to 10000.
+            vectorized_reproduction (bool, optional): Faz a seleção, o crossover e a mutação da geração inteira de uma vez com NumPy. Defaults to True.
+            incremental_fitness (bool, optional): Guarda a margem (casa - fora) de cada indivíduo em cada partida e atualiza só os genes que mudaram na reprodução. Defaults to False.
+            margin_refresh_interval (int, optional): De quantas em quantas gerações as margens incrementais são recalculadas do zero. Defaults to 25.
+            fitness_sample_fraction (float, optional): Fração das partidas (estratificada por home_won) usada para avaliar a população a cada geração. 1 usa todas. Defaults to 1.
+            revalidated_individuals (int, optional): Quantos dos melhores indivíduos da amostra são reavaliados com todas as partidas. Defaults to o maior entre persistent_individuals e 1/10 da população.
     """
 
     def __init__(self,
@@ -33,10 +45,19 @@ class GeneticAlgorithm:
                  persistent_individuals=5,
                  random_individuals=5,
                  timestamp=-1,
-                 generate_new_population=False
+                 generate_new_population=False,
+                 batched_fitness=True,
+                 workers=1,
+                 fitness_cache_size=10000,
+                 vectorized_reproduction=True,
+                 incremental_fitness=False,
+                 margin_refresh_interval=25,
+                 fitness_sample_fraction=1,
+                 revalidated_individuals=None
                  ):
         try:
-            self.fitness_input = fitness_input
+            self.fitness_input = fitness_input if isinstance(
+                fitness_input, MatchFeatureMatrix) else MatchFeatureMatrix.from_match_list(fitness_input)
             self.persistent_individuals = persistent_individuals + \
                 1 if persistent_individuals % 2 != 0 else persistent_individuals
             self.random_individuals = random_individuals + \
@@ -57,6 +78,35 @@ class GeneticAlgorithm:
             self.population_size = population_size
             self.max_generations = max_generations
             self.generate_new_population = generate_new_population
+            self.batched_fitness = batched_fitness
+            self.workers = workers
+            self.fitness_pool = None
+
+            # Cache LRU de fitness, indexado pelo conteúdo do cromossomo e das partidas
+            self.fitness_cache = OrderedDict()
+            self.fitness_cache_size = fitness_cache_size
+            self.fitness_cache_hits = 0
+            self.fitness_cache_misses = 0
+
+            # Gerador do NumPy semeado pelo random, para que random.seed() reproduza as duas coisas
+            self.vectorized_reproduction = vectorized_reproduction
+            self.rng = np.random.default_rng(random.getrandbits(64))
+
+            # Margens de cada indivíduo em cada partida, junto das listas às quais elas pertencem
+            self.incremental_fitness = incremental_fitness
+            self.margin_refresh_interval = margin_refresh_interval
+            self.margin_generations = 0
+            self.population_margins = None
+            self.margins_population = None
+            self.ranked_margins = None
+            self.margins_ranked_population = None
+
+            # Avaliação com uma amostra das partidas; só os primeiros validated_individuals
+            # da população ordenada têm fitness calculado com todas as partidas
+            self.fitness_sample_fraction = fitness_sample_fraction
+            self.revalidated_individuals = revalidated_individuals if revalidated_individuals is not None else \
+                max(self.persistent_individuals, int(population_size/10))
+            self.validated_individuals = 0
             self.fitness_input_size = len(self.fitness_input)
             self.consecutive_good_generations = 0
             self.ranked_population = []
@@ -67,6 +117,7 @@ class GeneticAlgorithm:
             # Coisas para o json
             self.timestamp = str(timestamp).replace(
                 " ", "--").replace(":", "-").split(".")[0]
+            self.generation_metrics = Generation_Metrics(self.timestamp)
 
     def get_first_generation(self):
         """Inicializa a população do algoritmo genético. Vê se existem dados de uma população já guardados,
@@ -143,11 +194,18 @@ class GeneticAlgorithm:
 
         # TODO pensar num jeito melhor de avaliar a população
 
+        # Fitness calculado com uma amostra das partidas não conta para a parada
         good_individuals = 0
-        for individual in population:
+        for individual in population[:self.validated_individuals]:
             good_individuals += individual[1] > 70
 
-        is_population_good = good_individuals >= int(len(population)/10)
+        required_individuals = int(len(population)/10)
+        if(self.validated_individuals < len(population)):
+            # Com a amostra, o mesmo 1/10 da população tem que estar entre os reavaliados;
+            # só diminui se tiver menos reavaliados que isso
+            required_individuals = max(1, min(required_individuals, self.validated_individuals))
+
+        is_population_good = good_individuals >= required_individuals
 
         if(is_population_good):
             self.consecutive_good_generations += 1
@@ -168,11 +226,28 @@ class GeneticAlgorithm:
             list: Uma população ordenada, contendo (indivíduo, fitness)
         """
 
+        self.validated_individuals = len(population)
+
+        # Convertido uma vez só, senão a chave do cache de cada cromossomo refaria a conversão e o hash
+        if(not isinstance(fitness_input, MatchFeatureMatrix)):
+            fitness_input = MatchFeatureMatrix.from_match_list(fitness_input)
+
+        if(self.fitness_sample_fraction < 1 and fitness_input is self.fitness_input and len(fitness_input) > 0):
+            return self.apply_fitness_sampled(population)
+
+        if(self.batched_fitness):
+            return self.apply_fitness_batched(population, fitness_input)
+
         ranked_population = []
 
         for individual in population:
-            fitness_value = self.calculate_fitness(
-                individual, fitness_input)
+            cache_key = self.get_fitness_cache_key(individual, fitness_input)
+            fitness_value = self.get_cached_fitness(cache_key)
+
+            if(fitness_value is None):
+                fitness_value = self.calculate_fitness(
+                    individual, fitness_input)
+                self.cache_fitness(cache_key, fitness_value)
 
             scored_individual = (individual, fitness_value)
 
@@ -182,6 +257,310 @@ class GeneticAlgorithm:
 
         return ranked_population
 
+    def apply_fitness_batched(self, population: list, fitness_input):
+        """Mesma coisa que apply_fitness, mas avalia a geração inteira de uma vez.
+        Como a pontuação de um time é linear nos genes, a diferença entre as pontuações
+        de casa e fora de todas as partidas para todos os indivíduos sai de um único
+        produto de matrizes (população x diferenças das estatísticas).
+
+        Args:
+            population (list): A população com cromossomos
+            fitness_input (MatchFeatureMatrix): Os dados das partidas usados para avaliar cada cromossomo
+
+        Returns:
+            list: Uma população ordenada, contendo (indivíduo, fitness)
+
+        Complexidade: O(p*m*c), mas em C ao invés de Python
+            p = Quantidade de indivíduos na população
+            m = Quantidade de partidas
+            c = Tamanho de cada cromossomo
+        """
+
+        if(len(population) == 0):
+            return []
+
+        if(not isinstance(fitness_input, MatchFeatureMatrix)):
+            fitness_input = MatchFeatureMatrix.from_match_list(fitness_input)
+
+        genes = np.asarray(population, dtype=float)
+
+        if(self.incremental_fitness and fitness_input is self.fitness_input):
+            margins = self.get_population_margins(population, genes)
+            wrong_predictions = np.count_nonzero(
+                (margins > 0) != fitness_input.get_home_won_mask(), axis=1)
+            fitness_values = self.get_fitness_percentage(
+                wrong_predictions, self.fitness_input_size)
+        else:
+            fitness_values = self.calculate_fitness_values(
+                genes, fitness_input)
+
+        # Ordenação estável para manter a mesma ordem do list.sort() em caso de empate
+        ranking = np.argsort(-fitness_values, kind="stable")
+
+        ranked_population = [(population[index], float(fitness_values[index]))
+                             for index in ranking]
+
+        if(self.incremental_fitness and fitness_input is self.fitness_input):
+            self.ranked_margins = margins[ranking]
+            self.margins_ranked_population = ranked_population
+
+        return ranked_population
+
+    def apply_fitness_sampled(self, population: list):
+        """Avalia a população com uma amostra aleatória das partidas, e depois reavalia
+        os melhores indivíduos da amostra com todas as partidas. Os reavaliados ficam no
+        começo da população ordenada, então o melhor fitness reportado (e o que vai para o
+        highest_fitness) sempre é o calculado com todas as partidas.
+
+        Args:
+            population (list): A população com cromossomos
+
+        Returns:
+            list: Uma população ordenada, contendo (indivíduo, fitness)
+        """
+
+        if(len(population) == 0):
+            return []
+
+        genes = np.asarray(population, dtype=float)
+        fitness_sample = self.fitness_input[self.get_fitness_sample_indexes()]
+
+        wrong_predictions = count_wrong_predictions(
+            genes, *self.get_fitness_matrices(fitness_sample))
+        sampled_fitness = self.get_fitness_percentage(
+            wrong_predictions, len(fitness_sample))
+        sampled_ranking = np.argsort(-sampled_fitness, kind="stable")
+
+        elite_indexes = sampled_ranking[:self.revalidated_individuals]
+        elite_fitness = self.calculate_fitness_values(
+            genes[elite_indexes], self.fitness_input)
+        elite_ranking = np.argsort(-elite_fitness, kind="stable")
+
+        ranked_population = [(population[elite_indexes[index]], float(elite_fitness[index]))
+                             for index in elite_ranking]
+        ranked_population += [(population[index], float(sampled_fitness[index]))
+                              for index in sampled_ranking[self.revalidated_individuals:]]
+
+        self.validated_individuals = len(elite_indexes)
+
+        return ranked_population
+
+    def get_fitness_sample_indexes(self):
+        """Sorteia as partidas usadas na geração atual, mantendo a mesma proporção
+        de vitórias do time de casa que o conjunto completo
+
+        Returns:
+            np.ndarray: Os índices das partidas sorteadas, em ordem crescente
+        """
+
+        home_won = self.fitness_input.get_home_won_mask()
+        sample_indexes = []
+
+        for stratum in (np.flatnonzero(home_won), np.flatnonzero(~home_won)):
+            if(len(stratum) > 0):
+                sample_size = max(
+                    1, int(round(len(stratum) * self.fitness_sample_fraction)))
+                sample_indexes.append(self.rng.choice(
+                    stratum, sample_size, replace=False))
+
+        return np.sort(np.concatenate(sample_indexes))
+
+    def calculate_fitness_values(self, genes, fitness_input):
+        """Calcula o fitness de cada linha de genes, pulando os cromossomos que já
+        estão no cache e usando o pool de processos quando ele existir
+
+        Args:
+            genes (np.ndarray): Um cromossomo por linha
+            fitness_input (MatchFeatureMatrix): As partidas usadas para avaliar os cromossomos
+
+        Returns:
+            np.ndarray: O fitness de cada cromossomo, na mesma ordem de genes
+        """
+
+        fitness_values = np.empty(len(genes))
+
+        # Só os cromossomos que não estão no cache são avaliados
+        cache_keys = [self.get_fitness_cache_key(individual, fitness_input)
+                      for individual in genes]
+        uncached_indexes = []
+        for index, cache_key in enumerate(cache_keys):
+            cached_fitness = self.get_cached_fitness(cache_key)
+            if(cached_fitness is None):
+                uncached_indexes.append(index)
+            else:
+                fitness_values[index] = cached_fitness
+
+        if(len(uncached_indexes) > 0):
+            uncached_genes = genes[uncached_indexes]
+
+            if(fitness_input is self.fitness_input and self.start_fitness_pool()):
+                wrong_predictions = self.fitness_pool.count_wrong_predictions(
+                    uncached_genes)
+            else:
+                wrong_predictions = count_wrong_predictions(
+                    uncached_genes, *self.get_fitness_matrices(fitness_input))
+
+            fitness_values[uncached_indexes] = self.get_fitness_percentage(
+                wrong_predictions, len(fitness_input))
+
+            for index in uncached_indexes:
+                self.cache_fitness(
+                    cache_keys[index], float(fitness_values[index]))
+
+        return fitness_values
+
+    def get_population_margins(self, population, genes):
+        """Retorna a margem (pontuação de casa - pontuação de fora) de cada indivíduo em
+        cada partida. Se a população veio do reproduce_population_vectorized as margens
+        já foram atualizadas lá; senão, ou a cada margin_refresh_interval gerações para
+        não acumular erro de arredondamento, elas são calculadas do zero.
+
+        Args:
+            population (list): A população com cromossomos
+            genes (np.ndarray): A mesma população em formato de array
+
+        Returns:
+            np.ndarray: Uma linha por indivíduo e uma coluna por partida
+        """
+
+        if(population is self.margins_population and self.margin_generations < self.margin_refresh_interval):
+            self.margin_generations += 1
+            return self.population_margins
+
+        self.margin_generations = 0
+        stat_differences = self.fitness_input.get_stat_differences()
+
+        return genes[:, :stat_differences.shape[1]] @ stat_differences.T
+
+    def update_children_margins(self, children, child_parents, ranked_genes):
+        """Calcula as margens dos filhos a partir das margens dos pais. Cada filho parte
+        das margens do pai do qual ele tem mais genes, e para cada gene diferente soma
+        (diferença do gene x coluna daquela estatística), então o custo é proporcional à
+        quantidade de genes que mudaram e não ao tamanho do cromossomo.
+
+        Args:
+            children (np.ndarray): Um filho por linha
+            child_parents (np.ndarray): Os índices (no ranking) dos dois pais de cada filho
+            ranked_genes (np.ndarray): Os genes da população ordenada
+
+        Returns:
+            np.ndarray: As margens de cada filho em cada partida
+        """
+
+        stat_differences = self.fitness_input.get_stat_differences()
+        used_genes = stat_differences.shape[1]
+
+        changed_genes = [np.count_nonzero(children[:, :used_genes] != ranked_genes[child_parents[:, parent], :used_genes], axis=1)
+                         for parent in range(2)]
+        closest_parents = child_parents[np.arange(len(children)),
+                                        np.argmin(changed_genes, axis=0)]
+
+        gene_deltas = children[:, :used_genes] - \
+            ranked_genes[closest_parents, :used_genes]
+        children_margins = self.ranked_margins[closest_parents]
+
+        for gene_index in range(used_genes):
+            changed_children = np.nonzero(gene_deltas[:, gene_index])[0]
+            if(len(changed_children) > 0):
+                children_margins[changed_children] += gene_deltas[changed_children, gene_index, None] * \
+                    stat_differences[:, gene_index]
+
+        return children_margins
+
+    def start_fitness_pool(self):
+        """Cria o pool de processos do fitness na primeira vez que ele for necessário.
+        Se não for possível criar o pool, o algoritmo continua calculando o fitness
+        em um processo só.
+
+        Returns:
+            bool: True se o fitness deve ser calculado pelo pool
+        """
+
+        if(self.fitness_pool is None and self.workers > 1):
+            try:
+                self.fitness_pool = FitnessPool(
+                    self.fitness_input, self.workers)
+            except (OSError, ValueError) as e:
+                print(
+                    f"Could not start {self.workers} fitness workers ({e}); running serially.")
+                self.workers = 1
+
+        return self.fitness_pool is not None
+
+    def close_fitness_pool(self):
+        """Encerra os processos do fitness e libera a memória compartilhada"""
+
+        if(self.fitness_pool is not None):
+            self.fitness_pool.close()
+            self.fitness_pool = None
+
+    def get_fitness_cache_key(self, chromosome, fitness_input):
+        """Gera a chave do cache de fitness: o fingerprint das partidas seguido dos bytes
+        dos genes, então dois cromossomos só dividem a chave se forem idênticos
+
+        Args:
+            chromosome (list): O cromossomo avaliado
+            fitness_input (MatchFeatureMatrix): As partidas usadas na avaliação
+
+        Returns:
+            bytes: A chave do cromossomo no cache, ou None se o cache estiver desativado
+        """
+
+        if(self.fitness_cache_size <= 0):
+            return None
+
+        return fitness_input.get_fingerprint() + np.asarray(chromosome, dtype=float).tobytes()
+
+    def get_cached_fitness(self, cache_key):
+        """Procura um fitness no cache, marcando ele como usado recentemente
+
+        Returns:
+            float: O fitness guardado, ou None se a chave não estiver no cache
+        """
+
+        if(cache_key is None):
+            return None
+
+        fitness_value = self.fitness_cache.get(cache_key)
+
+        if(fitness_value is None):
+            self.fitness_cache_misses += 1
+        else:
+            self.fitness_cache_hits += 1
+            self.fitness_cache.move_to_end(cache_key)
+
+        return fitness_value
+
+    def cache_fitness(self, cache_key, fitness_value):
+        """Guarda um fitness no cache, descartando o usado há mais tempo se o cache estiver cheio"""
+
+        if(cache_key is None):
+            return
+
+        self.fitness_cache[cache_key] = fitness_value
+        self.fitness_cache.move_to_end(cache_key)
+
+        while(len(self.fitness_cache) > self.fitness_cache_size):
+            self.fitness_cache.popitem(last=False)
+
+    def get_fitness_matrices(self, fitness_input):
+        """Retorna as matrizes usadas por apply_fitness_batched. As diferenças das
+        estatísticas ficam guardadas no próprio MatchFeatureMatrix, então só são calculadas
+        na primeira geração.
+
+        Args:
+            fitness_input (MatchFeatureMatrix): As partidas usadas para avaliar os cromossomos
+
+        Returns:
+            (np.ndarray, np.ndarray): Diferença entre as estatísticas de casa e fora de cada
+            partida e se o time de casa ganhou cada partida
+        """
+
+        if(not isinstance(fitness_input, MatchFeatureMatrix)):
+            fitness_input = MatchFeatureMatrix.from_match_list(fitness_input)
+
+        return fitness_input.get_stat_differences(), fitness_input.get_home_won_mask()
+
     def calculate_fitness(self, chromosome: list, match_data: dict):
         """Calcula o valor de fitness de um cromossomo.
         Obs.: Por enquanto tá extremamente mal otimizado
@@ -190,7 +569,7 @@ class GeneticAlgorithm:
 
         Args:
             chromosome (list): O cromossomo a ser avaliado;
-            match_data (dict): Os dados verdadeiros dos jogos para comparar com o cromossomo;
+            match_data (MatchFeatureMatrix): Os dados verdadeiros dos jogos para comparar com o cromossomo;
 
         Returns:
             fitness (int): O fitness do cromossomo, equivalente à porcentagem de partidas acertadas;
@@ -203,44 +582,62 @@ class GeneticAlgorithm:
         for current_match in match_data:
             predicted_1q_winner = self.predict_match(chromosome, current_match)[
                 "predicted_1q_winner"]
-            real_1q_winner = "team_home" if current_match["home_won"] else "team_away"
+            real_1q_winner = "team_home" if current_match.home_won[0] == 1 else "team_away"
 
             # 1 se for True, 0 se for False
             wrong_predictions += int(real_1q_winner != predicted_1q_winner)
 
-        fitness_value = ((self.fitness_input_size -
-                          wrong_predictions) * 100)/self.fitness_input_size
+        fitness_value = self.get_fitness_percentage(
+            wrong_predictions, self.fitness_input_size)
 
         return fitness_value
 
+    @staticmethod
+    def get_fitness_percentage(wrong_predictions, match_amount):
+        """Converte a quantidade de previsões erradas na porcentagem de acertos
+
+        Args:
+            wrong_predictions (int ou np.ndarray): Previsões erradas de cada cromossomo
+            match_amount (int): Quantidade de partidas avaliadas
+
+        Returns:
+            float ou np.ndarray: O fitness, ou 0 se não tiver nenhuma partida
+        """
+
+        if(match_amount == 0):
+            return wrong_predictions * 0.0
+
+        return ((match_amount - wrong_predictions) * 100)/match_amount
+
     def predict_match(self, chromosome, current_match):
-        home_team_stats = current_match["team_home"]
-        home_team_parsed_stats = []
-        for gene_index, stats in enumerate(home_team_stats):
-            try:
-                home_team_parsed_stats.append(
-                    home_team_stats[stats] * chromosome[gene_index])
+        """Calcula a pontuação de cada time de uma partida segundo os pesos de um cromossomo
 
-            except TypeError:
-                home_team_parsed_stats.append(chromosome[gene_index])
+        Args:
+            chromosome (list): Os pesos usados para calcular as pontuações
+            current_match (MatchFeatureMatrix): A partida a ser prevista. Dicionários no formato
+            {"team_home", "team_away"} são convertidos
 
-        away_team_stats = current_match["team_away"]
-        away_team_parsed_stats = []
-        for gene_index, stats in enumerate(away_team_stats):
-            try:
-                away_team_parsed_stats.append(
-                    away_team_stats[stats] * chromosome[gene_index])
-            except TypeError:
-                away_team_parsed_stats.append(chromosome[gene_index])
+        Returns:
+            dict: O time previsto como vencedor, a pontuação de cada time e a diferença entre elas
+        """
 
-        home_team_score = sum(home_team_parsed_stats)
-        away_team_score = sum(away_team_parsed_stats)
+        if(not isinstance(current_match, MatchFeatureMatrix)):
+            current_match = MatchFeatureMatrix.from_match(current_match)
+
+        used_genes = min(len(chromosome), current_match.stat_count)
+        weights = np.asarray(chromosome[:used_genes], dtype=float)
+
+        home_team_score = float(
+            current_match.get_home_stats()[0, :used_genes] @ weights)
+        away_team_score = float(
+            current_match.get_away_stats()[0, :used_genes] @ weights)
         score_difference = abs(home_team_score - away_team_score)
 
         predicted_1q_winner = "team_home" if home_team_score > away_team_score else "team_away"
 
         higher_score = home_team_score if predicted_1q_winner == "team_home" else away_team_score
-        score_difference_percentage = (100 * score_difference)/higher_score
+        # Um cromossomo zerado (ou estatísticas zeradas) empata em 0 a 0
+        score_difference_percentage = (100 * score_difference)/higher_score if higher_score != 0 else 0.0
 
         prediction_results = {
             "predicted_1q_winner": predicted_1q_winner,
@@ -264,6 +661,9 @@ class GeneticAlgorithm:
             [list]: Uma lista com novos indivíduos após a reprodução ter acontecido.
         """
 
+        if(self.vectorized_reproduction):
+            return self.reproduce_population_vectorized(ranked_population, population_size)
+
         reproduced_population = []
 
         for _ in range(int((population_size - self.persistent_individuals - self.random_individuals)/2)):
@@ -282,6 +682,122 @@ class GeneticAlgorithm:
 
         return reproduced_population
 
+    def reproduce_population_vectorized(self, ranked_population: list, population_size: int):
+        """Mesma coisa que reproduce_population, mas fazendo cada etapa para a geração
+        inteira de uma vez: todos os pais são sorteados juntos, e o crossover e a mutação
+        são feitos em arrays com um filho por linha. Os indivíduos persistentes e aleatórios
+        continuam sendo adicionados no final, na mesma ordem.
+
+        Args:
+            ranked_population (list): Uma lista de indivíduos com seus pesos
+            population_size (int): O tamanho desejado para a população.
+
+        Returns:
+            [list]: Uma lista com novos indivíduos após a reprodução ter acontecido.
+
+        Complexidade: O(p*log(p) + p*c)
+            p = Tamanho da população
+            c = Tamanho de cada cromossomo
+        """
+
+        pair_amount = int((population_size - self.persistent_individuals -
+                           self.random_individuals)/2)
+        ranked_genes = np.asarray([individual for individual, _ in ranked_population],
+                                  dtype=float)
+
+        parent_indexes = self.weighted_choices(
+            ranked_population, 2 * pair_amount)
+        children = self.crossover_population(ranked_genes[parent_indexes[0::2]],
+                                             ranked_genes[parent_indexes[1::2]])
+        children = self.mutate_population(children)
+
+        persistent_genes = ranked_genes[:self.persistent_individuals]
+        random_genes = self.rng.uniform(self.weight_range[0], self.weight_range[1],
+                                        (self.random_individuals, self.chromosome_size))
+
+        reproduced_population = np.concatenate(
+            [children, persistent_genes, random_genes]).tolist()
+
+        if(self.incremental_fitness and ranked_population is self.margins_ranked_population):
+            child_parents = np.repeat(parent_indexes.reshape(-1, 2), 2, axis=0)
+            stat_differences = self.fitness_input.get_stat_differences()
+
+            self.population_margins = np.concatenate([
+                self.update_children_margins(
+                    children, child_parents, ranked_genes),
+                self.ranked_margins[:self.persistent_individuals],
+                random_genes[:, :stat_differences.shape[1]] @ stat_differences.T])
+            self.margins_population = reproduced_population
+
+        return reproduced_population
+
+    def weighted_choices(self, weighted_items, amount):
+        """Versão do weighted_choice que sorteia vários itens de uma vez. A soma acumulada
+        dos pesos é feita uma vez só e cada sorteio vira uma busca binária nela.
+
+        Args:
+            weighted_items ([list]): Uma lista contendo itens no formato (item, peso)
+            amount (int): Quantidade de sorteios
+
+        Returns:
+            np.ndarray: Os índices dos itens escolhidos dentro de weighted_items
+        """
+
+        cumulative_weights = np.cumsum([weight for _, weight in weighted_items])
+        elements = self.rng.uniform(0, cumulative_weights[-1], amount)
+
+        # Mesmo critério do weighted_choice: o primeiro item cuja soma acumulada passa do sorteio
+        chosen_indexes = np.searchsorted(
+            cumulative_weights, elements, side="right")
+
+        return np.minimum(chosen_indexes, len(weighted_items) - 1)
+
+    def crossover_population(self, parents1, parents2):
+        """Faz o crossover de cada par de pais (uma linha de cada array), com um ponto
+        de corte sorteado por par
+
+        Args:
+            parents1 (np.ndarray): Os primeiros pais de cada par
+            parents2 (np.ndarray): Os segundos pais de cada par
+
+        Returns:
+            np.ndarray: Os filhos, intercalados (filho 1 e filho 2 de cada par em sequência)
+        """
+
+        split_points = (self.rng.random(len(parents1)) *
+                        self.chromosome_size).astype(int)
+        from_first_parent = np.arange(
+            parents1.shape[1]) < split_points[:, None]
+
+        children = np.empty((2 * len(parents1), parents1.shape[1]))
+        children[0::2] = np.where(from_first_parent, parents1, parents2)
+        children[1::2] = np.where(from_first_parent, parents2, parents1)
+
+        return children
+
+    def mutate_population(self, chromosomes):
+        """Aplica a mutação em todos os genes de todos os cromossomos de uma vez,
+        com as mesmas regras do mutation
+
+        Args:
+            chromosomes (np.ndarray): Um cromossomo por linha
+
+        Returns:
+            np.ndarray: Os cromossomos após terem passado pelo processo de mutação
+        """
+
+        mutation_happening = self.rng.random(
+            chromosomes.shape) * 100 < self.mutation_chance
+        mutations = self.rng.uniform(self.mutation_magnitude[0], self.mutation_magnitude[1],
+                                     chromosomes.shape) * mutation_happening
+        mutated_chromosomes = chromosomes + mutations
+
+        # Mutação vira 0 se o cromossomo tiver atingido o limite de peso
+        inside_weight_range = (self.weight_range[0] <= mutated_chromosomes) & \
+            (mutated_chromosomes <= self.weight_range[1])
+
+        return np.where(inside_weight_range, mutated_chromosomes, chromosomes)
+
     @staticmethod
     def weighted_choice(weighted_items):
         """Escolhe um item dentro de uma lista com os itens e seus pesos,
@@ -381,11 +897,14 @@ class GeneticAlgorithm:
         log_file.write(f"\n\t\tmax_generations: {self.max_generations}")
         log_file.write(
             f"\n\t\tconsecutive_good_generations: {self.consecutive_good_generations}")
+        log_file.write(f"\n\t\tfitness_cache_size: {self.fitness_cache_size}")
+        log_file.write(f"\n\t\tfitness_cache_hits: {self.fitness_cache_hits}")
+        log_file.write(
+            f"\n\t\tfitness_cache_misses: {self.fitness_cache_misses}")
         log_file.write(
             f"\n\tGenetic Algorithm Output:\n\tFinal Score: {self.ranked_population[0][1]}%")
         log_file.write(f"\n\tHighest Fitness: {self.highest_fitness}")
-        match_data = self.fitness_input[0]
-        for index, stat in enumerate(match_data["team_home"]):
+        for index, stat in enumerate(self.fitness_input.stat_columns):
             try:
                 log_file.write(
                     f"\n\t\t{stat}: {self.ranked_population[0][0][index]}")
@@ -393,23 +912,15 @@ class GeneticAlgorithm:
                 pass
         log_file.close()
         self.last_generation.dump(self.population)
+        self.generation_metrics.flush()
 
     def add_gen_info_to_json(self):
-        try:
-            json_file = open(
-                join(Path(__file__).resolve().parent.parent.parent.parent, "data", "json", "gen", "genetic_algorithm.json"), "r")
-            data = json.load(json_file)
-
-            current_generation_data = {
-                "best_fitness": self.ranked_population[0][1],
-                "current_generation": self.current_generation
-            }
-
-            data.append(current_generation_data)
-        except FileNotFoundError:
-            data = []
-        json_file = open(
-            join(Path(__file__).resolve().parent.parent.parent.parent, "data", "json", "gen", "genetic_algorithm.json"), "w+")
-
-        json.dump(data, json_file, indent=4)
-        json_file.close()
+        """Acrescenta as métricas da geração atual no arquivo de métricas desta execução
+        (data/json/gen/<timestamp>.jsonl). A escrita é feita em blocos pelo Generation_Metrics.
+        """
+
+        self.generation_metrics.append({
+            "best_fitness": self.ranked_population[0][1],
+            "highest_fitness": self.highest_fitness,
+            "current_generation": self.current_generation
+        })
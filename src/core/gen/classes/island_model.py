@@ -0,0 +1,210 @@
+from multiprocessing import Process, Queue
+from datetime import datetime
+import random
+import signal
+import time
+import numpy as np
+from core.gen.classes.genetic_algorithm import GeneticAlgorithm
+
+
+def run_island(island_index, fitness_input, ga_params, migration_interval, migrant_amount, seed,
+               command_queue, report_queue):
+    """Roda o algoritmo genético de uma ilha em um processo separado. A cada
+    migration_interval gerações a ilha manda um relatório com seus melhores indivíduos
+    para o processo principal e espera a resposta, que pode ser os migrantes da ilha
+    vizinha ou a ordem de parar.
+
+    Args:
+        island_index (int): Número da ilha
+        fitness_input (MatchFeatureMatrix): As partidas usadas para avaliar os cromossomos
+        ga_params (dict): Parâmetros repassados para o GeneticAlgorithm
+        migration_interval (int): Quantidade de gerações entre cada migração
+        migrant_amount (int): Quantidade de indivíduos enviados para a ilha vizinha
+        seed (int): Semente do random desta ilha
+        command_queue (Queue): Fila com as mensagens do processo principal para esta ilha
+        report_queue (Queue): Fila compartilhada pelas ilhas para mandar relatórios
+    """
+
+    # Quem trata o Ctrl+C é o processo principal, que manda as ilhas pararem
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    random.seed(seed)
+
+    gen_alg = GeneticAlgorithm(fitness_input, **ga_params)
+    gen_alg.population = gen_alg.get_first_generation()
+    generation = 0
+
+    while True:
+        is_island_finished = False
+
+        for _ in range(min(migration_interval, gen_alg.max_generations - generation)):
+            gen_alg.current_generation = generation
+            gen_alg.ranked_population = gen_alg.apply_fitness(
+                gen_alg.population, gen_alg.fitness_input)
+
+            if(gen_alg.ranked_population[0][1] > gen_alg.highest_fitness):
+                gen_alg.highest_fitness = gen_alg.ranked_population[0][1]
+
+            generation += 1
+
+            if(gen_alg.check_for_break(gen_alg.ranked_population)):
+                is_island_finished = True
+                break
+
+            gen_alg.population = gen_alg.reproduce_population(
+                gen_alg.ranked_population, gen_alg.population_size)
+
+        is_island_finished = is_island_finished or generation >= gen_alg.max_generations
+
+        report_queue.put(("report", island_index, {
+            "generation": generation,
+            "best_fitness": gen_alg.ranked_population[0][1],
+            "highest_fitness": gen_alg.highest_fitness,
+            "migrants": [individual for individual, _ in gen_alg.ranked_population[:migrant_amount]],
+            "finished": is_island_finished
+        }))
+
+        command, migrants = command_queue.get()
+        if(command == "stop"):
+            break
+
+        # Os migrantes ocupam o lugar dos últimos indivíduos (os aleatórios) da próxima geração
+        if(len(migrants) > 0):
+            gen_alg.population = gen_alg.population[:-len(migrants)] + migrants
+
+    report_queue.put(("final", island_index, {
+        "ranked_population": gen_alg.ranked_population,
+        "highest_fitness": gen_alg.highest_fitness,
+        "generation": gen_alg.current_generation,
+        "consecutive_good_generations": gen_alg.consecutive_good_generations
+    }))
+
+
+class IslandModel:
+    """Roda várias populações do algoritmo genético (ilhas) em processos separados,
+    trocando os melhores indivíduos entre elas em um anel (a ilha i manda para a i+1)
+    a cada migration_interval gerações. As ilhas sincronizam a cada migração, então
+    com a mesma semente o resultado é sempre o mesmo.
+
+        Args:
+            fitness_input (MatchFeatureMatrix): As partidas usadas para avaliar os cromossomos
+            islands (int, optional): Quantidade de ilhas (processos). Defaults to 4.
+            migration_interval (int, optional): Quantidade de gerações entre cada migração. Defaults to 10.
+            migrants (int, optional): Quantidade de indivíduos que cada ilha manda para a vizinha. Defaults to 2.
+            seed (int, optional): Semente usada para gerar a semente de cada ilha. Defaults to None.
+            timestamp (datetime, optional): Momento em que o algoritmo foi iniciado. Defaults to -1.
+            ga_params: Os outros parâmetros são repassados para o GeneticAlgorithm de cada ilha
+    """
+
+    def __init__(self, fitness_input, islands=4, migration_interval=10, migrants=2, seed=None, timestamp=-1,
+                 **ga_params):
+        self.fitness_input = fitness_input
+        self.islands = islands
+        self.migration_interval = max(1, migration_interval)
+        self.migrants = migrants
+        self.seed = seed
+        self.timestamp = timestamp
+        self.ga_params = ga_params
+
+        self.island_reports = [{} for _ in range(islands)]
+
+    def run(self):
+        """Inicia as ilhas, coordena as migrações até alguma ilha terminar e salva o resultado
+        da melhor ilha com GeneticAlgorithm.log_and_dump_data
+
+        Returns:
+            GeneticAlgorithm: Um GeneticAlgorithm com a população ordenada da melhor ilha
+        """
+
+        island_seeds = [int(child_seed.generate_state(1)[0])
+                        for child_seed in np.random.SeedSequence(self.seed).spawn(self.islands)]
+        command_queues = [Queue() for _ in range(self.islands)]
+        report_queue = Queue()
+
+        processes = [Process(target=run_island, daemon=True,
+                             args=(island_index, self.fitness_input, self.ga_params, self.migration_interval,
+                                   self.migrants, island_seeds[island_index], command_queues[island_index],
+                                   report_queue))
+                     for island_index in range(self.islands)]
+
+        start_time = time.time()
+        for process in processes:
+            process.start()
+
+        try:
+            while True:
+                for _ in range(self.islands):
+                    _, island_index, report = report_queue.get()
+                    self.island_reports[island_index] = report
+
+                self.print_progress()
+
+                if(any(report["finished"] for report in self.island_reports)):
+                    break
+
+                for island_index in range(self.islands):
+                    neighbour_report = self.island_reports[island_index - 1]
+                    command_queues[island_index].put(
+                        ("migrate", neighbour_report["migrants"]))
+        except KeyboardInterrupt:
+            print("Stopping islands...")
+
+        for command_queue in command_queues:
+            command_queue.put(("stop", None))
+
+        # Ilhas que estavam no meio de uma migração ainda mandam um último relatório antes do final
+        final_reports = {}
+        while(len(final_reports) < self.islands):
+            message_type, island_index, report = report_queue.get()
+            if(message_type == "final"):
+                final_reports[island_index] = report
+
+        for process in processes:
+            process.join()
+
+        end_time = time.time()
+
+        return self.dump_best_island(final_reports, elapsed_time=end_time - start_time)
+
+    def print_progress(self):
+        for island_index, report in enumerate(self.island_reports):
+            print(
+                f"Island {island_index} | Generation {report['generation']} | Fitness: {report['best_fitness']}% | Highest: {report['highest_fitness']}%")
+
+        best_island = max(range(self.islands),
+                          key=lambda island_index: self.island_reports[island_index]["highest_fitness"])
+        print(
+            f"Best island: {best_island} | Highest fitness: {self.island_reports[best_island]['highest_fitness']}%")
+
+    def dump_best_island(self, final_reports, elapsed_time=-1):
+        """Monta um GeneticAlgorithm com a população da ilha com o melhor indivíduo, ordenada
+        do melhor para o pior, e salva com log_and_dump_data. Assim o primeiro cromossomo da
+        Last_Generation é o melhor de todas as ilhas.
+
+        Args:
+            final_reports (dict): O relatório final de cada ilha
+            elapsed_time (float, optional): Tempo que as ilhas demoraram para terminar. Defaults to -1.
+
+        Returns:
+            GeneticAlgorithm: O GeneticAlgorithm montado com a melhor ilha
+        """
+
+        best_island = max(final_reports,
+                          key=lambda island_index: final_reports[island_index]["ranked_population"][0][1])
+        best_report = final_reports[best_island]
+
+        print(f"Island {best_island} has the best chromosome.")
+
+        gen_alg = GeneticAlgorithm(
+            self.fitness_input, timestamp=self.timestamp, **self.ga_params)
+        gen_alg.ranked_population = best_report["ranked_population"]
+        gen_alg.population = [individual for individual,
+                              _ in best_report["ranked_population"]]
+        gen_alg.current_generation = best_report["generation"]
+        gen_alg.consecutive_good_generations = best_report["consecutive_good_generations"]
+        gen_alg.highest_fitness = max(report["highest_fitness"]
+                                      for report in final_reports.values())
+
+        gen_alg.log_and_dump_data(
+            timestamp=datetime.now(), elapsed_time=elapsed_time)
+
+        return gen_alg
@@ -0,0 +1,107 @@
+import json
+import os
+import random
+import tempfile
+import numpy as np
+from pathlib import Path
+from os.path import join
+from core.utils.generation_metrics_manager import Generation_Metrics
+
+
+class Checkpoint:
+    """Salva e restaura o estado de uma execução do algoritmo genético no meio do caminho,
+    para que ela possa continuar exatamente de onde parou. O estado fica em um .npz com a
+    população, a população ordenada da última geração, os contadores e o estado dos
+    geradores aleatórios (random e NumPy).
+
+        Args:
+            file_path (str): Caminho do arquivo do checkpoint
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    @classmethod
+    def from_timestamp(cls, timestamp):
+        """Cria um Checkpoint no caminho padrão de uma execução: data/bin/checkpoint-<timestamp>.npz"""
+
+        return cls(join(Path(__file__).resolve().parent.parent.parent,
+                        'data', 'bin', f'checkpoint-{timestamp}.npz'))
+
+    def dump(self, gen_alg, next_generation):
+        """Escreve o checkpoint em um arquivo temporário e só depois substitui o antigo,
+        então um programa morto no meio da escrita não corrompe o último checkpoint.
+
+        Args:
+            gen_alg (GeneticAlgorithm): O algoritmo genético, logo depois da reprodução
+            next_generation (int): A geração que vai ser avaliada em seguida
+        """
+
+        random_version, random_state, random_gauss = random.getstate()
+
+        checkpoint_data = {
+            "population": np.asarray(gen_alg.population, dtype=float),
+            "ranked_genes": np.asarray([individual for individual, _ in gen_alg.ranked_population], dtype=float),
+            "ranked_fitness": np.asarray([fitness for _, fitness in gen_alg.ranked_population], dtype=float),
+            "next_generation": np.int64(next_generation),
+            "highest_fitness": np.float64(gen_alg.highest_fitness),
+            "consecutive_good_generations": np.int64(gen_alg.consecutive_good_generations),
+            "random_version": np.int64(random_version),
+            "random_state": np.asarray(random_state, dtype=np.uint32),
+            "random_gauss": np.float64(np.nan if random_gauss is None else random_gauss),
+            "numpy_random_state": np.array(json.dumps(gen_alg.rng.bit_generator.state)),
+            "timestamp": np.array(gen_alg.timestamp)
+        }
+
+        gen_alg.generation_metrics.flush()
+
+        checkpoint_directory = os.path.dirname(self.file_path)
+        with tempfile.NamedTemporaryFile(dir=checkpoint_directory, suffix=".npz.tmp", delete=False) as checkpoint_file:
+            try:
+                np.savez_compressed(checkpoint_file, **checkpoint_data)
+                checkpoint_file.flush()
+                os.fsync(checkpoint_file.fileno())
+            except Exception:
+                os.remove(checkpoint_file.name)
+                raise
+
+        os.replace(checkpoint_file.name, self.file_path)
+        print(f"Checkpoint saved at {self.file_path}")
+
+    def load(self, gen_alg):
+        """Restaura o estado salvo em um algoritmo genético recém criado
+
+        Args:
+            gen_alg (GeneticAlgorithm): O algoritmo genético que vai continuar a execução
+
+        Returns:
+            int: A geração a partir da qual o algoritmo deve continuar
+        """
+
+        with np.load(self.file_path) as checkpoint_data:
+            gen_alg.population = checkpoint_data["population"].tolist()
+            gen_alg.ranked_population = list(zip(checkpoint_data["ranked_genes"].tolist(),
+                                                 checkpoint_data["ranked_fitness"].tolist()))
+            gen_alg.highest_fitness = float(
+                checkpoint_data["highest_fitness"])
+            gen_alg.consecutive_good_generations = int(
+                checkpoint_data["consecutive_good_generations"])
+
+            random_gauss = float(checkpoint_data["random_gauss"])
+            random.setstate((int(checkpoint_data["random_version"]),
+                             tuple(int(value)
+                                   for value in checkpoint_data["random_state"]),
+                             None if np.isnan(random_gauss) else random_gauss))
+            gen_alg.rng.bit_generator.state = json.loads(
+                str(checkpoint_data["numpy_random_state"]))
+
+            # Continua escrevendo as métricas no arquivo da execução original
+            gen_alg.timestamp = str(checkpoint_data["timestamp"])
+            gen_alg.generation_metrics = Generation_Metrics(gen_alg.timestamp)
+
+            next_generation = int(checkpoint_data["next_generation"])
+
+        print(
+            f"Resuming from {self.file_path} at generation {next_generation}")
+
+        return next_generation
@@ -0,0 +1,59 @@
+import json
+from pathlib import Path
+from os.path import join
+
+
+def get_generation_metrics_directory():
+    return join(Path(__file__).resolve().parent.parent.parent, 'data', 'json', 'gen')
+
+
+def read_generation_metrics(file_path):
+    """Lê um arquivo de métricas do algoritmo genético uma linha por vez, sem
+    carregar o arquivo inteiro. Uma linha cortada no final (ex.: o programa foi morto
+    no meio da escrita) é ignorada.
+
+    Args:
+        file_path (str): Caminho do arquivo .jsonl
+
+    Yields:
+        dict: As métricas de uma geração
+    """
+
+    with open(file_path, "r") as metrics_file:
+        for line in metrics_file:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+class Generation_Metrics:
+    """Guarda as métricas de cada geração em um arquivo JSON Lines próprio da execução
+    (data/json/gen/<timestamp>.jsonl). As linhas só são acrescentadas no final do arquivo,
+    em blocos de buffer_size, então o arquivo nunca é reescrito.
+
+        Args:
+            timestamp (str): Identificador da execução, usado como nome do arquivo
+            buffer_size (int, optional): Quantidade de gerações guardadas em memória antes de escrever. Defaults to 20.
+    """
+
+    def __init__(self, timestamp, buffer_size=20):
+        self.file_path = join(
+            get_generation_metrics_directory(), f"{timestamp}.jsonl")
+        self.buffer_size = buffer_size
+        self.buffer = []
+
+    def append(self, generation_data):
+        self.buffer.append(json.dumps(generation_data))
+
+        if(len(self.buffer) >= self.buffer_size):
+            self.flush()
+
+    def flush(self):
+        if(len(self.buffer) == 0):
+            return
+
+        with open(self.file_path, "a") as metrics_file:
+            metrics_file.write("\n".join(self.buffer) + "\n")
+
+        self.buffer.clear()
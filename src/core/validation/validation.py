@@ -6,7 +6,7 @@ import json
 from datetime import datetime
 import time
 from core.gen.classes.genetic_algorithm import GeneticAlgorithm
-from data.utils import data_provider
+from data.utils import dataset_cache
 
 
 class Validation():
@@ -14,10 +14,12 @@ class Validation():
     e salvar esses dados para uso posterior.
     """
 
-    def __init__(self, test_cycles=5, date=[2018, 6, 20]) -> None:
+    def __init__(self, test_cycles=5, date=[2018, 6, 20], fitness_input=None) -> None:
         self.date = date
 
-        self.fitness_input = data_provider.get_matches_averages_by_season(date)
+        # Um MatchFeatureMatrix já pronto evita buscar a season no banco de novo
+        self.fitness_input = fitness_input if fitness_input is not None else \
+            dataset_cache.get_match_feature_matrix_by_season(date)
 
         self.test_cycles = test_cycles
 
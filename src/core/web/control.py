@@ -1,69 +1,49 @@
 import core.web.functions as ws_functions
 import data.utils.manipulation as db
+import core.web.pipeline as pipeline
+from core.web.http_fetcher import DEFAULT_REQUESTS_PER_MINUTE
 
 
-id_items_to_collect = ['mp', 'fg', 'fga', 'fg_pct', 'fg3', 'fg3a', 'fg3_pct', 'ft',
-                       'fta', 'ft_pct', 'orb', 'drb', 'trb', 'ast', 'stl', 'blk', 'tov', 'pf', 'pts']
-names_items_to_collect = ['minutes_played',	'field_goals',	'field_goal_attempts',	'field_goal_percentage',	'3point_field_goals',	'3point_field_goal_attempts',	'3point_field_goals_percentage',
-                          'free_throws',	'free_throw_attempts',	'free_throw_percentage',	'offensive_rebounds',	'defensive_rebounds',	'total_rebounds',	'assists',	'steals',	'blocks',	'turnover', 'personal_faults',	'points']
-lista = []
-game_data = []
+def activate_web_scraping(base_url=None, fetch_workers=4, parse_workers=2, requests_per_minute=None):
+    """Coleta as partidas dos dias que ainda não estão no banco, do dia seguinte ao último
+    até ontem, com o ScrapingPipeline
 
+    Args:
+        base_url (str, optional): Endereço do site. Defaults to None (pipeline.DEFAULT_BASE_URL).
+        fetch_workers (int, optional): Threads baixando páginas. Defaults to 4.
+        parse_workers (int, optional): Threads lendo o HTML. Defaults to 2.
+        requests_per_minute (float, optional): Limite de requisições ao site. Defaults to None
+            (http_fetcher.DEFAULT_REQUESTS_PER_MINUTE).
 
-def activate_web_scraping():
-    # prepara o driver
-    driver = ws_functions.setup_firefox_driver(False)
+    Returns:
+        int: Quantidade de partidas inseridas
+    """
 
-    # cria uma lista de listas de datas ex: [[dia,mes,ano],[dia,mes,ano],[dia,mes,ano],...]]
+    # cria uma lista de listas de datas ex: [[ano,mes,dia],[ano,mes,dia],[ano,mes,dia],...]]
     date_list = ws_functions.generate_date_list()
 
-    # para cada dia da lista de datas, busca as informações dos jogos que tiveram
-    for date in date_list:
-        date_url = ws_functions.generate_day_url(date)
+    scraping_pipeline = pipeline.ScrapingPipeline(base_url=base_url or pipeline.DEFAULT_BASE_URL,
+                                                  fetch_workers=fetch_workers, parse_workers=parse_workers,
+                                                  requests_per_minute=requests_per_minute or DEFAULT_REQUESTS_PER_MINUTE)
 
-        driver.get(date_url)
+    return scraping_pipeline.run(date_list)
 
-        print('---------D-A-Y---------')
-        print(f'{date[0]}/{date[1]}/{date[2]}')
 
-        match_amount = ws_functions.get_match_amount(driver)
-        print(f'Matches: {match_amount}')
-
-        if match_amount:
-            for item in range(match_amount):
-                ws_functions.access_1q_in_box_score(driver, date_url, item)
-                team_names, team_tables = ws_functions.get_team_table_names(
-                    driver)
-
-                print('-- match ---')
-
-                # Aqui em algum lugar vai ter que ter a função de inserir o match
-                for i in range(2):
-                    team_is_home = not i
-                    team_name = team_names[i].get_text()
-
-                    print(f'{team_is_home} - {team_name}')
-
-                    # posteriormente se tornará participation_id
-                    lista.append(0)
-                    lista.append(db.retrieve_team_id_from_abv((team_name,))[0])
-                    lista.append(team_name)
-                    lista.append(team_is_home)
-                    for item in range(len(id_items_to_collect)):
-                        collected_value = ws_functions.get_table_values(
-                            team_tables[i],  id_items_to_collect[item])  # casa
-
-                        lista.append(collected_value)
-
-                    game_data.append(lista.copy())
-                    lista.clear()
+def format_and_insert_team_data(game_data, date):
+    db.insert_games([format_team_data(game_data, date)])
 
-                format_and_insert_team_data(game_data, date)
 
-    driver.quit()
+def format_team_data(game_data, date):
+    """Converte os valores de texto coletados dos dois times de uma partida para os tipos
+    do banco e calcula quem ganhou
 
+    Args:
+        game_data (list): As duas participações coletadas (casa e fora). A lista é esvaziada no final.
+        date (list): Data da partida no formato [ano, mês, dia]
 
-def format_and_insert_team_data(game_data, date):
+    Returns:
+        tuple: (participação da casa, participação de fora, data), no formato do db.insert_games
+    """
     is_team_home = False
     # função que passa em todos de todos
     for team_part_index in range(len(game_data)):
@@ -119,27 +99,16 @@ def format_and_insert_team_data(game_data, date):
     finally:
         game_data[0].append(int(is_current_team_winner))
 
-    match_list = []
-
-    game_data[0][0] = (db.create_id_participation())
-    db.insert_participation_data([game_data[0]])
-    game_data[1][0] = (db.create_id_participation())
-    db.insert_participation_data([game_data[1]])
-
     print([game_data[0]])
     print([game_data[1]])
 
-    # fk_participation_home INTEGER NOT NULL, criar função para criar os ids
-    match_list.append(game_data[0][0])
-    # fk_participation_away INTEGER NOT NULL, criar função para criar os ids
-    match_list.append(game_data[1][0])
-    # date DATE NOT NULL,  date
-    match_list.append(db.get_datetime(date))
-
-    db.insert_match_data([match_list])
+    formatted_game = (game_data[0].copy(), game_data[1].copy(),
+                      str(db.get_datetime(date)))
 
     game_data.clear()
 
+    return formatted_game
+
 
 if __name__ == "__main__":
     pass
@@ -0,0 +1,205 @@
+'''
+Servidor HTTP local que faz o papel do basketball-reference para testar o web scraping sem
+internet. Serve páginas salvas em uma pasta, com os mesmos endereços do site:
+
+- /boxscores/?month=..&day=..&year=.. -> boxscores/index-YYYY-MM-DD.html
+- /boxscores/<id da partida>.html -> boxscores/<id da partida>.html
+
+O save_fixture_pages gera essas páginas a partir das partidas que já estão no banco, só com as
+partes que o core.web.parsing lê, então dá para coletar as partidas de volta e comparar.
+
+O servidor aceita keep-alive (HTTP/1.1) e pode atrasar cada conexão nova e cada requisição, para
+imitar a distância até o site de verdade no benchmarks/scrape_benchmark.py.
+
+Para rodar: python -m core.web.fixture_server <data inicial> <data final> [porta], de dentro do src
+'''
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from os.path import join
+from urllib.parse import urlsplit, parse_qs
+import data.utils.manipulation as db
+from core.web.parsing import id_items_to_collect
+from data.utils.connection_provider import get_read_connection
+
+
+def render_day_page(box_score_links):
+    match_summaries = "".join(f"""
+        <div class="game_summary expanded nohover">
+            <p class="links"><a href="{box_score_link}">Box Score</a></p>
+        </div>""" for box_score_link in box_score_links)
+
+    return f"""<html><body><div id="content">{match_summaries}
+    </div></body></html>"""
+
+
+def render_box_score_page(teams):
+    """Gera um box score com o scorebox e as tabelas do primeiro quarto
+
+    Args:
+        teams (list): [(nome, abreviação, valores)] do time de fora e depois do de casa, com os
+            valores na ordem do id_items_to_collect
+    """
+
+    team_names = "".join(f"""
+        <div><strong><a itemprop="name" href="/teams/{team_abv}/">{team_name}</a></strong></div>"""
+                         for team_name, team_abv, _ in teams)
+
+    team_tables = "".join(f"""
+        <table id="box-{team_abv}-q1-basic"><tfoot><tr><th>Team Totals</th>{"".join(
+            f'<td data-stat="{collectable_value}">{value}</td>' for collectable_value, value in zip(id_items_to_collect, values))}
+        </tr></tfoot></table>""" for _, team_abv, values in teams)
+
+    return f"""<html><body><div id="content">
+        <div class="scorebox">{team_names}
+        </div>{team_tables}
+    </div></body></html>"""
+
+
+def format_value(value):
+    # O site mostra as porcentagens sem o zero na frente (ex.: .478)
+    if(isinstance(value, float)):
+        return f"{value:.3f}".lstrip("0") if value < 1 else f"{value:.3f}"
+
+    return str(value)
+
+
+def save_fixture_pages(directory, date_start, date_end):
+    """Salva as páginas de cada dia entre date_start e date_end (incluindo os dois), com os
+    box scores das partidas que o banco tem nesses dias
+
+    Args:
+        directory (str): Pasta onde as páginas vão ser salvas
+        date_start (str): Data inicial no formato YYYY-MM-DD
+        date_end (str): Data final no formato YYYY-MM-DD
+
+    Returns:
+        list: Os dias salvos, no formato [ano, mês, dia]
+    """
+
+    stat_columns = ", ".join(f"{participation}.{column}" for participation in ("pt_away", "pt_home") for column in (
+        "team_name", "minutes_played", "field_goals", "field_goals_attempts", "field_goals_percentage",
+        "three_point_field_goals", "three_point_field_goals_attempts", "three_point_field_goals_percentage",
+        "free_throws", "free_throws_attempts", "free_throws_percentage", "offensive_rebounds",
+        "defensive_rebounds", "total_rebounds", "assists", "steals", "blocks", "turnover",
+        "personal_faults", "points"))
+
+    try:
+        abbreviation_dict = db.get_teams_abbreviations()
+
+        cursor = get_read_connection().cursor()
+        cursor.execute(f"""
+            SELECT md.date, {stat_columns}
+            FROM match_data as md
+                INNER JOIN participation as pt_home On md.fk_participation_home = pt_home.participation_id
+                INNER JOIN participation as pt_away On md.fk_participation_away = pt_away.participation_id
+            WHERE md.date >= ? AND md.date <= ?
+            ORDER BY md.date ASC, md.match_id ASC""", (date_start, date_end))
+        day_matches = {}
+        for date, *stats in cursor.fetchall():
+            day_matches.setdefault(date, []).append(
+                [(stats[0], abbreviation_dict[stats[0]], [format_value(value) for value in stats[1:20]]),
+                 (stats[20], abbreviation_dict[stats[20]], [format_value(value) for value in stats[21:]])])
+    except Exception as e:
+        print(e)
+        raise e
+
+    os.makedirs(join(directory, "boxscores"), exist_ok=True)
+
+    date_list = []
+    date = datetime.strptime(date_start, "%Y-%m-%d")
+    while(date <= datetime.strptime(date_end, "%Y-%m-%d")):
+        date_string = date.strftime("%Y-%m-%d")
+
+        box_score_links = []
+        for match_index, teams in enumerate(day_matches.get(date_string, [])):
+            # No site é <data>0<time de casa>; o índice evita repetir o nome em dias com dois jogos do mesmo time
+            box_score_link = f"/boxscores/{date.strftime('%Y%m%d')}{match_index}{teams[1][1]}.html"
+            box_score_links.append(box_score_link)
+
+            with open(join(directory, box_score_link.lstrip("/")), "w") as page_file:
+                page_file.write(render_box_score_page(teams))
+
+        with open(join(directory, "boxscores", f"index-{date_string}.html"), "w") as page_file:
+            page_file.write(render_day_page(box_score_links))
+
+        date_list.append([date.year, date.month, date.day])
+        date += timedelta(days=1)
+
+    return date_list
+
+
+class FixtureServer:
+    """Servidor com as páginas de uma pasta, rodando em uma thread própria. Use com with:
+
+        with FixtureServer(directory) as base_url:
+            ScrapingPipeline(base_url=base_url).run(date_list)
+
+        Args:
+            directory (str): Pasta com as páginas do save_fixture_pages
+            port (int, optional): Porta do servidor. Defaults to 0 (qualquer porta livre).
+            request_latency (float, optional): Segundos de espera antes de cada resposta. Defaults to 0.
+            connection_latency (float, optional): Segundos de espera a cada conexão nova, como
+                o handshake TCP e TLS de um site de verdade. Defaults to 0.
+    """
+
+    def __init__(self, directory, port=0, request_latency=0, connection_latency=0):
+        class FixtureRequestHandler(SimpleHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Cabeçalho e corpo saem em dois send; com o Nagle, o segundo espera o ACK atrasado do cliente
+            disable_nagle_algorithm = True
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=directory, **kwargs)
+
+            def setup(self):
+                time.sleep(connection_latency)
+                super().setup()
+
+            def send_head(self):
+                time.sleep(request_latency)
+                return super().send_head()
+
+            def translate_path(self, path):
+                url = urlsplit(path)
+                if(url.path == "/boxscores/" and url.query):
+                    query = {key: int(value[0]) for key, value in parse_qs(url.query).items()}
+                    path = f"/boxscores/index-{query['year']:04}-{query['month']:02}-{query['day']:02}.html"
+
+                return super().translate_path(path)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), FixtureRequestHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self.base_url
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as fixture_directory:
+        saved_dates = save_fixture_pages(fixture_directory, sys.argv[1], sys.argv[2])
+        print(f"Saved {len(saved_dates)} days of pages to {fixture_directory}")
+
+        with FixtureServer(fixture_directory, int(sys.argv[3]) if len(sys.argv) > 3 else 8000) as base_url:
+            print(f"Serving at {base_url}, press Ctrl+C to stop")
+            try:
+                threading.Event().wait()
+            except KeyboardInterrupt:
+                pass
@@ -8,11 +8,7 @@
 import time
 import pandas as pd
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.firefox.options import Options
 import json
-from selenium import webdriver
-from selenium.webdriver.firefox.firefox_binary import FirefoxBinary
 import data.utils.manipulation as db
 from datetime import datetime as dt
 from core.utils.directory_manipulation import Directory
@@ -36,6 +32,11 @@ def setup_firefox_driver(show_scraping_window: bool):
         webdriver: O driver do firefox configurado e pronto para procurar elementos em sites
     """
 
+    # Importado só aqui: o scrape usa o HttpFetcher e não precisa do selenium instalado
+    from selenium import webdriver
+    from selenium.webdriver.firefox.options import Options
+    from selenium.webdriver.firefox.firefox_binary import FirefoxBinary
+
     binary = FirefoxBinary(
         'C:\\Program Files\\Mozilla Firefox\\firefox.exe' if name == 'nt' else '/usr/bin/firefox')
     option = Options()
@@ -113,18 +114,20 @@ def check_for_leap_year(year):
     return is_leap_year
 
 
-def generate_day_url(formatted_date):
+def generate_day_url(formatted_date, base_url="https://www.basketball-reference.com"):
     """Gera o URL para pegar os dados de partidas de determinado dia
 
     Args:
         formatted_date (list): A data desejada no formato de lista [dia, mês, ano]
+        base_url (str, optional): Endereço do site, trocado por um servidor local nos testes.
+            Defaults to "https://www.basketball-reference.com".
 
     Returns:
         str: A URL gerada a partir da data do input
     """
 
     day, month, year = formatted_date[2], formatted_date[1], formatted_date[0]
-    url = f"https://www.basketball-reference.com/boxscores/?month={month}&day={day}&year={year}"
+    url = f"{base_url}/boxscores/?month={month}&day={day}&year={year}"
 
     return url
 
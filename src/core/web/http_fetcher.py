@@ -0,0 +1,140 @@
+'''
+Busca das páginas do web scraping direto por HTTP, sem navegador. As conexões ficam abertas
+(keep-alive) em um pool do urllib3 e são reaproveitadas pelas threads do ScrapingPipeline, então
+só a primeira página de cada conexão paga o custo de abrir a conexão (e o TLS do https).
+
+O basketball-reference bloqueia quem faz mais de 20 requisições por minuto, por isso o
+RateLimiter espaça as requisições de todas as threads juntas, inclusive as tentativas de novo.
+'''
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import urllib3
+
+# Limite do site, em requisições por minuto
+DEFAULT_REQUESTS_PER_MINUTE = 20
+# Respostas tentadas de novo: muitas requisições e erros temporários do servidor
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class RateLimiter:
+    """Deixa passar no máximo requests_per_minute chamadas do wait por minuto, somando todas
+    as threads, com o mesmo intervalo entre elas
+
+        Args:
+            requests_per_minute (float): Limite de chamadas por minuto. None deixa tudo passar.
+    """
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60 / requests_per_minute if requests_per_minute else 0
+        self.next_request_time = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if(self.interval == 0):
+            return
+
+        # Cada thread reserva o seu horário dentro do lock e espera fora dele
+        with self.lock:
+            request_time = max(time.monotonic(), self.next_request_time)
+            self.next_request_time = request_time + self.interval
+
+        time.sleep(max(0, request_time - time.monotonic()))
+
+
+class HttpFetcher:
+    """Baixa páginas por um pool de conexões keep-alive. Pode ser passado como o fetch do
+    ScrapingPipeline e ser chamado por várias threads ao mesmo tempo.
+
+    Erros de conexão e as respostas 429 e 5xx são tentados de novo até retries vezes, esperando
+    cada vez mais entre as tentativas (backoff_factor * 2 ^ tentativa segundos) ou o tempo do
+    Retry-After que o site mandar, se for maior. As tentativas são feitas aqui e não pelo urllib3,
+    então cada uma também passa pelo RateLimiter.
+
+        Args:
+            requests_per_minute (float, optional): Limite do RateLimiter. Defaults to DEFAULT_REQUESTS_PER_MINUTE.
+            pool_size (int, optional): Conexões abertas por site. Defaults to 8.
+            retries (int, optional): Tentativas depois da primeira. Defaults to 3.
+            backoff_factor (float, optional): Base da espera entre as tentativas. Defaults to 2.
+            timeout (float, optional): Segundos esperando a conexão e cada leitura. Defaults to 30.
+    """
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, pool_size=8, retries=3,
+                 backoff_factor=2, timeout=30):
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.pool_manager = urllib3.PoolManager(
+            maxsize=pool_size,
+            retries=False,
+            timeout=urllib3.Timeout(connect=timeout, read=timeout),
+            headers={"User-Agent": "Mozilla/5.0"})
+
+    def __call__(self, url):
+        """Baixa uma página
+
+        Args:
+            url (str): Endereço da página
+
+        Returns:
+            str: O HTML da página
+        """
+
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.wait()
+
+            try:
+                response = self.pool_manager.request("GET", url)
+            except urllib3.exceptions.HTTPError:
+                if(attempt == self.retries):
+                    raise
+
+                time.sleep(self.get_backoff(attempt))
+                continue
+
+            if(response.status in RETRY_STATUSES and attempt < self.retries):
+                time.sleep(max(self.get_backoff(attempt), get_retry_after(response) or 0))
+                continue
+
+            if(response.status >= 400):
+                raise urllib3.exceptions.HTTPError(f"HTTP {response.status} for {url}")
+
+            return response.data.decode("utf-8")
+
+    def get_backoff(self, attempt):
+        return self.backoff_factor * 2 ** attempt
+
+    def close(self):
+        self.pool_manager.clear()
+
+
+def get_retry_after(response):
+    """Lê o Retry-After de uma resposta, que pode vir em segundos ou como uma data
+
+    Args:
+        response (urllib3.HTTPResponse): A resposta
+
+    Returns:
+        float: Segundos para esperar, ou None se o cabeçalho não existir ou for inválido
+    """
+
+    retry_after = response.headers.get("Retry-After")
+    if(retry_after is None):
+        return None
+
+    try:
+        return max(0, float(retry_after))
+    except ValueError:
+        pass
+
+    try:
+        retry_date = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+
+    # Datas HTTP são sempre em GMT
+    if(retry_date.tzinfo is None):
+        retry_date = retry_date.replace(tzinfo=timezone.utc)
+
+    return max(0, (retry_date - datetime.now(timezone.utc)).total_seconds())
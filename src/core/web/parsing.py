@@ -0,0 +1,60 @@
+'''
+Leitura do HTML das páginas do basketball-reference, sem navegador: recebe o texto da página
+e devolve só o que o web scraping guarda no banco.
+'''
+from bs4 import BeautifulSoup
+
+
+id_items_to_collect = ['mp', 'fg', 'fga', 'fg_pct', 'fg3', 'fg3a', 'fg3_pct', 'ft',
+                       'fta', 'ft_pct', 'orb', 'drb', 'trb', 'ast', 'stl', 'blk', 'tov', 'pf', 'pts']
+names_items_to_collect = ['minutes_played',	'field_goals',	'field_goal_attempts',	'field_goal_percentage',	'3point_field_goals',	'3point_field_goal_attempts',	'3point_field_goals_percentage',
+                          'free_throws',	'free_throw_attempts',	'free_throw_percentage',	'offensive_rebounds',	'defensive_rebounds',	'total_rebounds',	'assists',	'steals',	'blocks',	'turnover', 'personal_faults',	'points']
+
+
+def parse_day_page(html):
+    """Pega os links dos box scores das partidas de um dia
+
+    Args:
+        html (str): HTML da página do dia (/boxscores/?month=..&day=..&year=..)
+
+    Returns:
+        list: O endereço do box score de cada partida, na ordem do site. Vazia se não teve jogo no dia.
+    """
+
+    parsed_page = BeautifulSoup(html, 'html.parser')
+
+    box_score_links = []
+    for match_summary in parsed_page.find_all("div", {"class": "game_summary expanded nohover"}):
+        # O primeiro link do parágrafo é o do box score
+        box_score_links.append(match_summary.find("p").find("a")["href"])
+
+    return box_score_links
+
+
+def parse_box_score_page(html, abbreviation_dict):
+    """Coleta o nome dos times e os valores do rodapé das tabelas do primeiro quarto
+
+    Args:
+        html (str): HTML da página do box score
+        abbreviation_dict (dict): Nome do time -> abreviação usada no id das tabelas (db.get_teams_abbreviations)
+
+    Returns:
+        list: [(nome do time de casa, valores), (nome do time de fora, valores)], com os valores
+            em texto na ordem do id_items_to_collect
+    """
+
+    parsed_page = BeautifulSoup(html, 'html.parser')
+
+    team_name_scorebox = parsed_page.find("div", {"class": "scorebox"})
+    team_names = [team_name.get_text() for team_name in team_name_scorebox.find_all("a", {"itemprop": "name"})[:2]]
+
+    teams = []
+    for team_name in team_names:
+        team_table = parsed_page.find("table", {"id": f"box-{abbreviation_dict[team_name]}-q1-basic"})
+        foot_component = team_table.find("tfoot")
+
+        teams.append((team_name, [foot_component.find("td", {"data-stat": collectable_value}).get_text()
+                                  for collectable_value in id_items_to_collect]))
+
+    # inverte a lista pois no site primeiro vem o team_away, e queremos o home no começo
+    return teams[::-1]
@@ -0,0 +1,342 @@
+'''
+Web scraping em etapas, cada uma com as suas threads, ligadas por filas com tamanho máximo:
+
+    datas -> index -> fetch -> parse -> normalize -> write
+
+- index: baixa a página de cada dia e tira dela os links dos box scores
+- fetch: baixa o HTML dos box scores (pelo HttpFetcher, sem navegador)
+- parse: lê o nome dos times e as tabelas do primeiro quarto (core.web.parsing)
+- normalize: troca o nome do time pelo id e converte os valores (control.format_team_data)
+- write: a única thread que escreve no banco; junta as partidas e insere em blocos com o db.insert_games
+
+Como as filas têm tamanho máximo, uma etapa rápida espera a seguinte em vez de acumular páginas
+na memória. As etapas que só esperam a rede (index e fetch) podem ter várias threads.
+
+O write só insere um dia depois de todas as partidas dele e de todos os dias anteriores terem
+chegado. Se alguma etapa falhar em uma partida, o dia dela e os seguintes não são inseridos, então
+o banco nunca fica com um buraco no meio e a próxima execução continua do último dia inserido.
+'''
+import queue
+import threading
+import time
+from urllib.parse import urljoin
+from urllib.request import Request, urlopen
+import core.web.functions as ws_functions
+import data.utils.manipulation as db
+import core.web.control as control
+from core.web.parsing import parse_day_page, parse_box_score_page
+from core.web.http_fetcher import HttpFetcher, DEFAULT_REQUESTS_PER_MINUTE
+from data.utils.connection_provider import close_connection
+
+DEFAULT_BASE_URL = "https://www.basketball-reference.com"
+
+# Avisa as threads de uma etapa que a etapa anterior terminou
+STOP = object()
+
+
+def fetch_page(url, timeout=30):
+    """Baixa uma página, abrindo uma conexão nova a cada chamada. Sem limite de requisições;
+    usado para comparar com o HttpFetcher no benchmarks/scrape_benchmark.py.
+
+    Args:
+        url (str): Endereço da página
+        timeout (int, optional): Segundos esperando a resposta. Defaults to 30.
+
+    Returns:
+        str: O HTML da página
+    """
+
+    with urlopen(Request(url, headers={"User-Agent": "Mozilla/5.0"}), timeout=timeout) as response:
+        return response.read().decode("utf-8")
+
+
+class StageStats:
+    """Contadores de uma etapa, atualizados pelas threads dela
+
+        Args:
+            name (str): Nome da etapa
+            workers (int): Quantidade de threads da etapa
+    """
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0
+        self.max_queue_depth = 0
+        self.lock = threading.Lock()
+
+    def record(self, busy_seconds, queue_depth, processed=1, error=False):
+        with self.lock:
+            self.processed += 0 if error else processed
+            self.errors += error
+            self.busy_seconds += busy_seconds
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+
+    def report(self, elapsed_time):
+        return(f"{self.name:<10}{self.workers:>8}{self.processed:>8}{self.errors:>8}"
+               f"{self.processed / elapsed_time if elapsed_time else 0:>10.1f}"
+               f"{self.busy_seconds:>10.2f}{self.max_queue_depth:>10}")
+
+
+class Stage:
+    """Uma etapa do pipeline: workers threads tirando itens da input_queue, passando pelo work
+    e colocando o que ele devolver na output_queue. Quando a última thread termina, avisa a
+    etapa seguinte com um STOP para cada thread dela.
+
+        Args:
+            name (str): Nome da etapa, usado nos contadores
+            work (function): Recebe um item e devolve uma lista com os itens da próxima etapa
+            input_queue (queue.Queue): Fila de entrada
+            output_queue (queue.Queue): Fila de saída
+            workers (int): Quantidade de threads
+    """
+
+    def __init__(self, name, work, input_queue, output_queue, workers):
+        self.work = work
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.stats = StageStats(name, workers)
+        self.next_stage_workers = 1
+        self.running_workers = workers
+        self.running_workers_lock = threading.Lock()
+        self.threads = [threading.Thread(target=self.run_worker, name=f"{name}-{worker}", daemon=True)
+                        for worker in range(workers)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def run_worker(self):
+        try:
+            while True:
+                item = self.input_queue.get()
+                if(item is STOP):
+                    break
+
+                queue_depth = self.input_queue.qsize() + 1
+                start_time = time.perf_counter()
+                try:
+                    results = self.work(item)
+                except Exception as e:
+                    self.stats.record(time.perf_counter() - start_time, queue_depth, error=True)
+                    print(f"{self.stats.name} failed for {item[1]}: {e}")
+                    continue
+
+                self.stats.record(time.perf_counter() - start_time, queue_depth)
+                for result in results:
+                    self.output_queue.put(result)
+        finally:
+            # As conexões com o banco são de cada thread, então fecham junto com ela
+            close_connection()
+
+            with self.running_workers_lock:
+                self.running_workers -= 1
+                is_last_worker = self.running_workers == 0
+
+            if(is_last_worker):
+                for _ in range(self.next_stage_workers):
+                    self.output_queue.put(STOP)
+
+
+class ScrapingPipeline:
+    """Coleta as partidas de uma lista de dias e insere no banco
+
+        Args:
+            base_url (str, optional): Endereço do site. Defaults to DEFAULT_BASE_URL.
+            fetch_workers (int, optional): Threads do index e do fetch. Defaults to 4.
+            parse_workers (int, optional): Threads do parse. Defaults to 2.
+            queue_size (int, optional): Tamanho máximo de cada fila. Defaults to 32.
+            batch_size (int, optional): Quantidade de partidas por insert_games. Defaults to 100.
+            fetch (function, optional): Recebe uma URL e devolve o HTML. Defaults to None (um
+                HttpFetcher com requests_per_minute e uma conexão para cada thread do index e do fetch).
+            requests_per_minute (float, optional): Limite de requisições do HttpFetcher padrão.
+                Defaults to DEFAULT_REQUESTS_PER_MINUTE.
+    """
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, fetch_workers=4, parse_workers=2, queue_size=32,
+                 batch_size=100, fetch=None, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE):
+        self.base_url = base_url
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.fetch = fetch or HttpFetcher(requests_per_minute=requests_per_minute,
+                                          pool_size=2 * fetch_workers)
+
+        self.abbreviation_dict = None
+        self.team_ids = {}
+        # Índice do dia -> quantidade de partidas, preenchido pelo index
+        self.day_match_amounts = {}
+
+    def index_day(self, day):
+        date_index, date = day
+        box_score_links = parse_day_page(self.fetch(ws_functions.generate_day_url(date, self.base_url)))
+
+        # Registra antes de mandar as partidas, o write precisa saber quantas esperar
+        self.day_match_amounts[date_index] = len(box_score_links)
+
+        return [(date_index, date, match_index, urljoin(self.base_url, box_score_link))
+                for match_index, box_score_link in enumerate(box_score_links)]
+
+    def fetch_box_score(self, box_score):
+        date_index, date, match_index, url = box_score
+        return [(date_index, date, match_index, self.fetch(url))]
+
+    def parse_box_score(self, box_score):
+        date_index, date, match_index, html = box_score
+        return [(date_index, date, match_index, parse_box_score_page(html, self.abbreviation_dict))]
+
+    def normalize_match(self, match):
+        date_index, date, match_index, teams = match
+
+        game_data = []
+        for team_index, (team_name, collected_values) in enumerate(teams):
+            if(team_name not in self.team_ids):
+                self.team_ids[team_name] = db.retrieve_team_id_from_abv((team_name,))[0]
+
+            # posteriormente se tornará participation_id
+            game_data.append([0, self.team_ids[team_name], team_name, not team_index, *collected_values])
+
+        return [(date_index, match_index, control.format_team_data(game_data, date))]
+
+    def run(self, date_list):
+        """Roda o pipeline até todos os dias terem passado por todas as etapas
+
+        Args:
+            date_list (list): Os dias, no formato [ano, mês, dia], em ordem
+
+        Returns:
+            int: Quantidade de partidas inseridas
+        """
+
+        self.abbreviation_dict = db.get_teams_abbreviations()
+        self.day_match_amounts = {}
+
+        day_queue, box_score_queue, page_queue, parsed_queue, game_queue = (
+            queue.Queue(maxsize=self.queue_size) for _ in range(5))
+
+        stages = [Stage("index", self.index_day, day_queue, box_score_queue, self.fetch_workers),
+                  Stage("fetch", self.fetch_box_score, box_score_queue, page_queue, self.fetch_workers),
+                  Stage("parse", self.parse_box_score, page_queue, parsed_queue, self.parse_workers),
+                  Stage("normalize", self.normalize_match, parsed_queue, game_queue, 1)]
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.next_stage_workers = len(next_stage.threads)
+
+        writer = BatchWriter(game_queue, len(date_list), self.day_match_amounts, self.batch_size)
+
+        start_time = time.perf_counter()
+        for stage in stages:
+            stage.start()
+        writer.start()
+
+        for day in enumerate(date_list):
+            day_queue.put(day)
+        for _ in stages[0].threads:
+            day_queue.put(STOP)
+
+        writer.join()
+        elapsed_time = time.perf_counter() - start_time
+
+        print(f"Scraped {len(date_list)} days in {elapsed_time:.2f}s")
+        print(f"{'stage':<10}{'workers':>8}{'items':>8}{'errors':>8}{'items/s':>10}{'busy s':>10}{'max queue':>10}")
+        for stage_stats in [stage.stats for stage in stages] + [writer.stats]:
+            print(stage_stats.report(elapsed_time))
+
+        if(writer.error is not None):
+            raise writer.error
+
+        if(writer.written_days < len(date_list)):
+            raise RuntimeError(f"Only the first {writer.written_days} of {len(date_list)} days were inserted, "
+                               f"{date_list[writer.written_days]} failed")
+
+        return writer.written_matches
+
+
+class BatchWriter:
+    """A etapa write: a única thread que escreve no banco. Guarda as partidas de cada dia até
+    o dia estar completo e insere os dias completos, em ordem, em blocos de batch_size partidas.
+
+        Args:
+            game_queue (queue.Queue): Fila com as partidas da etapa normalize
+            day_amount (int): Quantidade de dias do pipeline
+            day_match_amounts (dict): Índice do dia -> quantidade de partidas, preenchido pelo index
+            batch_size (int): Quantidade mínima de partidas por insert_games, fora o último
+    """
+
+    def __init__(self, game_queue, day_amount, day_match_amounts, batch_size):
+        self.game_queue = game_queue
+        self.day_amount = day_amount
+        self.day_match_amounts = day_match_amounts
+        self.batch_size = batch_size
+        self.stats = StageStats("write", 1)
+
+        self.day_games = {}
+        self.complete_games = []
+        self.complete_days = 0
+        self.written_days = 0
+        self.written_matches = 0
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name="write", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def join(self):
+        self.thread.join()
+
+    def collect_complete_days(self):
+        while(self.complete_days < self.day_amount):
+            match_amount = self.day_match_amounts.get(self.complete_days)
+            day_games = self.day_games.get(self.complete_days, {})
+            if(match_amount is None or len(day_games) < match_amount):
+                return
+
+            # Na ordem do site, como o scraping antigo inseria
+            self.complete_games.extend(day_games[match_index] for match_index in sorted(day_games))
+            self.day_games.pop(self.complete_days, None)
+            self.complete_days += 1
+
+    def flush(self):
+        if(self.error is not None):
+            return
+
+        if(len(self.complete_games) == 0):
+            self.written_days = self.complete_days
+            return
+
+        start_time = time.perf_counter()
+        try:
+            db.insert_games(self.complete_games)
+        except Exception as e:
+            # Continua esvaziando a fila para as outras etapas não travarem, mas sem inserir mais nada
+            self.error = e
+            self.stats.record(time.perf_counter() - start_time, 0, error=True)
+            return
+
+        self.stats.record(time.perf_counter() - start_time, 0, processed=len(self.complete_games))
+        self.written_matches += len(self.complete_games)
+        self.written_days = self.complete_days
+        self.complete_games = []
+
+    def run(self):
+        try:
+            while True:
+                item = self.game_queue.get()
+                if(item is STOP):
+                    break
+
+                date_index, match_index, game = item
+                self.stats.max_queue_depth = max(self.stats.max_queue_depth, self.game_queue.qsize() + 1)
+                self.day_games.setdefault(date_index, {})[match_index] = game
+
+                self.collect_complete_days()
+                if(len(self.complete_games) >= self.batch_size):
+                    self.flush()
+
+            # Dias sem partidas não mandam nada pela fila
+            self.collect_complete_days()
+            self.flush()
+        finally:
+            close_connection()
@@ -0,0 +1,234 @@
+'''
+Conexões com o banco de dados compartilhadas pelas funções de data_provider, manipulation e definition.
+
+Cada thread (e cada processo) abre no máximo duas conexões, na primeira vez que precisa delas,
+e usa essas mesmas conexões até o programa terminar:
+
+- get_connection(): a conexão de escrita. Escritas usam transaction(), que faz o commit no final
+  do bloco ou o rollback se der algum erro. O manipulation e o definition usam essa conexão.
+- get_read_connection(): uma conexão só de leitura (mode=ro), usada pelo data_provider e pelo
+  dataset_cache. Dentro de um bloco transaction() ela devolve a conexão de escrita, para a
+  leitura enxergar o que a própria transação já escreveu.
+
+Concorrência: o banco fica no modo WAL (enable_wal_mode, chamado pelo migrate_database). Nesse
+modo um processo escrevendo (ex.: o web scraping) e vários lendo (ex.: os workers do AG e da
+validação) rodam ao mesmo tempo sem "database is locked": quem lê enxerga o banco como ele
+estava no começo da sua leitura, e só as partidas que já tiveram commit. Só pode ter um
+escritor por vez; um segundo espera o primeiro terminar (até o timeout do sqlite3.connect).
+As conexões não podem ser passadas de uma thread ou processo para outro.
+'''
+import atexit
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from os.path import join
+from core.utils.directory_manipulation import Directory
+
+DATABASE_PATH = join(Directory(Path(__file__).resolve().parent.parent.parent).cwd,
+                     'data', 'database.sqlite3')
+
+# Aplicados em toda conexão nova
+PRAGMAS = {
+    "cache_size": -65536,  # 64 MiB de cache de páginas
+    "mmap_size": 268435456,  # lê até 256 MiB do arquivo direto da memória
+    "temp_store": "MEMORY",  # tabelas temporárias (ex.: ORDER BY, UNION) ficam em memória
+    "synchronous": "NORMAL"  # no WAL, só o checkpoint espera o disco, e não cada commit
+}
+
+# Quantidade de linhas lidas por vez pelo fetch_batches
+FETCH_BATCH_SIZE = 1000
+
+thread_connections = threading.local()
+open_connections = []
+open_connections_lock = threading.Lock()
+
+
+def connect(database_path=None, read_only=False):
+    """Abre uma conexão nova com os PRAGMAS já aplicados. Quem chama é responsável por fechá-la;
+    no resto do código use get_connection() ou get_read_connection(), que reaproveitam a conexão da thread.
+
+    Args:
+        database_path (str, optional): Caminho do banco de dados. Defaults to None (DATABASE_PATH).
+        read_only (bool, optional): Abre o banco só para leitura (mode=ro). Defaults to False.
+
+    Returns:
+        sqlite3.Connection: A conexão aberta
+    """
+
+    database_path = database_path or DATABASE_PATH
+
+    if(read_only):
+        # Qualquer escrita nessa conexão dá erro, em vez de disputar o lock do banco
+        database_path = Path(database_path).resolve().as_uri() + "?mode=ro"
+
+    # check_same_thread=False só para o close_all_connections poder fechar tudo no final;
+    # cada conexão continua sendo usada por uma thread só
+    db_connection = sqlite3.connect(
+        database_path, check_same_thread=False, uri=read_only)
+
+    for pragma, value in PRAGMAS.items():
+        db_connection.execute(f"PRAGMA {pragma} = {value};")
+
+    return db_connection
+
+
+def get_connection_attribute(read_only):
+    return "read_connection" if read_only else "connection"
+
+
+def set_connection(db_connection, read_only=False):
+    """Passa a usar db_connection como uma das conexões desta thread
+
+    Args:
+        db_connection (sqlite3.Connection): A conexão
+        read_only (bool, optional): Se é a conexão do get_read_connection. Defaults to False.
+    """
+
+    setattr(thread_connections, get_connection_attribute(read_only),
+            (os.getpid(), db_connection))
+
+    with open_connections_lock:
+        open_connections.append((os.getpid(), db_connection, read_only))
+
+
+def get_thread_connection(read_only=False):
+    """Retorna uma das conexões já abertas desta thread. Um processo filho criado com fork
+    não reaproveita a conexão herdada do pai.
+
+    Args:
+        read_only (bool, optional): Se é a conexão só de leitura. Defaults to False.
+
+    Returns:
+        sqlite3.Connection: A conexão, ou None se a thread ainda não tiver uma
+    """
+
+    connection_pid, db_connection = getattr(
+        thread_connections, get_connection_attribute(read_only), (None, None))
+
+    if(connection_pid != os.getpid()):
+        return None
+
+    return db_connection
+
+
+def get_connection():
+    """Retorna a conexão de escrita desta thread, abrindo uma na primeira chamada
+
+    Returns:
+        sqlite3.Connection: A conexão da thread atual
+    """
+
+    db_connection = get_thread_connection()
+
+    if(db_connection is None):
+        db_connection = connect()
+        set_connection(db_connection)
+
+    return db_connection
+
+
+def get_read_connection():
+    """Retorna a conexão só de leitura desta thread, abrindo uma na primeira chamada. Se a
+    conexão de escrita estiver no meio de uma transação, retorna ela, senão a leitura não
+    veria as mudanças que ainda não tiveram commit.
+
+    Returns:
+        sqlite3.Connection: A conexão que as leituras da thread atual devem usar
+    """
+
+    db_connection = get_thread_connection()
+    if(db_connection is not None and db_connection.in_transaction):
+        return db_connection
+
+    db_connection = get_thread_connection(read_only=True)
+
+    if(db_connection is None):
+        db_connection = connect(read_only=True)
+        set_connection(db_connection, read_only=True)
+
+    return db_connection
+
+
+def use_read_only_connection():
+    """Troca a conexão de escrita desta thread por uma só de leitura. Usado como inicializador
+    dos processos que só montam conjuntos de dados, para nenhum deles escrever no banco sem querer.
+    """
+
+    close_connection()
+    set_connection(connect(read_only=True))
+
+
+def enable_wal_mode():
+    """Passa o banco para o modo WAL. O modo fica salvo no arquivo, então só a primeira chamada
+    muda alguma coisa. Precisa rodar fora de uma transação.
+
+    Returns:
+        str: O journal_mode do banco depois da mudança ("memory" para bancos em memória)
+    """
+
+    return get_connection().execute("PRAGMA journal_mode = WAL;").fetchone()[0]
+
+
+@contextmanager
+def transaction():
+    """Bloco de escrita: faz o commit quando o bloco termina e o rollback se ele der erro
+
+    Yields:
+        sqlite3.Cursor: Um cursor da conexão desta thread
+    """
+
+    db_connection = get_connection()
+
+    with db_connection:
+        yield db_connection.cursor()
+
+
+def fetch_batches(cursor, batch_size=FETCH_BATCH_SIZE):
+    """Lê o resultado de uma consulta em blocos de batch_size linhas com o fetchmany, então só um
+    bloco fica em memória por vez, não importa quantas linhas a consulta tenha.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor com a consulta já executada
+        batch_size (int, optional): Quantidade de linhas de cada bloco. Defaults to FETCH_BATCH_SIZE.
+
+    Yields:
+        tuple: Uma linha do resultado
+    """
+
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if(len(rows) == 0):
+            return
+
+        yield from rows
+
+
+def close_connection():
+    """Fecha as conexões desta thread, se ela tiver alguma"""
+
+    for read_only in (True, False):
+        db_connection = get_thread_connection(read_only)
+        setattr(thread_connections,
+                get_connection_attribute(read_only), (None, None))
+
+        if(db_connection is not None):
+            with open_connections_lock:
+                open_connections.remove(
+                    (os.getpid(), db_connection, read_only))
+            db_connection.close()
+
+
+@atexit.register
+def close_all_connections():
+    """Fecha todas as conexões abertas por este processo. Chamada automaticamente quando o programa termina."""
+
+    with open_connections_lock:
+        # As de escrita fecham por último: a última conexão a fechar junta o arquivo -wal
+        # de volta no banco, e uma conexão só de leitura não consegue fazer isso
+        for connection_pid, db_connection, _ in sorted(open_connections, key=lambda connection: not connection[2]):
+            # Conexões herdadas do processo pai continuam sendo do pai
+            if(connection_pid == os.getpid()):
+                db_connection.close()
+        open_connections.clear()
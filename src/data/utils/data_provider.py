@@ -12,13 +12,13 @@ Turnover h/a
 Assists h/a
 talvez  Dificuldade enfrentada h/a
 '''
-import sqlite3
 import random
-from pathlib import Path
-from os.path import join
+import numpy as np
+from bisect import bisect_left, bisect_right
 from datetime import datetime as dt
 from datetime import timedelta  
-from core.utils.directory_manipulation import Directory
+from data.utils.connection_provider import get_read_connection, fetch_batches, FETCH_BATCH_SIZE
+from data.utils.match_feature_matrix import MatchFeatureMatrix, STAT_COLUMNS
 
 # dicionário com começo e final das seasons, de 2000 até 2020
 #  começo: season["2015"][start]    fim: season["2015"][end]
@@ -48,6 +48,26 @@ seasons = {
     "2021": {"start": "2021-10-31", "end": "2022-04-10"}
 }
 
+# Colunas que o get_averages calcula com AVG, na ordem das STAT_COLUMNS
+AVERAGE_COLUMNS = STAT_COLUMNS[:-1]
+# Colunas em que o get_averages ignora os zeros com NULLIF
+NULLIF_COLUMNS = ("field_goals_percentage",
+                  "three_point_field_goals_percentage", "free_throws_percentage")
+# Colunas da tabela team_rolling_stats, na mesma ordem das somas do build_season_running_sums
+ROLLING_STATS_COLUMNS = tuple(stat + "_sum" for stat in AVERAGE_COLUMNS) + \
+    tuple(stat + "_count" for stat in AVERAGE_COLUMNS) + \
+    ("won_spread_sum", "match_count")
+SEASON_STARTS = sorted(season["start"] for season in seasons.values())
+
+# Histórico inteiro do banco em memória, preenchido pelo load_stats_index
+stats_index = None
+# Se o get_stats_index carrega o histórico na primeira vez que ele é usado (use_stats_index)
+stats_index_enabled = False
+# Snapshot em colunas do histórico (MatchSnapshot), preenchido pelo match_snapshot.load_match_snapshot
+match_snapshot = None
+# Função que carrega o snapshot na primeira vez que o histórico é pedido (match_snapshot.use_match_snapshot)
+match_snapshot_loader = None
+
 
 def get_match_amount():
     """Busca quantas partidas estão presentes no banco de dados e retorna esse valor
@@ -60,9 +80,7 @@ def get_match_amount():
     """
 
     try:
-        db_connection = sqlite3.connect(join(Directory(Path(__file__).resolve().parent.parent.parent).cwd,
-                                             'data', 'database.sqlite3'))
-        cursor = db_connection.cursor()
+        cursor = get_read_connection().cursor()
 
         cursor.execute(
             """
@@ -83,12 +101,13 @@ def get_match_amount():
         raise e
 
 
-def get_matches_by_season(date):
+def get_matches_by_season(date, after_date=None):
     """Escolhe todas as partidas da season -exceto dos 10 primeiros dias- e retorna alguns dados
     referentes a elas.
 
     Args:
         date (int): ano de inicio de uma temporada.
+        after_date (list, optional): Se informada, só as partidas depois dessa data. Defaults to None.
 
     Raises:
         e: Exceção do tipo Exception
@@ -101,16 +120,38 @@ def get_matches_by_season(date):
             data da partida
     """
 
+    return [{
+        "team_home_won": team_home_won,
+        "team_home_id": team_home_id,
+        "team_away_id": team_away_id,
+        "match_data": match_date.split('-')
+    } for team_home_won, team_home_id, team_away_id, match_date in iter_matches_by_season(date, after_date)]
+
+
+def iter_matches_by_season(date, after_date=None, batch_size=FETCH_BATCH_SIZE):
+    """Mesmas partidas do get_matches_by_season, mas lidas do banco aos poucos, em blocos de
+    batch_size, e cada uma em uma tupla ao invés de um dicionário. A memória usada não depende
+    de quantas partidas a season tem.
+
+    Args:
+        date (list): Data limite no formato [ano, mês, dia]
+        after_date (list, optional): Se informada, só as partidas depois dessa data. Defaults to None.
+        batch_size (int, optional): Quantidade de partidas lidas por vez. Defaults to FETCH_BATCH_SIZE.
+
+    Yields:
+        tuple: (time de casa ganhou, id do time de casa, id do time de fora, data no formato YYYY-MM-DD)
+    """
+
     season_start = get_start_season_by_date(date)
 
 
     str_for_sql_date_start = str(dt.strptime(season_start, "%Y-%m-%d").date() + timedelta(days=10)) 
-    str_for_sql_date_end = str(date[0])+"-"+str(date[1])+"-"+str(date[2])
+    str_for_sql_date_end = get_date_string(date)
+    # Toda data é maior que o texto vazio
+    str_for_sql_date_after = get_date_string(after_date) if after_date is not None else ""
 
     try:
-        db_connection = sqlite3.connect(join(Directory(Path(__file__).resolve().parent.parent.parent).cwd,
-                                             'data', 'database.sqlite3'))
-        cursor = db_connection.cursor()
+        cursor = get_read_connection().cursor()
 
         cursor.execute(
             """        
@@ -119,22 +160,11 @@ def get_matches_by_season(date):
                 INNER JOIN participation as pt_away On md.fk_participation_away = pt_away.participation_id
                     WHERE md.date >= ?
                     and   md.date <= ?
-                    order by md.date desc
-            """, [str_for_sql_date_start, str_for_sql_date_end])
-
-        lista = cursor.fetchall()
-
-        pre_averages_dict_list = []
-
-        for item in lista:
-            pre_averages_dict_list.append({
-                "team_home_won": item[0],
-                "team_home_id": item[1],
-                "team_away_id": item[2],
-                "match_data": item[3].split('-')
-            })
+                    and   md.date > ?
+                    order by md.date desc, md.match_id asc
+            """, [str_for_sql_date_start, str_for_sql_date_end, str_for_sql_date_after])
 
-        return pre_averages_dict_list
+        yield from fetch_batches(cursor, batch_size)
 
     except Exception as e:
         print(e)
@@ -154,7 +184,8 @@ def row_factory(cursor, row):
 
 def get_averages(team_id, local, date):
     """Recebe uma data e tras as medias do time a partir do inicio da season ate a data informada
-        O primeiro dia da season vem de uma lista
+        O primeiro dia da season vem de uma lista. As médias saem das somas acumuladas da
+        tabela team_rolling_stats, com uma leitura só.
 
     Args:
         team_id (int), 
@@ -177,83 +208,95 @@ def get_averages(team_id, local, date):
         ]
     """
 
+    return get_averages_from_sums(get_rolling_stats(team_id, local, date))
+
+
+def get_won_spread(team_id, local, date):
+    return get_averages(team_id, local, date)["won_spread_form"]
+
+
+def get_rolling_stats(team_id, local, date):
+    """Lê da team_rolling_stats as somas acumuladas do time na season da data, contando só
+    as partidas anteriores a ela. É uma leitura só, pela chave primária da tabela, ou
+    nenhuma se o load_stats_index já tiver carregado o histórico para a memória.
+
+    Args:
+        team_id (int): id do time
+        local (int): 1(casa) ou 0(fora)
+        date (list): Data no formato [ano, mês, dia]
+
+    Returns:
+        tuple: As somas na ordem das ROLLING_STATS_COLUMNS (zeradas se o time não jogou antes da data)
+    """
+
+    if(get_stats_index() is not None):
+        return get_indexed_running_sums(team_id, local, date)
+
     # descobre de que season é a data, e retorna a data de inicio da mesma
     start_season = get_start_season_by_date(date)
+    date_end = get_date_string(date)
 
     try:
-        db_connection = sqlite3.connect(join(Directory(Path(__file__).resolve().parent.parent.parent).cwd,
-                                             'data', 'database.sqlite3'))
-        db_connection.row_factory = row_factory
-        cursor = db_connection.cursor()
-
-        participation_local = "pt_home" if local else "pt_away"
-        participation_opponent = "pt_home" if not(local) else "pt_away"
+        cursor = get_read_connection().cursor()
 
         cursor.execute(
-            """ 
-            SELECT 
-                AVG(""" + participation_local + """.won) as won,
-                AVG(""" + participation_local + """.points) as points, 
-                AVG(""" + participation_local + """.points - """ + participation_opponent + """.points) as spread, 
-                AVG(""" + participation_local + """.offensive_rebounds) as offensive_rebounds,
-                AVG(""" + participation_local + """.defensive_rebounds) as defensive_rebounds ,
-                AVG(NULLIF(""" + participation_local + """.field_goals_percentage,0)) as field_goals_percentage ,
-                AVG(NULLIF(""" + participation_local + """.three_point_field_goals_percentage,0)) as three_point_field_goals_percentage,
-                AVG(NULLIF(""" + participation_local + """.free_throws_percentage,0)) as free_throws_percentage,
-                AVG(""" + participation_local + """.turnover) as turnover, 
-                AVG(""" + participation_local + """.assists) as assists 
-                    from match_data as md 
-                    INNER JOIN participation as pt_home 
-                    ON md.fk_participation_home = pt_home.participation_id 
-                    INNER JOIN participation as pt_away
-                    on md.fk_participation_away = pt_away.participation_id
-                            WHERE """ + participation_local + """.fk_team_id = ?
-                            and """ + participation_local + """.team_is_home = ?
-                            and md.date >= ?
-                            and md.date < ?
-                            order by md.date ASC;   
-                """, [team_id, local, start_season, str(date[0])+"-"+str(date[1])+"-"+str(date[2])])
-        dicionario = cursor.fetchall()
+            """
+            SELECT season_start, """ + ", ".join(ROLLING_STATS_COLUMNS) + """
+                FROM team_rolling_stats
+                    WHERE fk_team_id = ?
+                    and team_is_home = ?
+                    and date < ?
+                    order by date DESC
+                    LIMIT 1;
+            """, [team_id, local, date_end])
+        rolling_stats = cursor.fetchone()
 
-        dicionario[0]["won_spread_form"] = get_won_spread(team_id, local, date)
+        if(rolling_stats is None or rolling_stats[0] != start_season):
+            return (0,) * len(ROLLING_STATS_COLUMNS)
 
-        return dicionario[0]
+        return rolling_stats[1:]
 
     except Exception as e:
         print(e)
         raise e
 
-def get_won_spread(team_id, local, date):
-    start_season = get_start_season_by_date(date)
 
-    try:
-        db_connection = sqlite3.connect(join(Directory(Path(__file__).resolve().parent.parent.parent).cwd,
-                                             'data', 'database.sqlite3'))
-        # db_connection.row_factory = row_factory
-        cursor = db_connection.cursor()
+def get_date_string(date):
+    """Converte uma data [ano, mês, dia], com números ou textos, para o formato YYYY-MM-DD
+    em que as datas estão guardadas no banco. Toda comparação com match_data.date usa esse
+    formato: como texto, 2018-6-20 fica depois de 2018-10-01.
 
-        participation_local = "md.fk_participation_home" if local else "md.fk_participation_away"
+    Args:
+        date (list): Data no formato [ano, mês, dia]
 
-        cursor.execute(
-            """ 
-                SELECT SUM(won) FROM match_data as md INNER JOIN participation as p 
-                    on p.participation_id = """+participation_local+"""
-                INNER join team as t 
-                    on t.team_id = p.fk_team_id
-                WHERE t.team_id = ?
-                and md.date >= ?
-                and md.date < ?
-                order by md.date DESC;
-                """, [team_id, start_season, str(date[0])+"-"+str(date[1])+"-"+str(date[2])])
-        won_spread = cursor.fetchone()
-
-        return won_spread[0]
+    Returns:
+        str: A data no formato YYYY-MM-DD
+    """
 
-    except Exception as e:
-        print(e)
-        raise e
+    return dt(int(date[0]), int(date[1]), int(date[2])).strftime("%Y-%m-%d")
 
 
+def get_averages_from_sums(interval_sums):
+    """Converte as somas acumuladas (na ordem das ROLLING_STATS_COLUMNS) nas médias do
+    get_averages, com None quando o time não tem nenhuma partida nas somas
+
+    Args:
+        interval_sums (tuple): Somas e contagens de cada coluna, o total de vitórias e a quantidade de partidas
+
+    Returns:
+        dict: As médias de cada coluna das STAT_COLUMNS
+    """
+
+    averages = {}
+    for stat_index, stat in enumerate(AVERAGE_COLUMNS):
+        count = interval_sums[len(AVERAGE_COLUMNS) + stat_index]
+        averages[stat] = float(interval_sums[stat_index]) / \
+            count if count else None
+
+    averages["won_spread_form"] = interval_sums[-2] if interval_sums[-1] else None
+
+    return averages
+
 
 def get_start_season_by_date(date):
     """Recebe uma data e retorna a data do começo da season da qual ela pertence
@@ -276,26 +319,27 @@ def get_start_season_by_date(date):
 
 def get_team_id_from_name(team_name):
     try:
-        db_connection = sqlite3.connect(join(Directory(Path(__file__).resolve().parent.parent.parent).cwd,
-                                             'data', 'database.sqlite3'))
-        cursor = db_connection.cursor()
-
         while True:
             team_name_near = "%" + team_name + "%"
 
-            cursor.execute(
-                """
-                SELECT
-                    team_id
-                FROM
-                    team
-                WHERE
-                    upper(team_name) LIKE upper(?)
-                """,
-                [team_name_near]
-            )
-
-            team_id = cursor.fetchall()
+            if(get_stats_index() is not None):
+                team_id = [(team_id,) for team_id, name in stats_index["teams"]
+                           if name is not None and team_name.upper() in name.upper()]
+            else:
+                cursor = get_read_connection().cursor()
+                cursor.execute(
+                    """
+                    SELECT
+                        team_id
+                    FROM
+                        team
+                    WHERE
+                        upper(team_name) LIKE upper(?)
+                    """,
+                    [team_name_near]
+                )
+
+                team_id = cursor.fetchall()
 
             if len(team_id) == 1:
                 return team_id[0][0]
@@ -309,22 +353,365 @@ def get_team_id_from_name(team_name):
         raise e
 
 
+def get_participation_history(date_start, date_end, use_snapshot=True):
+    """Busca com uma consulta só as estatísticas de todas as participações (casa e fora)
+    das partidas entre date_start (inclusive) e date_end (exclusive), em ordem de data.
+    Com um snapshot carregado, lê das colunas dele ao invés do banco.
+
+    Args:
+        date_start (str): Data inicial no formato YYYY-MM-DD
+        date_end (str): Data final no formato YYYY-MM-DD
+        use_snapshot (bool, optional): Se pode usar o snapshot carregado. Defaults to True.
+
+    Returns:
+        list: Uma tupla por participação: (data, id do time, local, team_is_home, seguido
+            dos valores das AVERAGE_COLUMNS)
+    """
+
+    def participation_query(local):
+        participation_local = "pt_home" if local else "pt_away"
+        participation_opponent = "pt_home" if not(local) else "pt_away"
+
+        return """
+            SELECT
+                md.date, """ + participation_local + """.fk_team_id, """ + str(local) + """,
+                """ + participation_local + """.team_is_home,
+                """ + participation_local + """.won,
+                """ + participation_local + """.points,
+                """ + participation_local + """.points - """ + participation_opponent + """.points,
+                """ + participation_local + """.offensive_rebounds,
+                """ + participation_local + """.defensive_rebounds,
+                """ + participation_local + """.field_goals_percentage,
+                """ + participation_local + """.three_point_field_goals_percentage,
+                """ + participation_local + """.free_throws_percentage,
+                """ + participation_local + """.turnover,
+                """ + participation_local + """.assists
+                    from match_data as md
+                    INNER JOIN participation as pt_home
+                    ON md.fk_participation_home = pt_home.participation_id
+                    INNER JOIN participation as pt_away
+                    on md.fk_participation_away = pt_away.participation_id
+                            WHERE md.date >= ?
+                            and md.date < ?
+            """
+
+    if(use_snapshot and get_match_snapshot() is not None):
+        return match_snapshot.get_participation_history(date_start, date_end)
+
+    try:
+        cursor = get_read_connection().cursor()
+
+        cursor.execute(participation_query(1) + " UNION ALL " + participation_query(0) + " ORDER BY 1 ASC, 2 ASC;",
+                       [date_start, date_end, date_start, date_end])
+
+        return cursor.fetchall()
+
+    except Exception as e:
+        print(e)
+        raise e
+
+
+def get_running_sum_season(date):
+    """Retorna o começo da season em que uma partida jogada em date entra nas somas
+    acumuladas. Diferente do get_start_season_by_date, uma partida no próprio dia de
+    abertura já conta para a season nova.
+
+    Args:
+        date (str): Data da partida no formato YYYY-MM-DD
+
+    Returns:
+        str: Data de início da season
+    """
+
+    return SEASON_STARTS[bisect_right(SEASON_STARTS, date) - 1]
+
+
+def get_running_sum_contribution(local, team_is_home, stats):
+    """Quanto uma participação soma em cada uma das ROLLING_STATS_COLUMNS
+
+    Args:
+        local (int): 1(casa) ou 0(fora)
+        team_is_home (int): O team_is_home da participação
+        stats (list): Os valores das AVERAGE_COLUMNS da participação
+
+    Returns:
+        tuple: O valor somado em cada coluna
+    """
+
+    # Igual ao get_averages, que filtra por team_is_home, e ao get_won_spread, que não filtra
+    is_averaged = team_is_home == local
+    values = []
+    counts = []
+    for stat, value in zip(AVERAGE_COLUMNS, stats):
+        is_counted = is_averaged and not(
+            stat in NULLIF_COLUMNS and value == 0)
+        values.append(value if is_counted else 0)
+        counts.append(1 if is_counted else 0)
+
+    # won (a primeira coluna) e a quantidade de partidas, usados no won_spread_form
+    return (*values, *counts, stats[0], 1)
+
+
+def build_season_running_sums(participation_history, initial_sums=None):
+    """Percorre as participações uma vez, em ordem de data, acumulando as somas de cada
+    time em casa e fora. As somas recomeçam do zero no começo de cada season, então a
+    média de um time antes de uma data sai direto da última soma anterior a ela.
+
+    As somas são feitas na mesma ordem (data da partida) em que o AVG antigo do get_averages
+    percorria as partidas, então as médias são idênticas às dele, até o último bit.
+
+    Args:
+        participation_history (list): Participações no formato de get_participation_history
+        initial_sums (dict, optional): Para cada (id do time, local), a season e as somas de onde
+            continuar, como a última linha da team_rolling_stats. Defaults to None.
+
+    Returns:
+        dict: Para cada (id do time, local), as datas, a season e as somas acumuladas de cada participação
+    """
+
+    initial_sums = initial_sums or {}
+    running_sums = {}
+
+    for date, team_id, local, team_is_home, *stats in participation_history:
+        team_sums = running_sums.setdefault(
+            (team_id, local), {"dates": [], "season_starts": [], "sums": []})
+        season_start = get_running_sum_season(date)
+
+        if(len(team_sums["sums"]) > 0):
+            last_season_start, last_sums = team_sums["season_starts"][-1], team_sums["sums"][-1]
+        else:
+            last_season_start, last_sums = initial_sums.get(
+                (team_id, local), (None, None))
+
+        if(last_season_start != season_start):
+            last_sums = (0,) * len(ROLLING_STATS_COLUMNS)
+
+        contribution = get_running_sum_contribution(local, team_is_home, stats)
+
+        team_sums["dates"].append(date)
+        team_sums["season_starts"].append(season_start)
+        team_sums["sums"].append(tuple(total + value for total, value
+                                       in zip(last_sums, contribution)))
+
+    return running_sums
+
+
+def get_running_sum_averages(running_sums, team_id, local, date):
+    """Mesmo resultado do get_averages (incluindo o won_spread_form), mas tirado das
+    somas acumuladas do build_season_running_sums
+
+    Args:
+        running_sums (dict): Somas acumuladas de um período que cobre a season da data
+        team_id (int): id do time
+        local (int): 1(casa) ou 0(fora)
+        date (list): Data da partida no formato [ano, mês, dia]
+
+    Returns:
+        dict: As médias do time, com None quando ele não tem nenhuma partida anterior na season
+    """
+
+    return get_averages_from_sums(get_running_sums_before(running_sums, team_id, local, date))
+
+
+def get_running_sums_before(running_sums, team_id, local, date):
+    """Procura com uma busca binária as somas acumuladas do time na season da data, contando
+    só as partidas anteriores a ela. Como as somas recomeçam em cada season, não precisa subtrair
+    nada, e o resultado é o mesmo do AVG do SQLite até o último bit.
+
+    Args:
+        running_sums (dict): Somas acumuladas no formato de build_season_running_sums
+        team_id (int): id do time
+        local (int): 1(casa) ou 0(fora)
+        date (list): Data no formato [ano, mês, dia]
+
+    Returns:
+        tuple: As somas na ordem das ROLLING_STATS_COLUMNS (zeradas se o time não jogou antes da data)
+    """
+
+    start_season = get_start_season_by_date(date)
+
+    team_sums = running_sums.get((team_id, local))
+    if(team_sums is not None):
+        last_index = bisect_left(
+            team_sums["dates"], get_date_string(date)) - 1
+        if(last_index >= 0 and team_sums["season_starts"][last_index] == start_season):
+            return team_sums["sums"][last_index]
+
+    return (0,) * len(ROLLING_STATS_COLUMNS)
+
+
+def build_stats_index(participation_history):
+    """Converte as somas acumuladas do build_season_running_sums em arrays do NumPy: para cada
+    (id do time, local), as datas e as seasons em datetime64 e as somas em uma matriz de float,
+    uma linha por participação, na ordem das ROLLING_STATS_COLUMNS
+
+    Args:
+        participation_history (list): Participações no formato de get_participation_history
+
+    Returns:
+        dict: Para cada (id do time, local), os arrays "dates", "season_starts" e "sums"
+    """
+
+    return {team_key: {"dates": np.array(team_sums["dates"], dtype="datetime64[D]"),
+                       "season_starts": np.array(team_sums["season_starts"], dtype="datetime64[D]"),
+                       "sums": np.array(team_sums["sums"], dtype=float).reshape(-1, len(ROLLING_STATS_COLUMNS))}
+            for team_key, team_sums in build_season_running_sums(participation_history).items()}
+
+
+def get_indexed_running_sums(team_id, local, date):
+    """Mesmo resultado do get_rolling_stats, tirado do stats_index com um np.searchsorted. As
+    somas recomeçam em cada season, então a última linha antes da data já é a soma desde o
+    começo da season, sem precisar de uma segunda busca e uma subtração.
+
+    Args:
+        team_id (int): id do time
+        local (int): 1(casa) ou 0(fora)
+        date (list): Data no formato [ano, mês, dia]
+
+    Returns:
+        tuple: As somas na ordem das ROLLING_STATS_COLUMNS (zeradas se o time não jogou antes da data)
+    """
+
+    team_sums = stats_index["running_sums"].get((team_id, local))
+    if(team_sums is not None):
+        last_index = np.searchsorted(team_sums["dates"], np.datetime64(get_date_string(date)), side="left") - 1
+        if(last_index >= 0 and team_sums["season_starts"][last_index] == np.datetime64(get_start_season_by_date(date))):
+            return tuple(team_sums["sums"][last_index].tolist())
+
+    return (0,) * len(ROLLING_STATS_COLUMNS)
+
+
+def load_stats_index():
+    """Carrega o histórico inteiro do banco para a memória (as somas acumuladas de cada time
+    em casa e fora, em arrays ordenados por data, e os nomes dos times). Depois disso get_averages,
+    get_won_spread, get_specific_match_averages e os montadores de season não consultam
+    mais o SQLite para as médias. Útil quando o mesmo processo monta as médias de muitas
+    partidas ou seasons.
+
+    Returns:
+        dict: O índice carregado
+    """
+
+    global stats_index
+
+    try:
+        cursor = get_read_connection().cursor()
+        cursor.execute("SELECT team_id, team_name FROM team")
+        teams = cursor.fetchall()
+
+        stats_index = {
+            "running_sums": build_stats_index(get_participation_history("0000-00-00", "9999-12-31")),
+            "teams": teams
+        }
+
+        return stats_index
+
+    except Exception as e:
+        print(e)
+        raise e
+
+
+def use_stats_index():
+    """Faz o processo usar o stats_index: ele é carregado na primeira vez que alguma média for
+    pedida, então um comando que acaba não montando nenhuma (ex.: o conjunto de dados veio do
+    dataset_cache) não paga pela carga."""
+
+    global stats_index_enabled
+    stats_index_enabled = True
+
+
+def get_stats_index():
+    """Retorna o stats_index, carregando ele agora se o use_stats_index foi chamado
+
+    Returns:
+        dict: O índice, ou None se ele não estiver em uso
+    """
+
+    if(stats_index is None and stats_index_enabled):
+        load_stats_index()
+
+    return stats_index
+
+
+def unload_stats_index():
+    """Descarta o histórico em memória; as médias voltam a ser lidas do banco, ou o índice é
+    carregado de novo se estiver em uso. É chamada sempre que as somas acumuladas do banco
+    mudam, para o índice nunca ficar desatualizado."""
+
+    global stats_index
+    stats_index = None
+
+
+def get_match_snapshot():
+    """Retorna o snapshot, carregando ele agora se o match_snapshot.use_match_snapshot foi
+    chamado. A carga só é tentada uma vez: um snapshot desatualizado continua ignorado.
+
+    Returns:
+        MatchSnapshot: O snapshot, ou None se ele não estiver em uso
+    """
+
+    global match_snapshot_loader
+
+    if(match_snapshot is None and match_snapshot_loader is not None):
+        loader, match_snapshot_loader = match_snapshot_loader, None
+        loader()
+
+    return match_snapshot
+
+
+def unload_match_snapshot():
+    """Para de usar o snapshot carregado. Chamada sempre que uma partida é escrita no banco,
+    já que o snapshot deixa de ter o histórico inteiro."""
+
+    global match_snapshot
+    match_snapshot = None
+
+
+def get_season_running_sums(matches_dict):
+    """Monta as somas acumuladas que cobrem todas as partidas de get_matches_by_season,
+    desde o começo da season da primeira partida até a data da última
+
+    Args:
+        matches_dict (list): Partidas no formato de get_matches_by_season
+
+    Returns:
+        dict: Somas acumuladas no formato de build_season_running_sums
+    """
+
+    if(len(matches_dict) == 0):
+        return {}
+
+    match_dates = [match["match_data"] for match in matches_dict]
+    date_start = min(get_start_season_by_date(date) for date in match_dates)
+    date_end = max(get_date_string(date) for date in match_dates)
+
+    return build_season_running_sums(get_participation_history(date_start, date_end))
+
+
 def get_matches_averages_by_season(date, **kwargs):
     # match_total = get_match_amount()
 
     matches_dict = get_matches_by_season(date)
 
+    if(get_stats_index() is not None):
+        get_match_averages = get_averages
+    else:
+        running_sums = get_season_running_sums(matches_dict)
+
+        def get_match_averages(team_id, local, match_date):
+            return get_running_sum_averages(running_sums, team_id, local, match_date)
+
     team_home_averages = []
     team_away_averages = []
     match_averages = []
 
     for match in matches_dict:
-        team_home_averages = get_averages(
+        team_home_averages = get_match_averages(
             match["team_home_id"], 1, match["match_data"])
-        team_away_averages = get_averages(
+        team_away_averages = get_match_averages(
             match["team_away_id"], 0, match["match_data"])
 
-        match_averages.append({"team_home": team_home_averages.copy(), "team_away": team_away_averages.copy(),
+        match_averages.append({"team_home": team_home_averages, "team_away": team_away_averages,
                                "home_won": match["team_home_won"]})
 
     # Usar para ver os nulos
@@ -335,6 +722,52 @@ def get_matches_averages_by_season(date, **kwargs):
     return match_averages
 
 
+def get_match_feature_matrix_by_season(date, after_date=None):
+    """Mesma coisa que get_matches_averages_by_season, mas já monta o MatchFeatureMatrix
+    que o AG usa, lendo as partidas do banco aos poucos (iter_matches_by_season) e guardando
+    só as médias de cada uma, ao invés de dois dicionários por partida.
+
+    Com after_date, monta só as partidas depois dessa data (ex.: as que o web scraping acabou
+    de inserir), lendo as somas de cada time envolvido direto da team_rolling_stats. Assim o
+    trabalho é proporcional às partidas novas, e não ao tamanho da season.
+
+    Args:
+        date (list): Data limite no formato [ano, mês, dia]
+        after_date (list, optional): Só monta as partidas depois dessa data. Defaults to None.
+
+    Returns:
+        MatchFeatureMatrix: As médias de todas as partidas da season até a data
+    """
+
+    if(after_date is None and get_stats_index() is None):
+        # As partidas da data limite só usam as anteriores a ela
+        running_sums = build_season_running_sums(get_participation_history(
+            get_start_season_by_date(date), get_date_string(date)))
+
+        def get_match_averages(team_id, local, match_date):
+            return get_running_sum_averages(running_sums, team_id, local, match_date)
+    else:
+        # O get_averages lê do stats_index, se ele estiver carregado, ou da team_rolling_stats
+        get_match_averages = get_averages
+
+    team_home_averages = []
+    team_away_averages = []
+    home_won = []
+
+    for team_home_won, team_home_id, team_away_id, match_date in iter_matches_by_season(date, after_date):
+        match_date = match_date.split('-')
+        home_averages = get_match_averages(team_home_id, 1, match_date)
+        away_averages = get_match_averages(team_away_id, 0, match_date)
+
+        # None vira NaN sozinho no array de float
+        team_home_averages.append([home_averages[stat] for stat in STAT_COLUMNS])
+        team_away_averages.append([away_averages[stat] for stat in STAT_COLUMNS])
+        home_won.append(team_home_won)
+
+    return MatchFeatureMatrix(np.array(team_home_averages, dtype=float), np.array(team_away_averages, dtype=float),
+                              home_won)
+
+
 def get_specific_match_averages(team_home_name, team_away_name, date):
     team_home_averages = get_averages(
         get_team_id_from_name(team_home_name), 1, date)
@@ -0,0 +1,369 @@
+'''
+Cache em disco dos conjuntos de dados (MatchFeatureMatrix) que o AG usa como fitness_input.
+
+Cada arquivo tem um cabeçalho JSON pequeno seguido dos arrays crus do NumPy, alinhados em
+64 bytes. Carregar é só ler o cabeçalho e mapear os arrays na memória (np.memmap), sem
+consultar o banco. O cabeçalho guarda a data, as colunas e uma impressão digital do banco;
+quando alguma delas não bate (ex.: o web scraping inseriu partidas novas), o conjunto é
+montado de novo e o arquivo é substituído.
+
+A impressão digital só cobre as partidas da season até a data do conjunto, e vem da tabela
+match_revision sem ler as partidas. Então um conjunto antigo da mesma season continua valendo
+depois do web scraping e serve de base para o novo: só as partidas depois dele são montadas.
+'''
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import numpy as np
+from datetime import datetime as dt
+from datetime import timedelta
+from multiprocessing import Pool
+from pathlib import Path
+from os.path import join
+from data.utils import data_provider
+from data.utils.connection_provider import get_read_connection, use_read_only_connection
+from data.utils.match_feature_matrix import MatchFeatureMatrix, STAT_COLUMNS
+
+CACHE_MAGIC = b"NBAMFM01"
+ARRAY_ALIGNMENT = 64
+CACHE_ARRAYS = ("team_home", "team_away", "home_won")
+
+
+def get_dataset_cache_directory():
+    return join(Path(__file__).resolve().parent.parent, 'cache')
+
+
+def get_database_fingerprint(date_end=None, date_start=None):
+    """Impressão digital das partidas entre duas datas: a versão do schema e a última revisão
+    da tabela match_revision naquele intervalo. Os triggers da migração 4 dão uma revisão nova
+    à data de toda partida inserida, apagada ou corrigida (mesmo que a correção não mude
+    nenhuma soma), então o valor muda sempre que alguma partida do intervalo muda.
+
+    É só uma busca no índice da match_revision, sem ler as partidas. Um conjunto montado até
+    date_end continua valendo enquanto nada no intervalo mudar, mesmo que o web scraping
+    insira partidas depois dele ou alguém corrija uma season anterior.
+
+    Args:
+        date_end (list, optional): Data final no formato [ano, mês, dia]. Defaults to None (sem limite).
+        date_start (str, optional): Data inicial no formato YYYY-MM-DD. Defaults to None (sem limite).
+
+    Returns:
+        str: A versão do schema e a revisão, ex.: "4:1532"
+    """
+
+    try:
+        cursor = get_read_connection().cursor()
+
+        cursor.execute("PRAGMA user_version;")
+        schema_version = cursor.fetchone()[0]
+
+        if(date_end is None and date_start is None):
+            cursor.execute("SELECT MAX(revision) FROM match_revision;")
+        else:
+            # Textos que não parecem número: a coluna date tem afinidade NUMERIC, e o SQLite
+            # converteria algo como "9" para o número 9, que é menor que qualquer data em texto
+            str_for_sql_date_end = data_provider.get_date_string(
+                date_end) if date_end is not None else "9999-12-31"
+            cursor.execute("SELECT MAX(revision) FROM match_revision WHERE date >= ? and date <= ?;",
+                           [date_start or "0000-00-00", str_for_sql_date_end])
+
+        return f"{schema_version}:{cursor.fetchone()[0] or 0}"
+
+    except Exception as e:
+        print(e)
+        raise e
+
+
+class DatasetCache:
+    """Um conjunto de dados salvo em disco.
+
+        Args:
+            file_path (str): Caminho do arquivo do cache
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    @classmethod
+    def from_date(cls, date, stat_columns=STAT_COLUMNS):
+        """Cria o DatasetCache no caminho padrão de uma data e lista de colunas:
+        data/cache/dataset-<YYYY-MM-DD>-<hash das colunas>.bin"""
+
+        columns_digest = hashlib.blake2b(
+            repr(tuple(stat_columns)).encode(), digest_size=4).hexdigest()
+
+        return cls(join(get_dataset_cache_directory(),
+                        f'dataset-{data_provider.get_date_string(date)}-{columns_digest}.bin'))
+
+    def read_header(self):
+        """Lê só o cabeçalho do arquivo
+
+        Returns:
+            dict: O cabeçalho, ou None se o arquivo não existir ou não for um cache válido
+        """
+
+        try:
+            with open(self.file_path, "rb") as cache_file:
+                if(cache_file.read(len(CACHE_MAGIC)) != CACHE_MAGIC):
+                    return None
+
+                header_length = struct.unpack("<I", cache_file.read(4))[0]
+                header = json.loads(cache_file.read(header_length))
+        except (OSError, ValueError, struct.error):
+            return None
+
+        header["data_offset"] = get_aligned_offset(
+            len(CACHE_MAGIC) + 4 + header_length)
+
+        return header
+
+    def is_valid(self, header, date, database_fingerprint, stat_columns=STAT_COLUMNS):
+        return(header is not None
+               and header["date"] == data_provider.get_date_string(date)
+               and tuple(header["stat_columns"]) == tuple(stat_columns)
+               and header["database_fingerprint"] == database_fingerprint)
+
+    def load(self, header=None):
+        """Mapeia os arrays do arquivo na memória, sem copiar
+
+        Args:
+            header (dict, optional): Cabeçalho já lido com read_header. Defaults to None.
+
+        Returns:
+            MatchFeatureMatrix: O conjunto de dados salvo
+        """
+
+        header = header or self.read_header()
+
+        arrays = {}
+        for array_name in CACHE_ARRAYS:
+            array_info = header["arrays"][array_name]
+            shape = tuple(array_info["shape"])
+
+            # O mmap não aceita um pedaço vazio do arquivo
+            if(np.prod(shape) == 0):
+                arrays[array_name] = np.empty(shape)
+            else:
+                arrays[array_name] = np.memmap(self.file_path, dtype="<f8", mode="r", shape=shape,
+                                               offset=header["data_offset"] + array_info["offset"])
+
+        return MatchFeatureMatrix(arrays["team_home"], arrays["team_away"], arrays["home_won"],
+                                  missing_value=header["missing_value"], stat_columns=header["stat_columns"])
+
+    def dump(self, feature_matrix, date, database_fingerprint, **header_data):
+        """Escreve o conjunto de dados em um arquivo temporário e só depois substitui o antigo,
+        igual ao Checkpoint, para um programa morto no meio da escrita não deixar um cache quebrado
+
+        Args:
+            feature_matrix (MatchFeatureMatrix): O conjunto de dados
+            date (list): Data limite usada para montar o conjunto, no formato [ano, mês, dia]
+            database_fingerprint (str): Impressão digital do banco quando o conjunto foi montado
+            header_data: Outros valores guardados no cabeçalho
+        """
+
+        arrays = {array_name: np.ascontiguousarray(getattr(feature_matrix, array_name), dtype="<f8")
+                  for array_name in CACHE_ARRAYS}
+
+        header = {
+            "date": data_provider.get_date_string(date),
+            "stat_columns": list(feature_matrix.stat_columns),
+            "missing_value": feature_matrix.missing_value,
+            "database_fingerprint": database_fingerprint,
+            "match_count": len(feature_matrix),
+            "arrays": {},
+            **header_data
+        }
+
+        array_offset = 0
+        for array_name, array in arrays.items():
+            header["arrays"][array_name] = {
+                "offset": array_offset, "shape": list(array.shape)}
+            array_offset = get_aligned_offset(array_offset + array.nbytes)
+
+        header_bytes = json.dumps(header).encode()
+        data_offset = get_aligned_offset(
+            len(CACHE_MAGIC) + 4 + len(header_bytes))
+
+        cache_directory = os.path.dirname(self.file_path)
+        os.makedirs(cache_directory, exist_ok=True)
+
+        with tempfile.NamedTemporaryFile(dir=cache_directory, suffix=".bin.tmp", delete=False) as cache_file:
+            try:
+                cache_file.write(CACHE_MAGIC)
+                cache_file.write(struct.pack("<I", len(header_bytes)))
+                cache_file.write(header_bytes)
+
+                for array_name, array in arrays.items():
+                    cache_file.seek(
+                        data_offset + header["arrays"][array_name]["offset"])
+                    cache_file.write(array.tobytes())
+
+                cache_file.flush()
+                os.fsync(cache_file.fileno())
+            except Exception:
+                os.remove(cache_file.name)
+                raise
+
+        os.replace(cache_file.name, self.file_path)
+
+
+def get_aligned_offset(offset):
+    return -(-offset // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+
+
+def find_updatable_cache(date, stat_columns=STAT_COLUMNS):
+    """Procura um conjunto salvo da mesma season, com as mesmas colunas, montado até uma data
+    anterior e que ainda vale para ela (nenhuma partida da season até aquela data mudou). Se
+    tiver mais de um, fica com o mais recente, que é o que tem menos partidas faltando.
+
+    Cada candidato custa uma busca na match_revision, sem ler as partidas; as que vieram depois
+    dele são as únicas que o get_match_feature_matrix_by_season monta.
+
+    Args:
+        date (list): Data limite no formato [ano, mês, dia]
+        stat_columns (list, optional): Colunas do conjunto. Defaults to STAT_COLUMNS.
+
+    Returns:
+        tuple: O DatasetCache e o cabeçalho dele, ou (None, None) se não tiver nenhum
+    """
+
+    date_string = data_provider.get_date_string(date)
+    season_start = data_provider.get_start_season_by_date(date)
+    columns_suffix = os.path.basename(
+        DatasetCache.from_date(date, stat_columns).file_path)[len(f'dataset-{date_string}'):]
+
+    try:
+        file_names = sorted(os.listdir(get_dataset_cache_directory()), reverse=True)
+    except OSError:
+        return None, None
+
+    for file_name in file_names:
+        if(not file_name.startswith("dataset-") or not file_name.endswith(columns_suffix)):
+            continue
+
+        cached_date = file_name[len("dataset-"):-len(columns_suffix)].split("-")
+        if(data_provider.get_date_string(cached_date) >= date_string
+           or data_provider.get_start_season_by_date(cached_date) != season_start):
+            continue
+
+        dataset_cache = DatasetCache(join(get_dataset_cache_directory(), file_name))
+        header = dataset_cache.read_header()
+        if(dataset_cache.is_valid(header, cached_date, get_database_fingerprint(cached_date, season_start),
+                                  stat_columns)):
+            return dataset_cache, header
+
+    return None, None
+
+
+def get_match_feature_matrix_by_season(date):
+    """Mesmo resultado do data_provider.get_match_feature_matrix_by_season, mas carregado do
+    cache em disco quando o banco não mudou desde que o conjunto foi salvo.
+
+    Se não tiver cache para a data, mas tiver um da mesma season até uma data anterior (ex.: o
+    treino de ontem, antes do web scraping inserir as partidas de hoje), só as partidas novas
+    são montadas e colocadas na frente das antigas. Senão monta o conjunto inteiro no banco.
+    Nos dois casos o resultado é salvo.
+
+    Args:
+        date (list): Data limite no formato [ano, mês, dia]
+
+    Returns:
+        MatchFeatureMatrix: As médias de todas as partidas da season até a data
+    """
+
+    dataset_cache = DatasetCache.from_date(date)
+    # As partidas antes da season não entram no conjunto; corrigir uma delas não o invalida
+    database_fingerprint = get_database_fingerprint(
+        date, data_provider.get_start_season_by_date(date))
+    header = dataset_cache.read_header()
+
+    if(dataset_cache.is_valid(header, date, database_fingerprint)):
+        print(f"Loading cached dataset from {dataset_cache.file_path}")
+        return dataset_cache.load(header)
+
+    previous_cache, previous_header = find_updatable_cache(date)
+
+    if(previous_cache is not None):
+        new_matches = data_provider.get_match_feature_matrix_by_season(
+            date, after_date=previous_header["date"].split("-"))
+        # As partidas ficam da mais recente para a mais antiga
+        feature_matrix = MatchFeatureMatrix.concatenate(
+            [new_matches, previous_cache.load(previous_header)])
+        print(
+            f"Added {len(new_matches)} new matches to the dataset from {previous_cache.file_path}")
+    else:
+        feature_matrix = data_provider.get_match_feature_matrix_by_season(date)
+
+    dataset_cache.dump(feature_matrix, date, database_fingerprint)
+    print(f"Dataset cached at {dataset_cache.file_path}")
+
+    return feature_matrix
+
+
+def get_season_cutoff(season):
+    """Última data de uma season da tabela seasons do data_provider: o dia antes da próxima
+    season começar, para incluir os playoffs (o "end" da tabela é o fim da temporada regular).
+
+    Args:
+        season (str): Ano de início da season, ex.: "2018"
+
+    Returns:
+        list: A data no formato [ano, mês, dia]
+    """
+
+    next_season = data_provider.seasons.get(str(int(season) + 1))
+    if(str(season) not in data_provider.seasons or next_season is None):
+        raise ValueError(
+            f"Season {season} needs to be followed by another season in data_provider.seasons.")
+
+    cutoff = dt.strptime(next_season["start"], "%Y-%m-%d").date() - timedelta(days=1)
+
+    return [cutoff.year, cutoff.month, cutoff.day]
+
+
+def build_season(season):
+    """Monta (ou carrega do cache) o conjunto de dados de uma season inteira. Roda nos
+    processos do get_match_feature_matrix_by_seasons.
+
+    Args:
+        season (str): Ano de início da season
+
+    Returns:
+        MatchFeatureMatrix: As partidas da season, com os arrays em memória
+    """
+
+    feature_matrix = get_match_feature_matrix_by_season(get_season_cutoff(season))
+
+    # Arrays do np.memmap não voltam para o processo principal, só cópias
+    return MatchFeatureMatrix(np.array(feature_matrix.team_home), np.array(feature_matrix.team_away),
+                              np.array(feature_matrix.home_won), missing_value=feature_matrix.missing_value,
+                              stat_columns=feature_matrix.stat_columns)
+
+
+def get_match_feature_matrix_by_seasons(season_list, workers=1):
+    """Junta várias seasons inteiras em um conjunto de dados só. Com mais de um worker, cada
+    season é montada em um processo separado, com a sua própria conexão só de leitura, então
+    o tempo total fica perto do tempo da maior season e não da soma de todas.
+
+    Args:
+        season_list (list): Anos de início das seasons, ex.: ["2017", "2018"]
+        workers (int, optional): Quantidade de processos. Defaults to 1.
+
+    Returns:
+        MatchFeatureMatrix: As partidas de todas as seasons, da mais recente para a mais antiga
+    """
+
+    # Mesma ordem das partidas dentro de cada season
+    season_list = sorted({str(season) for season in season_list}, key=int, reverse=True)
+
+    if(workers > 1 and len(season_list) > 1):
+        with Pool(min(workers, len(season_list)), initializer=use_read_only_connection) as pool:
+            feature_matrices = pool.map(build_season, season_list)
+    else:
+        feature_matrices = [build_season(season) for season in season_list]
+
+    print(f"Built {len(season_list)} seasons with {sum(len(matrix) for matrix in feature_matrices)} matches")
+
+    return MatchFeatureMatrix.concatenate(feature_matrices)
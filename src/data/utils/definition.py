@@ -1,5 +1,131 @@
-import sqlite3
+import os
 from datetime import datetime, date
+import data.utils.connection_provider as connection_provider
+from data.utils.connection_provider import get_connection, get_read_connection, transaction, enable_wal_mode
+from data.utils.manipulation import fill_team_rolling_stats, normalize_match_dates
+
+# Migrações do schema, aplicadas em ordem pelo migrate_database. A versão do banco fica
+# guardada no PRAGMA user_version, então cada migração roda uma vez só em cada banco.
+MIGRATIONS = [
+    (1, "Indexes for the date, team and participation lookups", (
+        # Intervalos de data (seasons), ORDER BY date e get_last_date, sem ler a tabela
+        """CREATE INDEX IF NOT EXISTS idx_match_data_date
+            ON match_data (date, fk_participation_home, fk_participation_away);""",
+        # JOIN de uma participação com a sua partida
+        """CREATE INDEX IF NOT EXISTS idx_match_data_participation_home
+            ON match_data (fk_participation_home, date);""",
+        """CREATE INDEX IF NOT EXISTS idx_match_data_participation_away
+            ON match_data (fk_participation_away, date);""",
+        # Partidas de um time em casa ou fora (get_averages)
+        """CREATE INDEX IF NOT EXISTS idx_participation_team
+            ON participation (fk_team_id, team_is_home);"""
+    )),
+    (2, "Cumulative per-team stats table (team_rolling_stats)", (
+        # Uma linha por (time, casa/fora, data) com as somas da season até aquela data, inclusive
+        """CREATE TABLE IF NOT EXISTS team_rolling_stats (
+            fk_team_id                              INTEGER NOT NULL,
+            team_is_home                            BIT NOT NULL,
+            date                                    DATE NOT NULL,
+            season_start                            DATE NOT NULL,
+            won_sum                                 INTEGER NOT NULL,
+            points_sum                              INTEGER NOT NULL,
+            spread_sum                              INTEGER NOT NULL,
+            offensive_rebounds_sum                  INTEGER NOT NULL,
+            defensive_rebounds_sum                  INTEGER NOT NULL,
+            field_goals_percentage_sum              REAL NOT NULL,
+            three_point_field_goals_percentage_sum  REAL NOT NULL,
+            free_throws_percentage_sum              REAL NOT NULL,
+            turnover_sum                            INTEGER NOT NULL,
+            assists_sum                             INTEGER NOT NULL,
+            won_count                               INTEGER NOT NULL,
+            points_count                            INTEGER NOT NULL,
+            spread_count                            INTEGER NOT NULL,
+            offensive_rebounds_count                INTEGER NOT NULL,
+            defensive_rebounds_count                INTEGER NOT NULL,
+            field_goals_percentage_count            INTEGER NOT NULL,
+            three_point_field_goals_percentage_count INTEGER NOT NULL,
+            free_throws_percentage_count            INTEGER NOT NULL,
+            turnover_count                          INTEGER NOT NULL,
+            assists_count                           INTEGER NOT NULL,
+            won_spread_sum                          INTEGER NOT NULL,
+            match_count                             INTEGER NOT NULL,
+            PRIMARY KEY (fk_team_id, team_is_home, date),
+            FOREIGN KEY (fk_team_id) REFERENCES team (team_id)
+        ) WITHOUT ROWID;""",
+        fill_team_rolling_stats
+    )),
+    (3, "Canonical YYYY-MM-DD match dates", (
+        normalize_match_dates,
+        # As comparações de intervalo são feitas como texto, então só funcionam com um formato só
+        """CREATE TRIGGER IF NOT EXISTS match_data_date_format_insert
+            BEFORE INSERT ON match_data
+            WHEN NEW.date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+            BEGIN
+                SELECT RAISE(ABORT, 'match_data.date must be in the YYYY-MM-DD format');
+            END;""",
+        """CREATE TRIGGER IF NOT EXISTS match_data_date_format_update
+            BEFORE UPDATE OF date ON match_data
+            WHEN NEW.date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+            BEGIN
+                SELECT RAISE(ABORT, 'match_data.date must be in the YYYY-MM-DD format');
+            END;"""
+    )),
+    (4, "Revision counter of the match dates (match_revision)", (
+        # Uma linha por data com a última revisão em que uma partida daquela data mudou. As
+        # revisões só crescem, então o MAX de um intervalo de datas muda sempre que alguma
+        # partida do intervalo é inserida, apagada ou corrigida
+        """CREATE TABLE IF NOT EXISTS match_revision (
+            date        DATE NOT NULL PRIMARY KEY,
+            revision    INTEGER NOT NULL
+        ) WITHOUT ROWID;""",
+        """CREATE INDEX IF NOT EXISTS idx_match_revision_revision
+            ON match_revision (revision);""",
+        """INSERT OR REPLACE INTO match_revision (date, revision)
+            SELECT DISTINCT date, 1 FROM match_data;""",
+        """CREATE TRIGGER IF NOT EXISTS match_data_revision_insert
+            AFTER INSERT ON match_data
+            BEGIN
+                INSERT OR REPLACE INTO match_revision (date, revision)
+                    VALUES (NEW.date, (SELECT IFNULL(MAX(revision), 0) + 1 FROM match_revision));
+            END;""",
+        """CREATE TRIGGER IF NOT EXISTS match_data_revision_update
+            AFTER UPDATE ON match_data
+            BEGIN
+                INSERT OR REPLACE INTO match_revision (date, revision)
+                    VALUES (OLD.date, (SELECT IFNULL(MAX(revision), 0) + 1 FROM match_revision));
+                INSERT OR REPLACE INTO match_revision (date, revision)
+                    VALUES (NEW.date, (SELECT IFNULL(MAX(revision), 0) + 1 FROM match_revision));
+            END;""",
+        """CREATE TRIGGER IF NOT EXISTS match_data_revision_delete
+            AFTER DELETE ON match_data
+            BEGIN
+                INSERT OR REPLACE INTO match_revision (date, revision)
+                    VALUES (OLD.date, (SELECT IFNULL(MAX(revision), 0) + 1 FROM match_revision));
+            END;""",
+        # Só as colunas que as médias (e o MatchSnapshot) leem; corrigir minutes_played, por
+        # exemplo, não invalida nenhum conjunto de dados
+        """CREATE TRIGGER IF NOT EXISTS participation_revision_update
+            AFTER UPDATE OF participation_id, fk_team_id, team_is_home, won, points, offensive_rebounds,
+                defensive_rebounds, field_goals_percentage, three_point_field_goals_percentage,
+                free_throws_percentage, turnover, assists ON participation
+            BEGIN
+                INSERT OR REPLACE INTO match_revision (date, revision)
+                    SELECT md.date, (SELECT IFNULL(MAX(revision), 0) + 1 FROM match_revision)
+                    FROM match_data as md
+                    WHERE md.fk_participation_home IN (OLD.participation_id, NEW.participation_id)
+                       OR md.fk_participation_away IN (OLD.participation_id, NEW.participation_id);
+            END;""",
+        """CREATE TRIGGER IF NOT EXISTS participation_revision_delete
+            AFTER DELETE ON participation
+            BEGIN
+                INSERT OR REPLACE INTO match_revision (date, revision)
+                    SELECT md.date, (SELECT IFNULL(MAX(revision), 0) + 1 FROM match_revision)
+                    FROM match_data as md
+                    WHERE md.fk_participation_home = OLD.participation_id
+                       OR md.fk_participation_away = OLD.participation_id;
+            END;"""
+    )),
+]
 
 
 def create_database():
@@ -14,188 +140,256 @@ def create_database():
         -------
     '''
     try:
-        db_connection = sqlite3.connect('data/database.sqlite3')
-        cursor = db_connection.cursor()
-        cursor.executescript("""
-        CREATE TABLE IF NOT EXISTS participation (
-            participation_id        INTEGER NOT NULL PRIMARY KEY,
-            fk_team_id              INTEGER NOT NULL,
-            team_name               VARCHAR(50),
-            team_is_home            BIT NOT NULL,
-            minutes_played          VARCHAR(10) NOT NULL,
-            field_goals             INTEGER NOT NULL,
-            field_goals_attempts    INTEGER NOT NULL,
-            field_goals_percentage  DECIMAL(4,3) NOT NULL,
-            three_point_field_goals INTEGER NOT NULL,
-            three_point_field_goals_attempts INTEGER NOT NULL,
-            three_point_field_goals_percentage DECIMAL(4,3) NOT NULL,
-            free_throws             INTEGER NOT NULL,
-            free_throws_attempts    INTEGER NOT NULL,
-            free_throws_percentage  DECIMAL(4,3) NOT NULL,
-            offensive_rebounds      INTEGER NOT NULL,
-            defensive_rebounds      INTEGER NOT NULL,
-            total_rebounds          INTEGER NOT NULL,
-            assists                 INTEGER NOT NULL,
-            steals                  INTEGER NOT NULL,
-            blocks                  INTEGER NOT NULL,
-            turnover                INTEGER NOT NULL,
-            personal_faults         INTEGER NOT NULL,
-            points                  INTEGER NOT NULL,
-            mat_count_by_team       INTEGER NOT NULL,
-            won                     BIT NOT NULL,
-            FOREIGN KEY (fk_team_id) REFERENCES team (team_id)
-        );
-        CREATE TABLE IF NOT EXISTS match_data(
-            match_id                    INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
-            fk_participation_home       INTEGER NOT NULL,
-            fk_participation_away       INTEGER NOT NULL,
-            date                        DATE NOT NULL,
-            FOREIGN KEY (fk_participation_home) references participation (participation_id),
-            FOREIGN KEY (fk_participation_away) references participation (participation_id)
-        );
-        CREATE TABLE IF NOT EXISTS team (
-            team_id         INTEGER NOT NULL PRIMARY KEY,
-            team_name       VARCHAR(50),
-            team_abv        VARCHAR(10)
-        );
+        with transaction() as cursor:
+            cursor.executescript("""
+            CREATE TABLE IF NOT EXISTS participation (
+                participation_id        INTEGER NOT NULL PRIMARY KEY,
+                fk_team_id              INTEGER NOT NULL,
+                team_name               VARCHAR(50),
+                team_is_home            BIT NOT NULL,
+                minutes_played          VARCHAR(10) NOT NULL,
+                field_goals             INTEGER NOT NULL,
+                field_goals_attempts    INTEGER NOT NULL,
+                field_goals_percentage  DECIMAL(4,3) NOT NULL,
+                three_point_field_goals INTEGER NOT NULL,
+                three_point_field_goals_attempts INTEGER NOT NULL,
+                three_point_field_goals_percentage DECIMAL(4,3) NOT NULL,
+                free_throws             INTEGER NOT NULL,
+                free_throws_attempts    INTEGER NOT NULL,
+                free_throws_percentage  DECIMAL(4,3) NOT NULL,
+                offensive_rebounds      INTEGER NOT NULL,
+                defensive_rebounds      INTEGER NOT NULL,
+                total_rebounds          INTEGER NOT NULL,
+                assists                 INTEGER NOT NULL,
+                steals                  INTEGER NOT NULL,
+                blocks                  INTEGER NOT NULL,
+                turnover                INTEGER NOT NULL,
+                personal_faults         INTEGER NOT NULL,
+                points                  INTEGER NOT NULL,
+                mat_count_by_team       INTEGER NOT NULL,
+                won                     BIT NOT NULL,
+                FOREIGN KEY (fk_team_id) REFERENCES team (team_id)
+            );
+            CREATE TABLE IF NOT EXISTS match_data(
+                match_id                    INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+                fk_participation_home       INTEGER NOT NULL,
+                fk_participation_away       INTEGER NOT NULL,
+                date                        DATE NOT NULL,
+                FOREIGN KEY (fk_participation_home) references participation (participation_id),
+                FOREIGN KEY (fk_participation_away) references participation (participation_id)
+            );
+            CREATE TABLE IF NOT EXISTS team (
+                team_id         INTEGER NOT NULL PRIMARY KEY,
+                team_name       VARCHAR(50),
+                team_abv        VARCHAR(10)
+            );
         
-        """)
-
-        db_connection.commit()
+            """)
 
         print('Tabela(s) criadas com sucesso.')
+
+        migrate_database()
     except Exception as exception:
         print(exception)
         raise(exception)
-    finally:
-        db_connection.close()
 
 
 def fill_teams():
     try:
-        db_connection = sqlite3.connect('data/database.sqlite3')
-        cursor = db_connection.cursor()
-
-        cursor.executescript("""
-            INSERT INTO team (team_name, team_abv) 
-                values
-                    ('Anderson Packers', 'AND'),
-                    ('Atlanta Hawks', 'ATL'),
-                    ('Baltimore Bullets', 'BAL'),
-                    ('Brooklyn Nets', 'BRK'),
-                    ('Boston Celtics', 'BOS'),
-                    ('Buffalo Braves', 'BUF'),
-                    ('Capital Bullets', 'CAP'),
-                    ('Charlotte Hornets', 'CHO'),
-                    ('Charlotte Bobcats', 'CHN'),
-                    ('Chicago Bulls', 'CHI'),
-                    ('Chicago Packers', 'CHP'),
-                    ('Chicago Zephyrs', 'CHP'),
-                    ('Chicago Stags', 'CHS'),
-                    ('Cincinnati Royals', 'CIN'),
-                    ('Cleveland Cavaliers', 'CLE'),
-                    ('Dallas Mavericks', 'DAL'),
-                    ('Dallas Chaparrals', 'DLC'),
-                    ('Denver Nuggets', 'DEN'),
-                    ('Denver Rockets', 'DEN'),
-                    ('Detroit Pistons', 'DET'),
-                    ('Fort Wayne Pistons', 'FTW'),
-                    ('Golden State Warriors', 'GSW'),
-                    ('Houston Rockets', 'HOU'),
-                    ('Indiana Pacers', 'IND'),
-                    ('Indianapolis Olympians', 'INO'),
-                    ('Kansas City Kings', 'KCK'),
-                    ('Kansas City-Omaha Kings', 'KCO'),
-                    ('Los Angeles Clippers', 'LAC'),
-                    ('Los Angeles Lakers', 'LAL'),
-                    ('Memphis Grizzlies', 'MEM'),
-                    ('Miami Heat', 'MIA'),
-                    ('Milwaukee Bucks', 'MIL'),
-                    ('Milwaukee Hawks', 'MLH'),
-                    ('Minneapolis Lakers', 'MPL'),
-                    ('Minnesota Muskies', 'MNM'),
-                    ('Minnesota Timberwolves', 'MIN'),
-                    ('New Jersey Nets', 'NJN'),
-                    ('New Orleans Hornets', 'NOK'),
-                    ('New Orleans Jazz', 'NOR'),
-                    ('New Orleans Pelicans', 'NOP'),
-                    ('New York Knicks', 'NYK'),
-                    ('New York Nets', 'NYN'),
-                    ('Oklahoma City Hornets', 'NOK'),
-                    ('Oklahoma City Thunder', 'OKC'),
-                    ('Orlando Magic', 'ORL'),
-                    ('Philadelphia 76ers', 'PHI'),
-                    ('Philadelphia Warriors', 'PHW'),
-                    ('Phoenix Suns', 'PHO'),
-                    ('Portland Trail Blazers', 'POR'),
-                    ('Rochester Royals', 'ROC'),
-                    ('Sacramento Kings', 'SAC'),
-                    ('San Antonio Spurs', 'SAS'),
-                    ('San Diego Clippers', 'SDC'),
-                    ('San Diego Rockets', 'SDR'),
-                    ('San Francisco Warriors', 'SFW'),
-                    ('Seattle SuperSonics', 'SEA'),
-                    ('Sheboygan Redskins', 'SHE'),
-                    ('St. Louis Bombers', 'SLB'),
-                    ('St. Louis Hawks', 'STL'),
-                    ('Syracuse Nationals', 'SYR'),
-                    ('Toronto Raptors', 'TOR'),
-                    ('Tri-Cities Blackhawks', 'TRI'),
-                    ('Utah Jazz', 'UTA'),
-                    ('Vancouver Grizzlies', 'VAN'),
-                    ('Washington Bullets', 'WAS'),
-                    ('Washington Capitals', 'WSC'),
-                    ('Washington Wizards', 'WAS'),
-                    ('Waterloo Hawks', 'WAT');
-        """)
-
-        db_connection.commit()
+        with transaction() as cursor:
+            cursor.executescript("""
+                INSERT INTO team (team_name, team_abv) 
+                    values
+                        ('Anderson Packers', 'AND'),
+                        ('Atlanta Hawks', 'ATL'),
+                        ('Baltimore Bullets', 'BAL'),
+                        ('Brooklyn Nets', 'BRK'),
+                        ('Boston Celtics', 'BOS'),
+                        ('Buffalo Braves', 'BUF'),
+                        ('Capital Bullets', 'CAP'),
+                        ('Charlotte Hornets', 'CHO'),
+                        ('Charlotte Bobcats', 'CHN'),
+                        ('Chicago Bulls', 'CHI'),
+                        ('Chicago Packers', 'CHP'),
+                        ('Chicago Zephyrs', 'CHP'),
+                        ('Chicago Stags', 'CHS'),
+                        ('Cincinnati Royals', 'CIN'),
+                        ('Cleveland Cavaliers', 'CLE'),
+                        ('Dallas Mavericks', 'DAL'),
+                        ('Dallas Chaparrals', 'DLC'),
+                        ('Denver Nuggets', 'DEN'),
+                        ('Denver Rockets', 'DEN'),
+                        ('Detroit Pistons', 'DET'),
+                        ('Fort Wayne Pistons', 'FTW'),
+                        ('Golden State Warriors', 'GSW'),
+                        ('Houston Rockets', 'HOU'),
+                        ('Indiana Pacers', 'IND'),
+                        ('Indianapolis Olympians', 'INO'),
+                        ('Kansas City Kings', 'KCK'),
+                        ('Kansas City-Omaha Kings', 'KCO'),
+                        ('Los Angeles Clippers', 'LAC'),
+                        ('Los Angeles Lakers', 'LAL'),
+                        ('Memphis Grizzlies', 'MEM'),
+                        ('Miami Heat', 'MIA'),
+                        ('Milwaukee Bucks', 'MIL'),
+                        ('Milwaukee Hawks', 'MLH'),
+                        ('Minneapolis Lakers', 'MPL'),
+                        ('Minnesota Muskies', 'MNM'),
+                        ('Minnesota Timberwolves', 'MIN'),
+                        ('New Jersey Nets', 'NJN'),
+                        ('New Orleans Hornets', 'NOK'),
+                        ('New Orleans Jazz', 'NOR'),
+                        ('New Orleans Pelicans', 'NOP'),
+                        ('New York Knicks', 'NYK'),
+                        ('New York Nets', 'NYN'),
+                        ('Oklahoma City Hornets', 'NOK'),
+                        ('Oklahoma City Thunder', 'OKC'),
+                        ('Orlando Magic', 'ORL'),
+                        ('Philadelphia 76ers', 'PHI'),
+                        ('Philadelphia Warriors', 'PHW'),
+                        ('Phoenix Suns', 'PHO'),
+                        ('Portland Trail Blazers', 'POR'),
+                        ('Rochester Royals', 'ROC'),
+                        ('Sacramento Kings', 'SAC'),
+                        ('San Antonio Spurs', 'SAS'),
+                        ('San Diego Clippers', 'SDC'),
+                        ('San Diego Rockets', 'SDR'),
+                        ('San Francisco Warriors', 'SFW'),
+                        ('Seattle SuperSonics', 'SEA'),
+                        ('Sheboygan Redskins', 'SHE'),
+                        ('St. Louis Bombers', 'SLB'),
+                        ('St. Louis Hawks', 'STL'),
+                        ('Syracuse Nationals', 'SYR'),
+                        ('Toronto Raptors', 'TOR'),
+                        ('Tri-Cities Blackhawks', 'TRI'),
+                        ('Utah Jazz', 'UTA'),
+                        ('Vancouver Grizzlies', 'VAN'),
+                        ('Washington Bullets', 'WAS'),
+                        ('Washington Capitals', 'WSC'),
+                        ('Washington Wizards', 'WAS'),
+                        ('Waterloo Hawks', 'WAT');
+            """)
 
         print("Team preechido com sucesso.")
     except Exception as exception:
         print(exception)
         raise(exception)
-    finally:
-        db_connection.close()
 
 
 def drop_tables():
     try:
-        db_connection = sqlite3.connect('data/database.sqlite3')
-        cursor = db_connection.cursor()
-
-        cursor.executescript("""
-            DROP TABLE IF EXISTS match_data;
-            DROP TABLE IF EXISTS participation;
-            DROP TABLE IF EXISTS team;
-        """)
-
-        db_connection.commit()
+        with transaction() as cursor:
+            cursor.executescript("""
+                DROP TABLE IF EXISTS match_data;
+                DROP TABLE IF EXISTS participation;
+                DROP TABLE IF EXISTS team;
+                DROP TABLE IF EXISTS team_rolling_stats;
+                DROP TABLE IF EXISTS match_revision;
+                PRAGMA user_version = 0;
+            """)
 
         print("Tabela(s) deletadas com sucesso.")
     except Exception as exception:
         print(exception)
         raise(exception)
-    finally:
-        db_connection.close()
 
 def drop_team():
     try:
-        db_connection = sqlite3.connect('data/database.sqlite3')
-        cursor = db_connection.cursor()
+        with transaction() as cursor:
+            cursor.executescript("""
+                DROP TABLE IF EXISTS team;
+            """)
 
-        cursor.executescript("""
-            DROP TABLE IF EXISTS team;
-        """)
+        print("team deletado com sucesso.")
+    except Exception as exception:
+        print(exception)
+        raise(exception)
 
-        db_connection.commit()
 
-        print("team deletado com sucesso.")
+def get_schema_version():
+    """Retorna a versão do schema do banco, que é a última migração aplicada (0 se nenhuma)"""
+
+    return get_read_connection().execute("PRAGMA user_version;").fetchone()[0]
+
+
+def is_schema_current():
+    """Confere, só com a conexão de leitura, se o banco existe e já tem todas as MIGRATIONS
+    aplicadas. Os comandos que não são o migrate só rodam nesse caso, sem mexer no arquivo.
+
+    Returns:
+        bool: True se a versão do schema for a da última migração
+    """
+
+    # Sem o arquivo a conexão só de leitura não abre; o migrate_database cria o banco
+    if(not os.path.exists(connection_provider.DATABASE_PATH)):
+        return False
+
+    return get_schema_version() >= MIGRATIONS[-1][0]
+
+
+def is_database_current():
+    """Confere, só com a conexão de leitura, se o banco já está no modo WAL e com todas as
+    MIGRATIONS aplicadas
+
+    Returns:
+        bool: True se o migrate_database não tiver nada para fazer
+    """
+
+    if(not is_schema_current()):
+        return False
+
+    journal_mode = get_read_connection().execute("PRAGMA journal_mode;").fetchone()[0]
+
+    return journal_mode == "wal"
+
+
+def migrate_database():
+    """Aplica no banco as MIGRATIONS que ainda não foram aplicadas, cada uma na sua própria
+    transação junto com a nova versão do schema, e depois roda o ANALYZE para o SQLite
+    escolher os índices certos. Pode ser chamada várias vezes; um banco atualizado só é lido,
+    sem abrir a conexão de escrita.
+
+    Antes das migrações o banco passa para o modo WAL, que deixa os processos que só leem
+    rodarem junto com um que escreve (ver connection_provider).
+
+    Returns:
+        int: A versão do schema depois das migrações
+    """
+
+    if(is_database_current()):
+        return get_schema_version()
+
+    # Não pode ficar dentro das transações das migrações
+    enable_wal_mode()
+
+    schema_version = get_schema_version()
+    pending_migrations = [migration for migration in MIGRATIONS
+                          if migration[0] > schema_version]
+
+    try:
+        for migration_version, description, statements in pending_migrations:
+            with transaction() as cursor:
+                # DDL não abre transação sozinho no sqlite3 do Python
+                cursor.execute("BEGIN;")
+                for statement in statements:
+                    # Passos que não são SQL (ex.: preencher uma tabela nova) recebem o cursor
+                    if(callable(statement)):
+                        statement(cursor)
+                    else:
+                        cursor.execute(statement)
+                cursor.execute(f"PRAGMA user_version = {migration_version};")
+
+            print(f"Applied migration {migration_version}: {description}")
+
+        if(len(pending_migrations) > 0):
+            with transaction() as cursor:
+                cursor.execute("ANALYZE;")
+
     except Exception as exception:
         print(exception)
         raise(exception)
-    finally:
-        db_connection.close()
+
+    return get_schema_version()
 
 
 if __name__ == "__main__":
@@ -1,24 +1,63 @@
-import sqlite3
 import datetime
 
-from pathlib import Path
-from os.path import join
-from core.utils.directory_manipulation import Directory
+from data.utils.connection_provider import get_connection, transaction, fetch_batches, FETCH_BATCH_SIZE
+from data.utils.data_provider import ROLLING_STATS_COLUMNS, build_season_running_sums, \
+    get_participation_history, unload_stats_index, unload_match_snapshot, get_date_string
+
+# Colunas da participation em cada partida do retrieve_match_stats e do iter_match_stats
+MATCH_STATS_COLUMNS = ("field_goals", "field_goals_attempts", "field_goals_percentage",
+                       "three_point_field_goals", "three_point_field_goals_attempts",
+                       "three_point_field_goals_percentage", "free_throws", "free_throws_attempts",
+                       "free_throws_percentage", "offensive_rebounds", "defensive_rebounds", "total_rebounds",
+                       "assists", "steals", "blocks", "turnover", "personal_faults", "points",
+                       "mat_count_by_team", "won")
+
+PARTICIPATION_INSERT = """
+    INSERT INTO participation (
+        participation_id,
+        fk_team_id,
+        team_name,
+        team_is_home,
+        minutes_played,
+        field_goals,
+        field_goals_attempts,
+        field_goals_percentage,
+        three_point_field_goals,
+        three_point_field_goals_attempts,
+        three_point_field_goals_percentage,
+        free_throws,
+        free_throws_attempts,
+        free_throws_percentage,
+        offensive_rebounds,
+        defensive_rebounds,
+        total_rebounds,
+        assists,
+        steals,
+        blocks,
+        turnover,
+        personal_faults,
+        points,
+        mat_count_by_team,
+        won
+    ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)"""
+
+MATCH_INSERT = """
+    INSERT INTO match_data (
+        fk_participation_home,
+        fk_participation_away,
+        date
+    ) VALUES (?, ?, ?);"""
+
 
 def insert_teams_data(team_data):
     try:
-        db_connection = sqlite3.connect(join(Directory(Path(__file__).resolve().parent.parent.parent).cwd,
-                                                 'data', 'database.sqlite3'))
-        cursor = db_connection.cursor()
-
-        cursor.executemany("""
-        INSERT INTO team (
-            team_id,
-            team_name,
-            team_abv
-        ) VALUES (?,?,?)""", team_data)
-
-        db_connection.commit()
+        with transaction() as cursor:
+            cursor.executemany("""
+            INSERT INTO team (
+                team_id,
+                team_name,
+                team_abv
+            ) VALUES (?,?,?)""", team_data)
         print("Team data inserted successfully")
     except Exception as e:
         print(e)
@@ -27,40 +66,8 @@ def insert_teams_data(team_data):
 
 def insert_participation_data(participation_data):
     try:
-        db_connection = sqlite3.connect(join(Directory(Path(__file__).resolve().parent.parent.parent).cwd,
-                                                 'data', 'database.sqlite3'))
-        cursor = db_connection.cursor()
-
-        cursor.executemany("""
-        INSERT INTO participation (
-            participation_id,
-            fk_team_id,
-            team_name,
-            team_is_home,
-            minutes_played,
-            field_goals,
-            field_goals_attempts,
-            field_goals_percentage,
-            three_point_field_goals,
-            three_point_field_goals_attempts,
-            three_point_field_goals_percentage,
-            free_throws,
-            free_throws_attempts,
-            free_throws_percentage,
-            offensive_rebounds,
-            defensive_rebounds,
-            total_rebounds,
-            assists,
-            steals,
-            blocks,
-            turnover,
-            personal_faults,
-            points,
-            mat_count_by_team,
-            won
-        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)""", participation_data)
-
-        db_connection.commit()
+        with transaction() as cursor:
+            cursor.executemany(PARTICIPATION_INSERT, participation_data)
         print("Participation data inserted successfully")
     except Exception as e:
         print(e)
@@ -70,30 +77,221 @@ def insert_participation_data(participation_data):
 def insert_match_data(match_data):
 
     try:
-        db_connection = sqlite3.connect(join(Directory(Path(__file__).resolve().parent.parent.parent).cwd,
-                                                 'data', 'database.sqlite3'))
-        cursor = db_connection.cursor()
-
-        cursor.executemany("""
-            INSERT INTO match_data (
-                fk_participation_home,
-                fk_participation_away,
-                date
-            ) VALUES (?, ?, ?);
-        """, match_data)
-
-        db_connection.commit()
+        with transaction() as cursor:
+            cursor.executemany(MATCH_INSERT, match_data)
         print("Match data inserted successfully")
     except Exception as e:
         print(e)
         raise e
 
 
+def insert_games(games):
+    """Insere várias partidas de uma vez (ex.: um dia ou uma season inteira do web scraping)
+    em uma transação só, com um executemany para as participações e outro para as partidas,
+    e atualiza a team_rolling_stats dos times envolvidos na mesma transação.
+
+    Os participation_id são reservados em bloco a partir do MAX(participation_id), que o SQLite
+    lê direto do fim da chave primária, ao invés de uma consulta por participação.
+
+    Args:
+        games (list): Uma tupla (participação da casa, participação de fora, data no formato
+            YYYY-MM-DD) por partida, com as participações no formato do insert_participation_data.
+            O participation_id que vier nelas é ignorado.
+
+    Returns:
+        int: Quantidade de partidas inseridas
+    """
+
+    if(len(games) == 0):
+        return 0
+
+    try:
+        with transaction() as cursor:
+            # Já trava a escrita aqui, para ninguém reservar os mesmos ids entre o MAX e os INSERTs
+            cursor.execute("BEGIN IMMEDIATE;")
+            cursor.execute("SELECT MAX(participation_id) FROM participation;")
+            last_participation_id = cursor.fetchone()[0] or 0
+
+            participation_data = []
+            match_data = []
+            for game_index, (home_participation, away_participation, date) in enumerate(games):
+                home_participation_id = last_participation_id + 2 * game_index + 1
+                away_participation_id = home_participation_id + 1
+
+                participation_data.append(
+                    (home_participation_id, *home_participation[1:]))
+                participation_data.append(
+                    (away_participation_id, *away_participation[1:]))
+                match_data.append(
+                    (home_participation_id, away_participation_id, date))
+
+            cursor.executemany(PARTICIPATION_INSERT, participation_data)
+            cursor.executemany(MATCH_INSERT, match_data)
+
+            team_keys = {(home_participation[1], 1) for home_participation, _, _ in games} | \
+                {(away_participation[1], 0) for _, away_participation, _ in games}
+            update_rolling_stats_from(
+                cursor, team_keys, min(date for _, _, date in games))
+
+        print(f"{len(games)} matches inserted successfully")
+
+        return len(games)
+    except Exception as e:
+        print(e)
+        raise e
+
+
+def write_team_rolling_stats(cursor, date_start, team_keys=None, initial_sums=None):
+    """Recalcula as linhas da team_rolling_stats a partir de date_start (inclusive), lendo as
+    participações dessa data em diante
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor de uma transação aberta
+        date_start (str): Data no formato YYYY-MM-DD
+        team_keys (set, optional): Os (id do time, local) a recalcular. Defaults to None (todos).
+        initial_sums (dict, optional): Somas de onde cada time continua, como no build_season_running_sums. Defaults to None.
+
+    Returns:
+        int: Quantidade de linhas escritas
+    """
+
+    # O snapshot pode não ter as partidas que acabaram de ser inseridas
+    participation_history = [participation for participation in get_participation_history(date_start, "9999-12-31", use_snapshot=False)
+                             if team_keys is None or (participation[1], participation[2]) in team_keys]
+    running_sums = build_season_running_sums(
+        participation_history, initial_sums)
+
+    rolling_stats = [(team_id, local, date, season_start, *sums)
+                     for (team_id, local), team_sums in running_sums.items()
+                     for date, season_start, sums in zip(team_sums["dates"], team_sums["season_starts"], team_sums["sums"])]
+
+    if(team_keys is None):
+        cursor.execute(
+            """DELETE FROM team_rolling_stats WHERE date >= ?""", [date_start])
+    else:
+        cursor.executemany("""DELETE FROM team_rolling_stats WHERE fk_team_id = ? AND team_is_home = ? AND date >= ?""",
+                           [(team_id, local, date_start) for team_id, local in team_keys])
+
+    # Um time com duas partidas no mesmo dia fica só com a soma depois da última
+    cursor.executemany("""
+        INSERT OR REPLACE INTO team_rolling_stats (
+            fk_team_id,
+            team_is_home,
+            date,
+            season_start,
+            """ + ",\n            ".join(ROLLING_STATS_COLUMNS) + """
+        ) VALUES (""" + ",".join("?" * (len(ROLLING_STATS_COLUMNS) + 4)) + """)""", rolling_stats)
+
+    unload_stats_index()
+    unload_match_snapshot()
+
+    return len(rolling_stats)
+
+
+def fill_team_rolling_stats(cursor):
+    """Apaga e recalcula a team_rolling_stats inteira. Usada pela migração que cria a tabela."""
+
+    return write_team_rolling_stats(cursor, "0000-00-00")
+
+
+def backfill_team_rolling_stats():
+    """Recalcula a team_rolling_stats inteira a partir das partidas do banco"""
+
+    try:
+        with transaction() as cursor:
+            row_amount = fill_team_rolling_stats(cursor)
+
+        print(f"Team rolling stats rebuilt: {row_amount} rows")
+    except Exception as e:
+        print(e)
+        raise e
+
+
+def normalize_match_dates(cursor):
+    """Reescreve no formato YYYY-MM-DD as datas da match_data guardadas em outro formato
+    (ex.: 2018-6-20 ou 20/06/2018), e recalcula a team_rolling_stats se alguma mudou.
+    Usada pela migração que passa a exigir esse formato.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor de uma transação aberta
+
+    Returns:
+        int: Quantidade de partidas corrigidas
+    """
+
+    cursor.execute("""
+        SELECT match_id, date FROM match_data
+        WHERE date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'""")
+    wrong_dates = cursor.fetchall()
+
+    for match_id, date in wrong_dates:
+        date_parts = str(date).split(" ")[0].replace("/", "-").split("-")
+        # Datas no formato dia-mês-ano
+        if(len(date_parts[0]) != 4):
+            date_parts.reverse()
+
+        cursor.execute("""UPDATE match_data SET date = ? WHERE match_id = ?""",
+                       [get_date_string(date_parts), match_id])
+
+    if(len(wrong_dates) > 0):
+        print(f"{len(wrong_dates)} match dates changed to the YYYY-MM-DD format")
+        fill_team_rolling_stats(cursor)
+
+    return len(wrong_dates)
+
+
+def update_team_rolling_stats(team_id, local, match_date):
+    """Atualiza a team_rolling_stats depois que uma partida do time é inserida. Normalmente
+    a partida é mais nova que todas as outras do time, e só uma linha nova é somada à última;
+    se ela for mais antiga, as linhas do time a partir dela são recalculadas.
+
+    Args:
+        team_id (int): id do time
+        local (int): 1(casa) ou 0(fora)
+        match_date (str): Data da partida no formato YYYY-MM-DD
+    """
+
+    try:
+        with transaction() as cursor:
+            update_rolling_stats_from(cursor, {(team_id, local)}, match_date)
+    except Exception as e:
+        print(e)
+        raise e
+
+
+def update_rolling_stats_from(cursor, team_keys, date_start):
+    """Recalcula as linhas da team_rolling_stats dos times a partir de date_start, continuando
+    das somas da última linha de cada um antes dessa data
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor de uma transação aberta
+        team_keys (set): Os (id do time, local) a recalcular
+        date_start (str): Data no formato YYYY-MM-DD
+
+    Returns:
+        int: Quantidade de linhas escritas
+    """
+
+    initial_sums = {}
+    for team_id, local in team_keys:
+        cursor.execute("""
+            SELECT season_start, """ + ", ".join(ROLLING_STATS_COLUMNS) + """
+            FROM team_rolling_stats
+            WHERE fk_team_id = ? AND team_is_home = ? AND date < ?
+            ORDER BY date DESC
+            LIMIT 1""", [team_id, local, date_start])
+        last_rolling_stats = cursor.fetchone()
+
+        if(last_rolling_stats is not None):
+            initial_sums[(team_id, local)] = (
+                last_rolling_stats[0], last_rolling_stats[1:])
+
+    return write_team_rolling_stats(cursor, date_start, team_keys, initial_sums)
+
+
 def retrieve_participation_data(match_id, team_is_home):
     try:
-        db_connection = sqlite3.connect(join(Directory(Path(__file__).resolve().parent.parent.parent).cwd,
-                                                 'data', 'database.sqlite3'))
-        cursor = db_connection.cursor()
+        cursor = get_connection().cursor()
 
         cursor.execute(
             """SELECT * FROM participation WHERE fk_match_id = ? AND team_is_home = ?""", (match_id, team_is_home))
@@ -105,9 +303,7 @@ def retrieve_participation_data(match_id, team_is_home):
 
 def retrieve_match_data(match_id):
     try:
-        db_connection = sqlite3.connect(join(Directory(Path(__file__).resolve().parent.parent.parent).cwd,
-                                                 'data', 'database.sqlite3'))
-        cursor = db_connection.cursor()
+        cursor = get_connection().cursor()
 
         cursor.execute("""SELECT * FROM match_data WHERE id = ?""", match_id)
         return(cursor.fetchall())
@@ -125,9 +321,7 @@ def retrieve_team_id_from_abv(team_abv):
 
     # Filtrar por abreviação
     try:
-        db_connection = sqlite3.connect(join(Directory(Path(__file__).resolve().parent.parent.parent).cwd,
-                                                 'data', 'database.sqlite3'))
-        cursor = db_connection.cursor()
+        cursor = get_connection().cursor()
 
         cursor.execute(
             """SELECT team_id FROM team WHERE team_name = ?""", team_abv)
@@ -137,56 +331,54 @@ def retrieve_team_id_from_abv(team_abv):
         raise e
 
 
-def match_data_factory(cursor, row):
-    #! Essa função foi feita completamente na base da gambiarra. Otimizar depois.
-    match_stats = {
-        "home_team_stats": {},
-        "away_team_stats": {}
-    }
+def retrieve_match_stats():
+    """Todas as partidas do banco, cada uma com as estatísticas do time de casa e de fora
+    em dicionários. Carrega tudo na memória; para exportar muitas seasons use o iter_match_stats.
+
+    Returns:
+        list: [{"home_team_stats": {...}, "away_team_stats": {...}}], com as MATCH_STATS_COLUMNS como chaves
+    """
+
+    results = [{
+        "home_team_stats": dict(zip(MATCH_STATS_COLUMNS, home_team_stats)),
+        "away_team_stats": dict(zip(MATCH_STATS_COLUMNS, away_team_stats))
+    } for _, _, home_team_stats, away_team_stats in iter_match_stats()]
+    print("Match stats retrieved!")
 
-    index_offset = 4
+    return results
 
-    # Inserção de dados dos times
-    for value_index, column in enumerate(cursor.description[index_offset:]):
-        # Fiz essa checagem pra esse método poder funcionar num INNER JOIN
-        # com 2 linhas da mesma tabela (time de casa e time fora)
-        if(column[0] not in match_stats["home_team_stats"]):
-            match_stats["home_team_stats"][column[0]
-                                           ] = row[value_index + index_offset]
-        else:
-            match_stats["away_team_stats"][column[0]
-                                           ] = row[value_index + index_offset]
 
-    entries_to_remove = ['participation_id', 'fk_team_id',
-                         'team_name', 'team_is_home', 'minutes_played']
+def iter_match_stats(batch_size=FETCH_BATCH_SIZE):
+    """Lê todas as partidas do banco em blocos de batch_size, em ordem de match_id, sem montar
+    nenhum dicionário. A memória usada não depende de quantas partidas o banco tem.
 
-    # Tirando o lixo que não precisa
-    for entry in entries_to_remove:
-        match_stats["home_team_stats"].pop(entry, None)
-        match_stats["away_team_stats"].pop(entry, None)
+    Args:
+        batch_size (int, optional): Quantidade de partidas lidas por vez. Defaults to FETCH_BATCH_SIZE.
 
-    return match_stats
+    Yields:
+        tuple: (match_id, data, estatísticas do time de casa, estatísticas do time de fora), com as
+            estatísticas em tuplas na ordem das MATCH_STATS_COLUMNS
+    """
 
+    stat_amount = len(MATCH_STATS_COLUMNS)
 
-def retrieve_match_stats():
     try:
-        db_connection = sqlite3.connect(join(Directory(Path(__file__).resolve().parent.parent.parent).cwd,
-                                                 'data', 'database.sqlite3'))
-        db_connection.row_factory = match_data_factory
-        cursor = db_connection.cursor()
+        cursor = get_connection().cursor()
 
         cursor.execute(
             """
-            SELECT * 
+            SELECT md.match_id, md.date, """ +
+            ", ".join("home_tp." + column for column in MATCH_STATS_COLUMNS) + ", " +
+            ", ".join("away_tp." + column for column in MATCH_STATS_COLUMNS) + """
             FROM match_data as md
             INNER JOIN participation as home_tp
             ON md.fk_participation_home = home_tp.participation_id
             INNER JOIN participation as away_tp
-            ON md.fk_participation_away = away_tp.participation_id;""")
-        results = cursor.fetchall()
-        print("Match stats retrieved!")
+            ON md.fk_participation_away = away_tp.participation_id
+            ORDER BY md.match_id;""")
 
-        return results
+        for row in fetch_batches(cursor, batch_size):
+            yield row[0], row[1], row[2:2 + stat_amount], row[2 + stat_amount:]
     except Exception as e:
         print(e)
         raise e
@@ -194,9 +386,7 @@ def retrieve_match_stats():
 
 def check_tables():
     try:
-        db_connection = sqlite3.connect(join(Directory(Path(__file__).resolve().parent.parent.parent).cwd,
-                                                 'data', 'database.sqlite3'))
-        cursor = db_connection.cursor()
+        cursor = get_connection().cursor()
 
         cursor.execute(""" SELECT * FROM participation;""")
         print(cursor.fetchall())
@@ -211,20 +401,13 @@ def check_tables():
 
 def create_id_participation():
     try:
-        db_connection = sqlite3.connect(join(Directory(Path(__file__).resolve().parent.parent.parent).cwd,
-                                                 'data', 'database.sqlite3'))
-        cursor = db_connection.cursor()
+        cursor = get_connection().cursor()
 
-        cursor.execute(
-            """ SELECT participation_id FROM participation ORDER BY participation_id DESC  ;""")
-        lista = cursor.fetchall()
+        # O MAX da chave primária é lido direto do fim do índice
+        cursor.execute(""" SELECT MAX(participation_id) FROM participation;""")
+        last_participation_id = cursor.fetchone()[0]
 
-        try:
-            team_id = lista[0][0]
-            return team_id + 1
-
-        except Exception as e:
-            return 0
+        return 0 if last_participation_id is None else last_participation_id + 1
 
     except Exception as e:
         print(e)
@@ -242,11 +425,9 @@ def get_last_date():
         list: A lista de datas formatadas como listas [ano,mes,dia]
     """
     try:
-        db_connection = sqlite3.connect(join(Directory(Path(__file__).resolve().parent.parent.parent).cwd,
-                                                 'data', 'database.sqlite3'))
-        cursor = db_connection.cursor()
+        cursor = get_connection().cursor()
 
-        cursor.execute("""SELECT date FROM match_data ORDER BY date DESC""")
+        cursor.execute("""SELECT date FROM match_data ORDER BY date DESC LIMIT 1""")
         dates = cursor.fetchall()
 
         try:
@@ -266,9 +447,7 @@ def get_last_date():
 
 def get_teams_abbreviations():
     try:
-        db_connection = sqlite3.connect(join(Directory(Path(__file__).resolve().parent.parent.parent).cwd,
-                                                 'data', 'database.sqlite3'))
-        cursor = db_connection.cursor()
+        cursor = get_connection().cursor()
 
         cursor.execute("SELECT t.team_name, t.team_abv FROM team as t")
 
@@ -0,0 +1,211 @@
+'''
+Conjunto de dados das partidas em formato de colunas, usado como fitness_input do AG.
+
+Cada partida vira uma linha de três arrays (casa, fora e se o time de casa ganhou),
+e cada coluna dos arrays de estatísticas é uma das STAT_COLUMNS, sempre na mesma ordem.
+Assim o gene i de um cromossomo sempre pesa a estatística STAT_COLUMNS[i], não importando
+a ordem em que o SQL devolveu as colunas.
+'''
+import hashlib
+import numpy as np
+
+# Mesma ordem das colunas retornadas por data_provider.get_averages
+STAT_COLUMNS = (
+    "won",
+    "points",
+    "spread",
+    "offensive_rebounds",
+    "defensive_rebounds",
+    "field_goals_percentage",
+    "three_point_field_goals_percentage",
+    "free_throws_percentage",
+    "turnover",
+    "assists",
+    "won_spread_form",
+)
+
+
+class MatchFeatureMatrix:
+    """Guarda as médias dos times de um conjunto de partidas em arrays do NumPy.
+
+        Estatísticas nulas (ex.: AVG sem nenhuma partida anterior) ficam guardadas como NaN
+        em team_home/team_away, e só são substituídas por missing_value na hora de usar os
+        dados. O padrão de 1.0 faz o gene correspondente ser somado sem peso nenhum, que é o
+        mesmo comportamento que o predict_match sempre teve para valores None.
+
+        Args:
+            team_home (array): Médias do time de casa, uma linha por partida e uma coluna por estatística
+            team_away (array): Médias do time de fora, no mesmo formato de team_home
+            home_won (array, optional): 1.0 se o time de casa ganhou o primeiro quarto, 0.0 se não. Defaults to None.
+            missing_value (float, optional): Valor usado no lugar das estatísticas nulas. Defaults to 1.0.
+            stat_columns (tuple, optional): Nome de cada coluna. Defaults to STAT_COLUMNS.
+    """
+
+    def __init__(self, team_home, team_away, home_won=None, missing_value=1.0, stat_columns=STAT_COLUMNS):
+        self.team_home = np.asarray(team_home, dtype=float).reshape(
+            -1, len(stat_columns))
+        self.team_away = np.asarray(team_away, dtype=float).reshape(
+            -1, len(stat_columns))
+
+        if(self.team_home.shape != self.team_away.shape):
+            raise ValueError(
+                "team_home and team_away must have the same shape.")
+
+        if(home_won is None):
+            # Partidas que ainda não aconteceram (ex.: as do predict_score)
+            home_won = np.full(len(self.team_home), np.nan)
+        self.home_won = np.asarray(home_won, dtype=float).reshape(-1)
+
+        if(len(self.home_won) != len(self.team_home)):
+            raise ValueError(
+                "home_won must have one label for each match.")
+
+        self.missing_value = missing_value
+        self.stat_columns = tuple(stat_columns)
+        self.stat_differences = None
+        self.fingerprint = None
+
+    @classmethod
+    def from_match_list(cls, match_list, missing_value=1.0, stat_columns=STAT_COLUMNS):
+        """Converte a lista de dicionários antiga ({"team_home", "team_away", "home_won"})
+        para o formato em colunas. As estatísticas são procuradas pelo nome, então a ordem
+        das chaves dos dicionários não importa.
+
+        Args:
+            match_list (list): Lista de partidas no formato de dicionários
+            missing_value (float, optional): Valor usado no lugar das estatísticas nulas. Defaults to 1.0.
+            stat_columns (tuple, optional): Nome de cada coluna. Defaults to STAT_COLUMNS.
+
+        Returns:
+            MatchFeatureMatrix: As mesmas partidas em formato de colunas
+        """
+
+        def parse_stats(team_stats):
+            return [np.nan if team_stats.get(stat) is None else team_stats[stat]
+                    for stat in stat_columns]
+
+        team_home = [parse_stats(match["team_home"]) for match in match_list]
+        team_away = [parse_stats(match["team_away"]) for match in match_list]
+        home_won = [np.nan if match.get("home_won") is None else match["home_won"]
+                    for match in match_list]
+
+        return cls(team_home, team_away, home_won, missing_value=missing_value, stat_columns=stat_columns)
+
+    @classmethod
+    def from_match(cls, match, missing_value=1.0, stat_columns=STAT_COLUMNS):
+        """Atalho do from_match_list para uma partida só, como a de
+        data_provider.get_specific_match_averages
+
+        Args:
+            match (dict): Partida no formato {"team_home", "team_away"}
+
+        Returns:
+            MatchFeatureMatrix: Conjunto de dados com uma linha
+        """
+
+        return cls.from_match_list([match], missing_value=missing_value, stat_columns=stat_columns)
+
+    @classmethod
+    def concatenate(cls, feature_matrices):
+        """Junta vários conjuntos de dados em um só, na ordem recebida
+
+        Args:
+            feature_matrices (list): Lista de MatchFeatureMatrix com as mesmas colunas
+
+        Returns:
+            MatchFeatureMatrix: Todas as partidas em um único conjunto de dados
+        """
+
+        first_matrix = feature_matrices[0]
+
+        return cls(np.concatenate([matrix.team_home for matrix in feature_matrices]),
+                   np.concatenate([matrix.team_away for matrix in feature_matrices]),
+                   np.concatenate(
+                       [matrix.home_won for matrix in feature_matrices]),
+                   missing_value=first_matrix.missing_value, stat_columns=first_matrix.stat_columns)
+
+    def __len__(self):
+        return len(self.team_home)
+
+    def __getitem__(self, index):
+        """Permite selecionar partidas como em um array (int, slice ou lista de índices),
+        sempre retornando outro MatchFeatureMatrix
+        """
+
+        if(isinstance(index, (int, np.integer))):
+            index = slice(index, index + 1 if index != -1 else None)
+
+        return MatchFeatureMatrix(self.team_home[index], self.team_away[index], self.home_won[index],
+                                  missing_value=self.missing_value, stat_columns=self.stat_columns)
+
+    def __iter__(self):
+        for match_index in range(len(self)):
+            yield self[match_index]
+
+    @property
+    def stat_count(self):
+        return len(self.stat_columns)
+
+    @property
+    def missing_mask(self):
+        """Retorna (casa, fora) com True nas estatísticas que estão nulas"""
+        return np.isnan(self.team_home), np.isnan(self.team_away)
+
+    def get_home_stats(self):
+        """Retorna as estatísticas do time de casa com os valores nulos já substituídos"""
+        return np.where(np.isnan(self.team_home), self.missing_value, self.team_home)
+
+    def get_away_stats(self):
+        """Retorna as estatísticas do time de fora com os valores nulos já substituídos"""
+        return np.where(np.isnan(self.team_away), self.missing_value, self.team_away)
+
+    def get_stat_differences(self):
+        """Diferença entre as estatísticas de casa e fora de cada partida. É calculada uma vez só,
+        já que o sinal de (genes @ diferença) é o que decide o vencedor previsto de cada partida.
+
+        Returns:
+            np.ndarray: Matriz com uma linha por partida e uma coluna por estatística
+        """
+
+        if(self.stat_differences is None):
+            self.stat_differences = self.get_home_stats() - self.get_away_stats()
+
+        return self.stat_differences
+
+    def get_fingerprint(self):
+        """Gera um hash do conteúdo do conjunto de dados, usado para saber se dois
+        conjuntos têm exatamente as mesmas partidas (ex.: no cache de fitness do AG)
+
+        Returns:
+            bytes: Hash de 16 bytes das partidas, das colunas e do missing_value
+        """
+
+        if(self.fingerprint is None):
+            digest = hashlib.blake2b(digest_size=16)
+            for array in (self.team_home, self.team_away, self.home_won):
+                digest.update(np.ascontiguousarray(array).tobytes())
+            digest.update(
+                repr((self.missing_value, self.stat_columns)).encode())
+            self.fingerprint = digest.digest()
+
+        return self.fingerprint
+
+    def get_home_won_mask(self):
+        """Retorna um array de bool com True nas partidas que o time de casa ganhou"""
+        return self.home_won == 1
+
+    def to_match_list(self):
+        """Converte de volta para a lista de dicionários antiga, com None nos valores nulos
+
+        Returns:
+            list: Lista de partidas no formato {"team_home", "team_away", "home_won"}
+        """
+
+        def parse_stats(team_stats):
+            return {stat: None if np.isnan(value) else float(value)
+                    for stat, value in zip(self.stat_columns, team_stats)}
+
+        return [{"team_home": parse_stats(self.team_home[match_index]),
+                 "team_away": parse_stats(self.team_away[match_index]),
+                 "home_won": None if np.isnan(self.home_won[match_index]) else int(self.home_won[match_index])}
+                for match_index in range(len(self))]
@@ -0,0 +1,253 @@
+'''
+Cópia do histórico de partidas do banco em colunas, um arquivo .npy por coluna (data/snapshot).
+
+Cada partida é uma linha com a data, o id e as estatísticas das duas participações (casa e fora),
+já juntadas, em ordem de data. Os arquivos são abertos com np.load(mmap_mode="r"), então carregar
+o snapshot não lê nada do disco até as colunas serem usadas, e processos diferentes usando o
+mesmo snapshot dividem as mesmas páginas de memória. Depois do load_match_snapshot, o
+data_provider monta as somas acumuladas a partir das colunas, sem os JOINs do get_participation_history.
+Com o use_match_snapshot, a carga só acontece quando alguma season é montada de verdade, e não
+quando o conjunto de dados vem do dataset_cache.
+
+O manifest.json guarda a impressão digital do banco no momento da exportação (a última revisão
+da match_revision); se o banco mudou depois disso, o snapshot é ignorado até ser exportado de
+novo com o comando snapshot.
+'''
+import json
+import os
+import tempfile
+import numpy as np
+from pathlib import Path
+from os.path import join
+from data.utils import data_provider
+from data.utils.connection_provider import get_read_connection, fetch_batches
+from data.utils.dataset_cache import get_database_fingerprint
+
+# Estatísticas guardadas de cada participação, na ordem das AVERAGE_COLUMNS (o spread sai dos points)
+SNAPSHOT_STATS = {
+    "team_id": "<i8",
+    "team_is_home": "<i8",
+    "won": "<i8",
+    "points": "<i8",
+    "offensive_rebounds": "<i8",
+    "defensive_rebounds": "<i8",
+    "field_goals_percentage": "<f8",
+    "three_point_field_goals_percentage": "<f8",
+    "free_throws_percentage": "<f8",
+    "turnover": "<i8",
+    "assists": "<i8",
+}
+SNAPSHOT_COLUMNS = {
+    "match_id": "<i8",
+    "date": "S10",
+    **{f"home_{stat}": dtype for stat, dtype in SNAPSHOT_STATS.items()},
+    **{f"away_{stat}": dtype for stat, dtype in SNAPSHOT_STATS.items()},
+}
+
+
+def get_snapshot_directory():
+    return join(Path(__file__).resolve().parent.parent, 'snapshot')
+
+
+class MatchSnapshot:
+    """Um snapshot do histórico de partidas salvo em disco.
+
+        Args:
+            directory (str, optional): Pasta dos arquivos. Defaults to None (data/snapshot).
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or get_snapshot_directory()
+        self.columns = None
+
+    def get_column_path(self, column):
+        return join(self.directory, f"{column}.npy")
+
+    def read_manifest(self):
+        """Lê o manifest.json do snapshot
+
+        Returns:
+            dict: O manifest, ou None se o snapshot não existir ou estiver incompleto
+        """
+
+        try:
+            with open(join(self.directory, "manifest.json"), "r") as manifest_file:
+                return json.load(manifest_file)
+        except (OSError, ValueError):
+            return None
+
+    def is_valid(self, manifest, database_fingerprint):
+        return(manifest is not None
+               and manifest["columns"] == list(SNAPSHOT_COLUMNS)
+               and manifest["database_fingerprint"] == database_fingerprint)
+
+    def dump(self):
+        """Exporta as partidas do banco, lidas aos poucos com o fetch_batches, direto para os
+        arquivos das colunas. O manifest é apagado antes e escrito por último, então um
+        snapshot exportado pela metade nunca é carregado.
+
+        Returns:
+            dict: O manifest do snapshot exportado
+        """
+
+        participation_columns = [f"{participation}.{'fk_team_id' if stat == 'team_id' else stat}"
+                                 for participation in ("pt_home", "pt_away") for stat in SNAPSHOT_STATS]
+
+        os.makedirs(self.directory, exist_ok=True)
+        if(os.path.exists(join(self.directory, "manifest.json"))):
+            os.remove(join(self.directory, "manifest.json"))
+
+        column_files = {}
+
+        try:
+            cursor = get_read_connection().cursor()
+
+            # A impressão digital e as duas consultas enxergam o mesmo banco
+            cursor.execute("BEGIN;")
+            try:
+                database_fingerprint = get_database_fingerprint()
+
+                join_query = """
+                    FROM match_data as md
+                        INNER JOIN participation as pt_home On md.fk_participation_home = pt_home.participation_id
+                        INNER JOIN participation as pt_away On md.fk_participation_away = pt_away.participation_id"""
+
+                cursor.execute("SELECT COUNT(*)" + join_query)
+                match_amount = cursor.fetchone()[0]
+
+                columns = {}
+                for column, dtype in SNAPSHOT_COLUMNS.items():
+                    with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".npy.tmp", delete=False) as column_file:
+                        column_files[column] = column_file.name
+                    columns[column] = np.lib.format.open_memmap(column_files[column], mode="w+",
+                                                                dtype=dtype, shape=(match_amount,))
+
+                cursor.execute("SELECT md.match_id, md.date, " + ", ".join(participation_columns) +
+                               join_query + " ORDER BY md.date ASC, md.match_id ASC;")
+
+                for match_index, row in enumerate(fetch_batches(cursor)):
+                    for column_array, value in zip(columns.values(), row):
+                        column_array[match_index] = value
+            finally:
+                cursor.execute("COMMIT;")
+
+            for column_array in columns.values():
+                column_array.flush()
+            columns.clear()
+
+            for column, column_file_name in column_files.items():
+                os.replace(column_file_name, self.get_column_path(column))
+
+        except Exception as e:
+            for column_file_name in column_files.values():
+                if(os.path.exists(column_file_name)):
+                    os.remove(column_file_name)
+            print(e)
+            raise e
+
+        manifest = {
+            "columns": list(SNAPSHOT_COLUMNS),
+            "match_count": match_amount,
+            "database_fingerprint": database_fingerprint
+        }
+
+        with open(join(self.directory, "manifest.json"), "w") as manifest_file:
+            json.dump(manifest, manifest_file)
+
+        return manifest
+
+    def load(self):
+        """Mapeia as colunas do snapshot na memória, sem ler os arquivos"""
+
+        self.columns = {column: np.load(self.get_column_path(column), mmap_mode="r")
+                        for column in SNAPSHOT_COLUMNS}
+
+        return self
+
+    def get_participation_history(self, date_start, date_end):
+        """Mesmo resultado do data_provider.get_participation_history, tirado das colunas do snapshot
+
+        Args:
+            date_start (str): Data inicial no formato YYYY-MM-DD
+            date_end (str): Data final no formato YYYY-MM-DD
+
+        Returns:
+            list: Uma tupla por participação: (data, id do time, local, team_is_home, seguido
+                dos valores das AVERAGE_COLUMNS)
+        """
+
+        # As datas estão em ordem, então o intervalo sai de duas buscas binárias
+        dates = self.columns["date"]
+        match_slice = slice(np.searchsorted(dates, date_start.encode(), "left"),
+                            np.searchsorted(dates, date_end.encode(), "left"))
+        match_dates = dates[match_slice].astype(str)
+
+        def participation_columns(side, opponent, local):
+            def column(stat):
+                return self.columns[f"{side}_{stat}"][match_slice]
+
+            return [match_dates, column("team_id"), np.full(len(match_dates), local), column("team_is_home"),
+                    column("won"), column("points"), column("points") -
+                    self.columns[f"{opponent}_points"][match_slice],
+                    column("offensive_rebounds"), column("defensive_rebounds"),
+                    column("field_goals_percentage"), column("three_point_field_goals_percentage"),
+                    column("free_throws_percentage"), column("turnover"), column("assists")]
+
+        history_columns = [np.concatenate(side_columns) for side_columns in
+                           zip(participation_columns("home", "away", 1), participation_columns("away", "home", 0))]
+
+        # ORDER BY data, id do time, igual à consulta do data_provider
+        order = np.lexsort((history_columns[1], history_columns[0]))
+
+        return list(zip(*(column[order].tolist() for column in history_columns)))
+
+
+def export_match_snapshot(directory=None):
+    """Exporta o histórico de partidas do banco para um snapshot
+
+    Args:
+        directory (str, optional): Pasta do snapshot. Defaults to None (data/snapshot).
+
+    Returns:
+        dict: O manifest do snapshot exportado
+    """
+
+    match_snapshot = MatchSnapshot(directory)
+    manifest = match_snapshot.dump()
+    print(
+        f"Snapshot with {manifest['match_count']} matches exported to {match_snapshot.directory}")
+
+    return manifest
+
+
+def load_match_snapshot(directory=None):
+    """Carrega o snapshot para o data_provider usar, se ele existir e o banco não tiver mudado
+    desde a exportação
+
+    Args:
+        directory (str, optional): Pasta do snapshot. Defaults to None (data/snapshot).
+
+    Returns:
+        MatchSnapshot: O snapshot carregado, ou None se não tiver um válido
+    """
+
+    match_snapshot = MatchSnapshot(directory)
+
+    if(not match_snapshot.is_valid(match_snapshot.read_manifest(), get_database_fingerprint())):
+        return None
+
+    data_provider.match_snapshot = match_snapshot.load()
+    print(f"Using match snapshot from {match_snapshot.directory}")
+
+    return match_snapshot
+
+
+def use_match_snapshot(directory=None):
+    """Faz o data_provider carregar o snapshot (load_match_snapshot) na primeira vez que ele
+    precisar do histórico de partidas, igual ao data_provider.use_stats_index
+
+    Args:
+        directory (str, optional): Pasta do snapshot. Defaults to None (data/snapshot).
+    """
+
+    data_provider.match_snapshot_loader = lambda: load_match_snapshot(directory)
@@ -1,4 +1,8 @@
-from core.cli_model import run_gen_alg, run_web_scraping, predict_score, run_validation
+from core.cli_model import run_gen_alg, run_web_scraping, predict_score, run_validation, run_migration, run_backfill, \
+    run_snapshot
+from core.web.pipeline import DEFAULT_BASE_URL
+from core.web.http_fetcher import DEFAULT_REQUESTS_PER_MINUTE
+from data.utils.definition import is_schema_current, MIGRATIONS
 import argparse
 from datetime import datetime
 
@@ -30,6 +34,28 @@ gen_parser.add_argument("-gri", "--gen_random_individuals", type=int, default=10
                         help="Sets how many individuals in a new generation will be completely randomly generated.")
 gen_parser.add_argument("-gnp", "--gen-new-population", action="store_true",
                         help="Sets if the genetic algorithm shoud create an entirely new first generation or get the last generation stored in memory.")
+gen_parser.add_argument("-gif", "--gen-incremental-fitness", action="store_true",
+                        help="Updates each child's fitness only for the genes that changed during reproduction instead of recalculating it.")
+gen_parser.add_argument("-gi", "--gen-islands", type=int, default=1,
+                        help="Sets how many populations (islands) will evolve in parallel, each one in its own process.")
+gen_parser.add_argument("-gmi", "--gen-migration-interval", type=int, default=10,
+                        help="Sets how many generations pass between each exchange of individuals between islands.")
+gen_parser.add_argument("-gm", "--gen-migrants", type=int, default=2,
+                        help="Sets how many of the best individuals each island sends to its neighbour.")
+gen_parser.add_argument("-gfs", "--gen-fitness-sample", type=float, default=1,
+                        help="Fraction of the matches used to evaluate each generation. The best individuals are always re-evaluated with every match.")
+gen_parser.add_argument("-grv", "--gen-revalidated-individuals", type=int, default=None,
+                        help="Sets how many of the best individuals of the sample are re-evaluated with every match.")
+gen_parser.add_argument("-gci", "--gen-checkpoint-interval", type=int, default=0,
+                        help="Saves a checkpoint of the algorithm every N generations. 0 disables checkpoints.")
+gen_parser.add_argument("-r", "--resume", type=str, default=None,
+                        help="Path of a checkpoint file to continue a previous execution from.")
+gen_parser.add_argument("-gs", "--gen-seasons", type=str, nargs="+", default=None,
+                        help="Trains on every match of these seasons (e.g. 2017 2018) instead of the season up to the date.")
+gen_parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Sets how many processes will be used to calculate the population's fitness and to build the seasons.")
+gen_parser.add_argument("-s", "--seed", type=int, default=None,
+                        help="Seed for the random number generator, so that runs can be reproduced.")
 gen_parser.add_argument("-d", "--day", type=int, default=25,
                         help="Day to run the genetic algorithm at.")
 gen_parser.add_argument("-m", "--month", type=int, default=3,
@@ -38,7 +64,14 @@ gen_parser.add_argument("-y", "--year", type=int, default=2021,
                         help="Year to run the genetic algorithm at.")
 
 ws_parser = command_subparser.add_parser("scrape")
-
+ws_parser.add_argument("-u", "--base-url", type=str, default=DEFAULT_BASE_URL,
+                       help="Address of the site to scrape, e.g. a local server with saved pages.")
+ws_parser.add_argument("-fw", "--fetch-workers", type=int, default=4,
+                       help="Number of threads downloading pages.")
+ws_parser.add_argument("-pw", "--parse-workers", type=int, default=2,
+                       help="Number of threads parsing the downloaded pages.")
+ws_parser.add_argument("-r", "--requests-per-minute", type=float, default=DEFAULT_REQUESTS_PER_MINUTE,
+                       help="Maximum number of requests sent to the site per minute.")
 
 prediction_parser = command_subparser.add_parser("predict")
 prediction_parser.add_argument(
@@ -53,30 +86,71 @@ prediction_parser.add_argument("-y", "--year", type=int, default=2021,
                                help="Year to predict the results at.")
 prediction_parser.add_argument("-c", "--manual-chromosome", type=str, default=[None], nargs=10, action="append",
                                help="Allows the user to manually input a chromosome to predict a match")
+prediction_parser.add_argument("-si", "--stats-index", action="store_true",
+                               help="Reads the team names and averages from the whole match history loaded into memory instead of SQLite.")
+
+migration_parser = command_subparser.add_parser("migrate")
+
+backfill_parser = command_subparser.add_parser(
+    "backfill", help="Rebuilds the team_rolling_stats table from every match in the database.")
+
+snapshot_parser = command_subparser.add_parser(
+    "snapshot", help="Exports the match history to column files that the genetic algorithm and the validation load instead of querying the database.")
 
 validation_parser = command_subparser.add_parser("validate")
 validation_parser.add_argument("-c", "--cycles", type=int, default=10, help="Number of cycles ran in the validation. \
     Equates to how many fitness values will be compared for each generator function.")
+validation_parser.add_argument("-si", "--stats-index", action="store_true",
+                               help="Loads the whole match history into memory the first time an average is needed, and builds the season from it instead of SQLite.")
+
+# Protegido para que os processos do --workers não rodem o CLI de novo ao importar este arquivo
+if __name__ == "__main__":
+    args = arg_parser.parse_args()
+
+    # As ilhas são processos próprios, sem checkpoint nem pool de fitness
+    if(args.subparser == "genetic" and args.gen_islands > 1):
+        if(args.resume is not None or args.gen_checkpoint_interval > 0):
+            gen_parser.error("--resume and --gen-checkpoint-interval can't be used with --gen-islands.")
+        if(args.workers > 1 and args.gen_seasons is None):
+            gen_parser.error("--workers can't be used with --gen-islands, each island already runs in its own process. "
+                             "With --gen-seasons it only sets the processes that build the seasons.")
 
-args = arg_parser.parse_args()
+    # Só o comando migrate escreve no schema (e passa o banco para o modo WAL); os outros só
+    # conferem a versão, sem mexer no arquivo
+    if(args.subparser not in (None, "migrate") and not is_schema_current()):
+        arg_parser.error(f"The database needs the schema version {MIGRATIONS[-1][0]}. "
+                         "Run `python main.py migrate` first.")
 
-if(args.subparser == "genetic"):
-    print(args)
-    run_gen_alg(date=[args.year, args.month, args.day], good_generations=args.gen_good_generations,
-                weight_range=args.gen_weight_range, mutation_chance=args.gen_mutation_chance,
-                mutation_magnitude=args.gen_mutation_magnitude, chromosome_size=args.gen_chromosome_size,
-                population_size=args.gen_population_size, max_generations=args.gen_max_generations,
-                persistent_individuals=args.gen_persistent_individuals, random_individuals=args.gen_random_individuals,
-                timestamp=datetime.now(), generate_new_population=args.gen_new_population)
-elif(args.subparser == "scrape"):
-    run_web_scraping()
-elif(args.subparser == "predict"):
-    predict_score(args.home, args.away, [
-                  args.year, args.month, args.day], manual_chromosome=args.manual_chromosome[0])
-elif(args.subparser == "validate"):
-    run_validation(test_cycles=args.cycles)
-else:
-    print("""
+    if(args.subparser == "genetic"):
+        print(args)
+        run_gen_alg(date=[args.year, args.month, args.day], good_generations=args.gen_good_generations,
+                    weight_range=args.gen_weight_range, mutation_chance=args.gen_mutation_chance,
+                    mutation_magnitude=args.gen_mutation_magnitude, chromosome_size=args.gen_chromosome_size,
+                    population_size=args.gen_population_size, max_generations=args.gen_max_generations,
+                    persistent_individuals=args.gen_persistent_individuals, random_individuals=args.gen_random_individuals,
+                    timestamp=datetime.now(), generate_new_population=args.gen_new_population,
+                    workers=args.workers, seed=args.seed, incremental_fitness=args.gen_incremental_fitness,
+                    islands=args.gen_islands, migration_interval=args.gen_migration_interval,
+                    migrants=args.gen_migrants, checkpoint_interval=args.gen_checkpoint_interval,
+                    resume=args.resume, fitness_sample_fraction=args.gen_fitness_sample,
+                    revalidated_individuals=args.gen_revalidated_individuals, seasons=args.gen_seasons)
+    elif(args.subparser == "scrape"):
+        run_web_scraping(base_url=args.base_url, fetch_workers=args.fetch_workers,
+                         parse_workers=args.parse_workers, requests_per_minute=args.requests_per_minute)
+    elif(args.subparser == "predict"):
+        predict_score(args.home, args.away, [
+                      args.year, args.month, args.day], manual_chromosome=args.manual_chromosome[0],
+                      use_stats_index=args.stats_index)
+    elif(args.subparser == "validate"):
+        run_validation(test_cycles=args.cycles, use_stats_index=args.stats_index)
+    elif(args.subparser == "migrate"):
+        run_migration()
+    elif(args.subparser == "backfill"):
+        run_backfill()
+    elif(args.subparser == "snapshot"):
+        run_snapshot()
+    else:
+        print("""
     NBA PREDICTION
     Thanks for using NBA prediction. Please run this command with a `-h` to see available options.
     """)
@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+
+# O código roda de dentro do src (ex.: python main.py), então os imports partem de lá
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import pytest  # noqa: E402
+import data.utils.connection_provider as connection_provider  # noqa: E402
+from data.utils.definition import create_database, fill_teams  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Banco novo e migrado, com os times, no lugar do data/database.sqlite3"""
+
+    connection_provider.close_connection()
+    monkeypatch.setattr(connection_provider, "DATABASE_PATH", str(tmp_path / "database.sqlite3"))
+
+    create_database()
+    fill_teams()
+
+    yield connection_provider.DATABASE_PATH
+
+    connection_provider.close_connection()
+
+
+def create_participation(team_id, team_name, team_is_home, points, won):
+    """Participação no formato do insert_participation_data, com as outras estatísticas fixas"""
+
+    return [0, team_id, team_name, team_is_home, "60", 10, 20, 0.5, 3, 8, 0.375, 5, 6, 0.833,
+            2, 8, 10, 6, 2, 1, 3, 4, points, 42, won]
+
+
+@pytest.fixture
+def make_game(database):
+    """Monta uma partida no formato do manipulation.insert_games, com os nomes da tabela team"""
+
+    team_names = dict(connection_provider.get_read_connection().execute("SELECT team_id, team_name FROM team;"))
+
+    def make_game(home_team_id, away_team_id, date, home_points=30, away_points=25):
+        return (create_participation(home_team_id, team_names[home_team_id], 1, home_points,
+                                     int(home_points > away_points)),
+                create_participation(away_team_id, team_names[away_team_id], 0, away_points,
+                                     int(away_points > home_points)),
+                date)
+
+    return make_game
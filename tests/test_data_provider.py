@@ -0,0 +1,63 @@
+import pytest
+import data.utils.data_provider as data_provider
+from data.utils.manipulation import insert_games
+
+
+@pytest.fixture
+def history(database, make_game, monkeypatch):
+    """Duas seasons de partidas, algumas com porcentagens zeradas (que o get_averages ignora)"""
+
+    monkeypatch.setattr(data_provider, "stats_index", None)
+    monkeypatch.setattr(data_provider, "stats_index_enabled", False)
+
+    games = [make_game(2, 5, "2018-10-16", 30, 25), make_game(10, 2, "2018-10-20", 22, 28),
+             make_game(2, 10, "2018-11-02", 27, 27), make_game(5, 2, "2019-03-01", 31, 18),
+             make_game(2, 5, "2019-10-22", 24, 26), make_game(5, 10, "2019-10-25", 29, 21),
+             make_game(2, 10, "2019-11-08", 33, 30)]
+    for game_index, (home_participation, away_participation, _) in enumerate(games):
+        home_participation[7] = 0.25 * (game_index % 3)
+        away_participation[13] = 0 if game_index % 2 else 0.6
+        home_participation[14] = game_index
+
+    insert_games(games)
+
+
+DATES = [[2018, 10, 16], [2018, 10, 21], [2018, 12, 1], [2019, 5, 1], [2019, 10, 22], [2019, 11, 8], [2019, 12, 1]]
+
+
+def test_stats_index_matches_get_averages(history):
+    expected_averages = {(team_id, local, tuple(date)): data_provider.get_averages(team_id, local, date)
+                         for team_id in (2, 5, 10, 31) for local in (1, 0) for date in DATES}
+
+    data_provider.load_stats_index()
+
+    for (team_id, local, date), averages in expected_averages.items():
+        assert data_provider.get_averages(team_id, local, list(date)) == averages
+
+
+def test_stats_index_does_not_query_sqlite(history, monkeypatch):
+    expected_averages = data_provider.get_specific_match_averages("Atlanta", "Boston", [2019, 11, 8])
+
+    data_provider.use_stats_index()
+    data_provider.get_stats_index()
+
+    def forbidden_query():
+        raise AssertionError("the stats index queried SQLite")
+
+    monkeypatch.setattr(data_provider, "get_read_connection", forbidden_query)
+
+    assert data_provider.get_specific_match_averages("Atlanta", "Boston", [2019, 11, 8]) == expected_averages
+    assert data_provider.get_won_spread(5, 1, [2019, 12, 1]) == 1
+
+
+def test_stats_index_is_loaded_on_first_use(history, make_game):
+    data_provider.use_stats_index()
+    assert data_provider.stats_index is None
+
+    averages = data_provider.get_averages(2, 1, [2019, 12, 1])
+    assert data_provider.stats_index["running_sums"][(2, 1)]["dates"].dtype == "datetime64[D]"
+
+    # Uma partida nova descarta o índice, que é carregado de novo com ela na próxima média
+    insert_games([make_game(2, 31, "2019-11-20", 40, 20)])
+    assert data_provider.stats_index is None
+    assert data_provider.get_averages(2, 1, [2019, 12, 1])["points"] > averages["points"]
@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+import data.utils.connection_provider as connection_provider
+from data.utils import data_provider, dataset_cache, match_snapshot
+from data.utils.dataset_cache import get_database_fingerprint
+from data.utils.manipulation import insert_games
+
+
+def insert_season_start(make_game):
+    insert_games([make_game(1, 2, "2019-10-22", 30, 25), make_game(3, 4, "2019-10-22", 20, 28)])
+    insert_games([make_game(2, 3, "2019-10-23", 27, 24)])
+
+
+def test_fingerprint_changes_when_a_correction_keeps_the_sums(database, make_game):
+    insert_season_start(make_game)
+    fingerprint = get_database_fingerprint()
+
+    # Troca os pontos de duas participações: as somas das colunas continuam iguais
+    with connection_provider.transaction() as cursor:
+        cursor.execute("UPDATE participation SET points = 20 WHERE participation_id = 1;")
+        cursor.execute("UPDATE participation SET points = 30 WHERE participation_id = 3;")
+
+    assert get_database_fingerprint() != fingerprint
+
+
+def test_fingerprint_ignores_columns_the_features_dont_use(database, make_game):
+    insert_season_start(make_game)
+    fingerprint = get_database_fingerprint()
+
+    with connection_provider.transaction() as cursor:
+        cursor.execute("UPDATE participation SET minutes_played = '240:00';")
+
+    assert get_database_fingerprint() == fingerprint
+
+
+def test_fingerprint_only_covers_matches_until_date_end(database, make_game):
+    insert_season_start(make_game)
+    fingerprint = get_database_fingerprint([2019, 10, 22])
+    full_fingerprint = get_database_fingerprint()
+
+    insert_games([make_game(4, 1, "2019-10-24")])
+
+    assert get_database_fingerprint([2019, 10, 22]) == fingerprint
+    assert get_database_fingerprint() != full_fingerprint
+
+
+@pytest.fixture
+def two_seasons(make_game, tmp_path, monkeypatch):
+    """Uma partida da season 2018 (participações 1 e 2) e algumas da 2019, com o cache em tmp_path"""
+
+    monkeypatch.setattr(dataset_cache, "get_dataset_cache_directory", lambda: str(tmp_path / "cache"))
+
+    insert_games([make_game(1, 2, "2018-11-10", 30, 25)])
+    insert_season_start(make_game)
+    insert_games([make_game(1, 3, "2019-11-05", 22, 26), make_game(4, 2, "2019-11-06", 31, 30)])
+
+
+def test_warm_load_does_not_read_the_matches(two_seasons, capsys):
+    built_matrix = dataset_cache.get_match_feature_matrix_by_season([2019, 11, 10])
+
+    # Corrigir a season anterior não invalida o conjunto desta season
+    with connection_provider.transaction() as cursor:
+        cursor.execute("UPDATE participation SET points = 99 WHERE participation_id = 1;")
+
+    statements = []
+    read_connection = connection_provider.get_read_connection()
+    read_connection.set_trace_callback(statements.append)
+    try:
+        cached_matrix = dataset_cache.get_match_feature_matrix_by_season([2019, 11, 10])
+    finally:
+        read_connection.set_trace_callback(None)
+
+    assert "Loading cached dataset" in capsys.readouterr().out
+    assert np.array_equal(cached_matrix.team_home, built_matrix.team_home, equal_nan=True)
+    assert not [statement for statement in statements
+                if "match_data" in statement or "participation" in statement]
+
+
+def test_correction_inside_the_season_rebuilds_the_dataset(two_seasons, capsys):
+    dataset_cache.get_match_feature_matrix_by_season([2019, 11, 10])
+    capsys.readouterr()
+
+    with connection_provider.transaction() as cursor:
+        cursor.execute("UPDATE participation SET points = 40 WHERE participation_id = 7;")
+
+    dataset_cache.get_match_feature_matrix_by_season([2019, 11, 10])
+
+    assert "Loading cached dataset" not in capsys.readouterr().out
+
+
+def test_dataset_is_extended_after_a_correction_in_an_earlier_season(two_seasons, make_game, capsys):
+    dataset_cache.get_match_feature_matrix_by_season([2019, 11, 6])
+
+    with connection_provider.transaction() as cursor:
+        cursor.execute("UPDATE participation SET points = 99 WHERE participation_id = 1;")
+    insert_games([make_game(3, 4, "2019-11-08", 28, 21)])
+    capsys.readouterr()
+
+    feature_matrix = dataset_cache.get_match_feature_matrix_by_season([2019, 11, 10])
+
+    assert "Added 1 new matches" in capsys.readouterr().out
+    assert len(feature_matrix) == 3
+
+
+def test_snapshot_is_only_loaded_when_a_season_is_built(two_seasons, tmp_path, monkeypatch):
+    monkeypatch.setattr(data_provider, "match_snapshot", None)
+    monkeypatch.setattr(data_provider, "match_snapshot_loader", None)
+
+    dataset_cache.get_match_feature_matrix_by_season([2019, 11, 10])
+    match_snapshot.export_match_snapshot(str(tmp_path / "snapshot"))
+    match_snapshot.use_match_snapshot(str(tmp_path / "snapshot"))
+
+    dataset_cache.get_match_feature_matrix_by_season([2019, 11, 10])
+    assert data_provider.match_snapshot is None
+
+    # Sem nenhum conjunto anterior da season, monta tudo
+    dataset_cache.get_match_feature_matrix_by_season([2019, 11, 6])
+    assert data_provider.match_snapshot is not None
@@ -0,0 +1,46 @@
+import data.utils.connection_provider as connection_provider
+import data.utils.definition as definition
+
+
+def test_migrate_current_database_only_reads(database, monkeypatch):
+    connection_provider.close_connection()
+
+    def forbidden_write(*args, **kwargs):
+        raise AssertionError("migrate_database wrote to a current database")
+
+    monkeypatch.setattr(definition, "get_connection", forbidden_write)
+    monkeypatch.setattr(definition, "enable_wal_mode", forbidden_write)
+    monkeypatch.setattr(definition, "transaction", forbidden_write)
+
+    assert definition.migrate_database() == definition.MIGRATIONS[-1][0]
+    assert connection_provider.get_thread_connection() is None
+
+
+def test_migrate_old_database(database):
+    with connection_provider.transaction() as cursor:
+        cursor.execute("DROP TABLE team_rolling_stats;")
+        cursor.execute("PRAGMA user_version = 1;")
+
+    assert not definition.is_database_current()
+    assert definition.migrate_database() == definition.MIGRATIONS[-1][0]
+    assert definition.is_database_current()
+
+    table_names = [row[0] for row in connection_provider.get_read_connection().execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table';")]
+    assert "team_rolling_stats" in table_names
+
+
+def test_missing_database_is_not_current(tmp_path, monkeypatch):
+    connection_provider.close_connection()
+    monkeypatch.setattr(connection_provider, "DATABASE_PATH", str(tmp_path / "missing.sqlite3"))
+
+    assert not definition.is_database_current()
+
+
+def test_old_schema_is_not_current(database):
+    assert definition.is_schema_current()
+
+    with connection_provider.transaction() as cursor:
+        cursor.execute("PRAGMA user_version = 1;")
+
+    assert not definition.is_schema_current()
@@ -0,0 +1,202 @@
+import math
+import random
+import numpy as np
+import pytest
+from core.gen.classes.genetic_algorithm import GeneticAlgorithm
+from data.utils.match_feature_matrix import STAT_COLUMNS, MatchFeatureMatrix
+
+
+def predict_home_win(chromosome, match):
+    """O predict_match original, estatística por estatística: um valor nulo soma o próprio gene"""
+
+    def score(team_stats):
+        team_score = 0
+        for gene_index, stat in enumerate(team_stats):
+            try:
+                team_score += team_stats[stat] * chromosome[gene_index]
+            except TypeError:
+                team_score += chromosome[gene_index]
+        return team_score
+
+    return score(match["team_home"]) > score(match["team_away"])
+
+
+def reference_fitness(chromosome, match_list):
+    wrong_predictions = sum(predict_home_win(chromosome, match) != bool(match["home_won"])
+                            for match in match_list)
+    return ((len(match_list) - wrong_predictions) * 100)/len(match_list)
+
+
+def generate_match_list(match_amount, seed=0):
+    match_random = random.Random(seed)
+
+    def team_stats():
+        return {stat: None if match_random.random() < 0.1 else match_random.uniform(0, 30)
+                for stat in STAT_COLUMNS}
+
+    match_list = [{"team_home": team_stats(), "team_away": team_stats(), "home_won": match_random.randint(0, 1)}
+                  for _ in range(match_amount)]
+
+    # Empates: estatísticas iguais dão margem 0, que conta como vitória do time de fora
+    tied_stats = team_stats()
+    match_list.append({"team_home": dict(tied_stats), "team_away": dict(tied_stats), "home_won": 0})
+    match_list.append({"team_home": dict(tied_stats), "team_away": dict(tied_stats), "home_won": 1})
+
+    return match_list
+
+
+def generate_population(population_size, seed=0):
+    population_random = random.Random(seed)
+    population = [[population_random.uniform(-10, 10) for _ in STAT_COLUMNS]
+                  for _ in range(population_size)]
+
+    # Cromossomo zerado empata todas as partidas; repetidos testam o desempate da ordenação
+    population.append([0.0] * len(STAT_COLUMNS))
+    population.append(list(population[0]))
+
+    return population
+
+
+def create_genetic_algorithm(fitness_input, batched_fitness):
+    return GeneticAlgorithm(fitness_input, batched_fitness=batched_fitness, chromosome_size=len(STAT_COLUMNS),
+                            fitness_cache_size=0)
+
+
+@pytest.mark.parametrize("batched_fitness", [True, False])
+def test_fitness_matches_original_predict_match(batched_fitness):
+    match_list = generate_match_list(200)
+    population = generate_population(30)
+
+    gen_alg = create_genetic_algorithm(match_list, batched_fitness)
+    ranked_population = gen_alg.apply_fitness(population, gen_alg.fitness_input)
+
+    expected_fitness = [reference_fitness(individual, match_list) for individual in population]
+    expected_ranking = sorted(zip(population, expected_fitness), key=lambda element: element[1], reverse=True)
+
+    assert [individual for individual, _ in ranked_population] == [individual for individual, _ in expected_ranking]
+    assert [fitness for _, fitness in ranked_population] == pytest.approx([fitness for _, fitness in expected_ranking])
+
+
+def test_batched_and_per_match_paths_agree():
+    match_list = generate_match_list(200, seed=1)
+    population = generate_population(30, seed=1)
+
+    batched_gen_alg = create_genetic_algorithm(match_list, True)
+    per_match_gen_alg = create_genetic_algorithm(match_list, False)
+
+    assert batched_gen_alg.apply_fitness_batched(population, batched_gen_alg.fitness_input) == \
+        per_match_gen_alg.apply_fitness(population, per_match_gen_alg.fitness_input)
+
+
+def test_tied_match_counts_as_away_win():
+    tied_match = MatchFeatureMatrix([[2.0] * len(STAT_COLUMNS)], [[2.0] * len(STAT_COLUMNS)], [0.0])
+    gen_alg = create_genetic_algorithm(tied_match, True)
+
+    assert gen_alg.predict_match([1.0] * len(STAT_COLUMNS), tied_match)["predicted_1q_winner"] == "team_away"
+    assert gen_alg.apply_fitness([[1.0] * len(STAT_COLUMNS)], gen_alg.fitness_input)[0][1] == 100
+
+
+@pytest.mark.parametrize("batched_fitness", [True, False])
+def test_missing_stats_use_missing_value(batched_fitness):
+    # None nos dicionários vira NaN na matriz, e os dois são trocados pelo missing_value (1.0)
+    home_stats = {stat: None for stat in STAT_COLUMNS}
+    away_stats = {stat: 0.5 for stat in STAT_COLUMNS}
+    nan_stats = {stat: math.nan for stat in STAT_COLUMNS}
+    match_list = [{"team_home": home_stats, "team_away": away_stats, "home_won": 1},
+                  {"team_home": nan_stats, "team_away": away_stats, "home_won": 1}]
+
+    gen_alg = create_genetic_algorithm(match_list, batched_fitness)
+    assert np.isnan(gen_alg.fitness_input.team_home).all()
+
+    ranked_population = gen_alg.apply_fitness([[1.0] * len(STAT_COLUMNS)], gen_alg.fitness_input)
+    assert ranked_population[0][1] == 100
+    assert reference_fitness([1.0] * len(STAT_COLUMNS), match_list[:1]) == 100
+
+
+@pytest.mark.parametrize("batched_fitness", [True, False])
+def test_empty_match_list(batched_fitness):
+    population = generate_population(5)
+    gen_alg = create_genetic_algorithm([], batched_fitness)
+
+    ranked_population = gen_alg.apply_fitness(population, gen_alg.fitness_input)
+
+    assert [individual for individual, _ in ranked_population] == population
+    assert [fitness for _, fitness in ranked_population] == [0] * len(population)
+
+
+@pytest.mark.parametrize("batched_fitness", [True, False])
+def test_match_list_input_is_converted_once(batched_fitness, monkeypatch):
+    match_list = generate_match_list(50)
+    population = generate_population(20)
+    gen_alg = GeneticAlgorithm(match_list, batched_fitness=batched_fitness, chromosome_size=len(STAT_COLUMNS))
+
+    conversions = []
+    from_match_list = MatchFeatureMatrix.from_match_list.__func__
+    monkeypatch.setattr(MatchFeatureMatrix, "from_match_list", classmethod(
+        lambda cls, *args, **kwargs: conversions.append(1) or from_match_list(cls, *args, **kwargs)))
+
+    ranked_population = gen_alg.apply_fitness(population, match_list)
+
+    assert len(conversions) == 1
+    assert [fitness for _, fitness in ranked_population] == \
+        [fitness for _, fitness in gen_alg.apply_fitness(population, gen_alg.fitness_input)]
+
+
+def generate_home_win_matrix(match_amount):
+    # O time de casa tem todas as estatísticas maiores e sempre ganha
+    return MatchFeatureMatrix([[2.0] * len(STAT_COLUMNS)] * match_amount,
+                              [[1.0] * len(STAT_COLUMNS)] * match_amount, [1.0] * match_amount)
+
+
+def test_sampled_fitness_stops_with_few_revalidated_individuals():
+    # Só 3 reavaliados numa população de 100: o 1/10 tem que ser dos reavaliados, não da população
+    population = [[1.0] * len(STAT_COLUMNS) for _ in range(100)]
+    gen_alg = GeneticAlgorithm(generate_home_win_matrix(50), chromosome_size=len(STAT_COLUMNS),
+                               population_size=len(population), fitness_cache_size=0,
+                               fitness_sample_fraction=0.5, revalidated_individuals=3)
+
+    for _ in range(gen_alg.target_good_generations):
+        ranked_population = gen_alg.apply_fitness(population, gen_alg.fitness_input)
+        assert gen_alg.validated_individuals == 3
+        assert gen_alg.check_for_break(ranked_population)
+
+    assert gen_alg.consecutive_good_generations == gen_alg.target_good_generations
+
+
+def test_sampled_fitness_ignores_individuals_not_revalidated():
+    # Os reavaliados erram tudo; os 100% da amostra nos outros não podem parar o algoritmo
+    gen_alg = GeneticAlgorithm(generate_home_win_matrix(50), chromosome_size=len(STAT_COLUMNS),
+                               population_size=100, fitness_cache_size=0,
+                               fitness_sample_fraction=0.5, revalidated_individuals=3)
+    gen_alg.validated_individuals = 3
+    ranked_population = [([-1.0] * len(STAT_COLUMNS), 0.0)] * 3 + [([1.0] * len(STAT_COLUMNS), 100.0)] * 97
+
+    assert not gen_alg.check_for_break(ranked_population)
+    assert gen_alg.consecutive_good_generations == 0
+
+
+def test_sampled_fitness_needs_a_tenth_of_the_population():
+    # 10 reavaliados (o padrão) numa população de 100: um só acima de 70 não basta, precisa dos 10
+    gen_alg = GeneticAlgorithm(generate_home_win_matrix(50), chromosome_size=len(STAT_COLUMNS),
+                               population_size=100, fitness_cache_size=0, fitness_sample_fraction=0.5)
+    assert gen_alg.revalidated_individuals == 10
+    gen_alg.validated_individuals = 10
+
+    one_good_elite = [([1.0] * len(STAT_COLUMNS), 100.0)] + [([-1.0] * len(STAT_COLUMNS), 0.0)] * 9 + \
+        [([1.0] * len(STAT_COLUMNS), 100.0)] * 90
+    assert not gen_alg.check_for_break(one_good_elite)
+
+    all_good_elites = [([1.0] * len(STAT_COLUMNS), 100.0)] * 10 + [([-1.0] * len(STAT_COLUMNS), 0.0)] * 90
+    assert gen_alg.check_for_break(all_good_elites)
+
+
+def test_full_fitness_threshold_is_a_tenth_of_the_population():
+    gen_alg = create_genetic_algorithm(generate_home_win_matrix(10), True)
+
+    gen_alg.validated_individuals = 20
+    assert not gen_alg.check_for_break([([1.0] * len(STAT_COLUMNS), 100.0)] + [([-1.0] * len(STAT_COLUMNS), 0.0)] * 19)
+    assert gen_alg.check_for_break([([1.0] * len(STAT_COLUMNS), 100.0)] * 2 + [([-1.0] * len(STAT_COLUMNS), 0.0)] * 18)
+
+    # Populações com menos de 10 indivíduos continuam sem exigir nenhum
+    gen_alg.validated_individuals = 5
+    assert gen_alg.check_for_break([([-1.0] * len(STAT_COLUMNS), 0.0)] * 5)
@@ -0,0 +1,129 @@
+import threading
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pytest
+import urllib3
+import core.web.http_fetcher as http_fetcher
+from core.web.http_fetcher import HttpFetcher, get_retry_after
+
+
+class ScriptedServer:
+    """Servidor local que responde cada requisição com o próximo (status, cabeçalhos) da lista,
+    e com o último depois que ela acaba"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.request_amount = 0
+        server = self
+
+        class ScriptedRequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                status, headers = server.responses[min(server.request_amount, len(server.responses) - 1)]
+                server.request_amount += 1
+
+                body = f"status {status}".encode()
+                self.send_response(status)
+                for header, value in headers.items():
+                    self.send_header(header, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedRequestHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}/page.html"
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(http_fetcher.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def count_rate_limiter_waits(fetcher):
+    waits = []
+    wait = fetcher.rate_limiter.wait
+    fetcher.rate_limiter.wait = lambda: waits.append(1) or wait()
+    return waits
+
+
+def test_every_retry_goes_through_the_rate_limiter(sleeps):
+    fetcher = HttpFetcher(requests_per_minute=None, retries=3, backoff_factor=1)
+    waits = count_rate_limiter_waits(fetcher)
+
+    with ScriptedServer([(503, {}), (500, {}), (200, {})]) as url:
+        assert fetcher(url) == "status 200"
+
+    assert len(waits) == 3
+    assert sleeps == [1, 2]
+
+
+def test_retry_after_is_respected(sleeps):
+    fetcher = HttpFetcher(requests_per_minute=None, retries=2, backoff_factor=1)
+
+    with ScriptedServer([(429, {"Retry-After": "30"}), (200, {})]) as url:
+        assert fetcher(url) == "status 200"
+
+    assert sleeps == [30]
+
+
+def test_gives_up_after_the_retries(sleeps):
+    fetcher = HttpFetcher(requests_per_minute=None, retries=2, backoff_factor=0)
+    waits = count_rate_limiter_waits(fetcher)
+
+    with ScriptedServer([(503, {})]) as url:
+        with pytest.raises(urllib3.exceptions.HTTPError, match="HTTP 503"):
+            fetcher(url)
+
+    assert len(waits) == 3
+
+
+def test_client_errors_are_not_retried(sleeps):
+    fetcher = HttpFetcher(requests_per_minute=None, retries=3)
+
+    with ScriptedServer([(404, {}), (200, {})]) as url:
+        with pytest.raises(urllib3.exceptions.HTTPError, match="HTTP 404"):
+            fetcher(url)
+
+    assert sleeps == []
+
+
+def test_connection_errors_are_retried(sleeps):
+    fetcher = HttpFetcher(requests_per_minute=None, retries=2, backoff_factor=0, timeout=1)
+    waits = count_rate_limiter_waits(fetcher)
+
+    # Porta de um servidor que já foi fechado
+    with ScriptedServer([(200, {})]) as url:
+        pass
+
+    with pytest.raises(urllib3.exceptions.HTTPError):
+        fetcher(url)
+
+    assert len(waits) == 3
+
+
+def test_get_retry_after_reads_seconds_and_dates():
+    class Response:
+        def __init__(self, headers):
+            self.headers = headers
+
+    retry_date = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+
+    assert get_retry_after(Response({"Retry-After": "12"})) == 12
+    assert 50 < get_retry_after(Response({"Retry-After": retry_date})) <= 60
+    assert get_retry_after(Response({"Retry-After": "soon"})) is None
+    assert get_retry_after(Response({})) is None
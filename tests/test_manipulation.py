@@ -0,0 +1,60 @@
+import sqlite3
+import pytest
+import data.utils.connection_provider as connection_provider
+import data.utils.manipulation as manipulation
+from data.utils.manipulation import insert_games
+
+
+def read_table(query):
+    return connection_provider.get_read_connection().execute(query).fetchall()
+
+
+def test_insert_games_assigns_contiguous_participation_ids(database, make_game):
+    insert_games([make_game(1, 2, "2019-10-22")])
+    insert_games([make_game(3, 4, "2019-10-23"), make_game(5, 6, "2019-10-23"), make_game(7, 8, "2019-10-23")])
+
+    participation_ids = [row[0] for row in read_table(
+        "SELECT participation_id FROM participation ORDER BY participation_id;")]
+
+    assert participation_ids == list(range(1, 9))
+
+
+def test_insert_games_links_home_and_away_participations(database, make_game):
+    games = [make_game(1, 2, "2019-10-22", 30, 25), make_game(3, 4, "2019-10-22", 20, 28)]
+    insert_games(games)
+
+    matches = read_table("""
+        SELECT md.date, pt_home.fk_team_id, pt_home.team_is_home, pt_home.points,
+            pt_away.fk_team_id, pt_away.team_is_home, pt_away.points
+        FROM match_data as md
+            INNER JOIN participation as pt_home On md.fk_participation_home = pt_home.participation_id
+            INNER JOIN participation as pt_away On md.fk_participation_away = pt_away.participation_id
+        ORDER BY md.match_id;""")
+
+    assert matches == [("2019-10-22", 1, 1, 30, 2, 0, 25), ("2019-10-22", 3, 1, 20, 4, 0, 28)]
+
+
+def test_insert_games_rolls_back_the_whole_day(database, make_game):
+    insert_games([make_game(1, 2, "2019-10-22")])
+    tables_before = [read_table(f"SELECT * FROM {table};")
+                     for table in ("participation", "match_data", "team_rolling_stats")]
+
+    # A segunda partida não tem data: as participações já foram inseridas quando o INSERT da partida falha
+    with pytest.raises(sqlite3.IntegrityError):
+        insert_games([make_game(3, 4, "2019-10-23"), make_game(5, 6, None)])
+
+    assert [read_table(f"SELECT * FROM {table};")
+            for table in ("participation", "match_data", "team_rolling_stats")] == tables_before
+
+
+def test_insert_games_rolls_back_when_the_rolling_stats_fail(database, make_game, monkeypatch):
+    def failing_update(*args, **kwargs):
+        raise RuntimeError("rolling stats failed")
+
+    monkeypatch.setattr(manipulation, "update_rolling_stats_from", failing_update)
+
+    with pytest.raises(RuntimeError):
+        insert_games([make_game(1, 2, "2019-10-22"), make_game(3, 4, "2019-10-22")])
+
+    assert read_table("SELECT COUNT(*) FROM participation;") == [(0,)]
+    assert read_table("SELECT COUNT(*) FROM match_data;") == [(0,)]
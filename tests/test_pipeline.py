@@ -0,0 +1,49 @@
+import io
+from contextlib import redirect_stdout
+import data.utils.connection_provider as connection_provider
+import data.utils.manipulation as manipulation
+from core.web import fixture_server
+from core.web.http_fetcher import HttpFetcher
+from core.web.pipeline import ScrapingPipeline
+from data.utils.definition import create_database, fill_teams
+
+
+def get_match_participations(date_start, date_end):
+    """As duas participações de cada partida, sem os ids, para comparar bancos diferentes"""
+
+    participation_columns = ("fk_team_id", "team_name", "team_is_home", "minutes_played") + \
+        manipulation.MATCH_STATS_COLUMNS
+
+    return connection_provider.get_read_connection().execute(f"""
+        SELECT md.date, {", ".join(f"{participation}.{column}" for participation in ("pt_home", "pt_away")
+                                   for column in participation_columns)}
+        FROM match_data as md
+            INNER JOIN participation as pt_home On md.fk_participation_home = pt_home.participation_id
+            INNER JOIN participation as pt_away On md.fk_participation_away = pt_away.participation_id
+        WHERE md.date >= ? AND md.date <= ?
+        ORDER BY md.date ASC, md.match_id ASC""", (date_start, date_end)).fetchall()
+
+
+def test_fixture_server_round_trip(database, make_game, tmp_path, monkeypatch):
+    # Dois jogos do mesmo time no mesmo dia, um dia sem jogos e um dia fora do intervalo
+    manipulation.insert_games([make_game(2, 5, "2019-10-22", 30, 25), make_game(10, 15, "2019-10-22", 20, 28),
+                               make_game(5, 2, "2019-10-22", 22, 24)])
+    manipulation.insert_games([make_game(16, 23, "2019-10-24", 31, 18)])
+    manipulation.insert_games([make_game(31, 4, "2019-10-25", 27, 26)])
+
+    expected_matches = get_match_participations("2019-10-21", "2019-10-24")
+    date_list = fixture_server.save_fixture_pages(str(tmp_path / "pages"), "2019-10-21", "2019-10-24")
+
+    connection_provider.close_connection()
+    monkeypatch.setattr(connection_provider, "DATABASE_PATH", str(tmp_path / "scraped.sqlite3"))
+    create_database()
+    fill_teams()
+
+    with fixture_server.FixtureServer(str(tmp_path / "pages")) as base_url:
+        scraping_pipeline = ScrapingPipeline(base_url=base_url, fetch_workers=2, parse_workers=2, batch_size=2,
+                                             fetch=HttpFetcher(requests_per_minute=None, pool_size=4))
+        with redirect_stdout(io.StringIO()):
+            scraped_match_amount = scraping_pipeline.run(date_list)
+
+    assert scraped_match_amount == len(expected_matches) == 4
+    assert get_match_participations("2019-10-21", "2019-10-24") == expected_matches